@@ -7,6 +7,7 @@ echo ============================================================
 
 echo [1/4] Iniciando Medula Espinal (Redis)...
 :: Lanzamos Redis en segundo plano (minimizando la ventana)
+:: Requiere Redis ^>= 6.0 (servidor de inferencia); las builds viejas de Windows (3.x/5.x) no sirven
 start "REDIS SERVER" /min redis-server
 
 :: Esperamos 3 segundos a que el servidor levante
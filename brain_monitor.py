@@ -1,5 +1,4 @@
 import redis
-import json
 import os
 import sys
 from rich.console import Console
@@ -12,6 +11,8 @@ if sys.platform == "win32":
     os.system("chcp 65001 > nul")
 
 from config import *
+from codec_medula import decodificar
+from transporte_medula import suscribir
 
 console = Console()
 
@@ -44,8 +45,8 @@ def generar_dashboard(view):
 
 def main():
     r = redis.Redis(host=REDIS_HOST, port=REDIS_PORT)
-    pubsub = r.pubsub()
-    pubsub.subscribe(CH_MARKET_DATA, CH_BRAIN_STATE, CH_DECISION, CH_HOMEOSTASIS, CH_VOTES)
+    pubsub = suscribir(r, [c for base in (CH_MARKET_DATA, CH_BRAIN_STATE, CH_DECISION, CH_HOMEOSTASIS, CH_VOTES)
+                          for c in canales_simbolos(base)], "brain_monitor")
 
     view = {
         "time": "---", "regime": "N/A", "consenso": 0.0,
@@ -57,17 +58,17 @@ def main():
     with Live(generar_dashboard(view), refresh_per_second=2) as live:
         for message in pubsub.listen():
             if message['type'] == 'message':
-                canal = message['channel'].decode('utf-8')
-                data = json.loads(message['data'])
+                canal, simbolo = separar_canal(message['channel'])
+                data = decodificar(message['data'])
 
                 if canal == CH_MARKET_DATA:
-                    view["time"] = data.get('Timestamp', '---')
+                    view["time"] = f"{data.get('Timestamp', '---')} {simbolo}"
                 elif canal == CH_BRAIN_STATE:
-                    view["regime"] = data.get('regime_id', '?')
+                    view["regime"] = f"{simbolo}: {data.get('regime_id', '?')}"
                 elif canal == CH_VOTES:
-                    view["votos_activos"][data['experto_id']] = data['voto']
+                    view["votos_activos"][f"{data['experto_id']}@{simbolo}"] = data['voto']
                 elif canal == CH_DECISION:
-                    view["ultima_accion"] = data.get('action')
+                    view["ultima_accion"] = f"{data.get('action')} {simbolo}"
                     view["consenso"] = data.get('consenso', 0.0)
                 elif canal == CH_HOMEOSTASIS:
                     view["open_orders"] = data.get('open_orders')
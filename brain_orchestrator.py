@@ -3,8 +3,13 @@ import threading
 import sys
 import os
 import datetime
+import redis
 from colorama import Fore, Style, init
 
+from config import CH_VESTIBULAR, INFERENCIA_MODO, LOG_CONSOLA_NEURONAS, REDIS_HOST, REDIS_PORT
+from caja_negra import CajaNegra
+from supervisor_neuronas import Supervisor, detener_procesos
+
 init(autoreset=True)
 
 # Crear carpeta de logs si no existe
@@ -25,34 +30,36 @@ COLORES = {
     "n_momentum": Fore.BLUE,              
     "n_visual": Fore.BLUE,                
     "n_guardian_vestibular": Fore.RED,      
+    "nucleo_percepcion": Fore.CYAN,
+    "recolector_latencia": Fore.WHITE,
+    "mt5_gateway": Fore.GREEN,
+    "supervisor": Fore.YELLOW,
 }
 
-def guardar_en_log(mensaje):
-    """Escribe el mensaje en el archivo de log maestro."""
-    with open(MASTER_LOG_FILE, "a", encoding="utf-8") as f:
-        f.write(mensaje + "\n")
+# Neuronas ligeras que comparten proceso (nucleo_fusionado.py): se comunican en memoria.
+# `internos` = canales que solo escuchan neuronas del mismo núcleo (no se publican en Redis).
+NUCLEOS_FUSIONADOS = {
+    "nucleo_percepcion": {
+        "neuronas": ["n_talamo", "n_vestibular", "n_guardian_vestibular"],
+        "internos": [CH_VESTIBULAR],
+    },
+}
 
-def capturar_flujo(proceso, nombre):
-    """Lee la salida de cada .py, la colorea y la guarda en disco."""
+def capturar_flujo(proceso, nombre, caja):
+    """Lee la salida de cada .py y la entrega a la Caja Negra (ella escribe disco y consola)."""
     for linea in iter(proceso.stdout.readline, b''):
         try:
             texto = linea.decode('utf-8', errors='replace').strip()
-            if not texto: continue
-            
-            color = COLORES.get(nombre, Fore.WHITE)
-            ts_real = datetime.datetime.now().strftime("%H:%M:%S")
-            mensaje_formateado = f"[{ts_real}] [{nombre.upper()}] {texto}"
-            
-            # 1. Mostrar en pantalla
-            print(f"{color}{mensaje_formateado}")
-            
-            # 2. Guardar en Caja Negra
-            guardar_en_log(mensaje_formateado)
-            
+            if texto:
+                caja.anotar(nombre, texto)
         except Exception:
             pass
 
-def lanzar_cerebro():
+def lanzar_cerebro(supervisado=False):
+    """
+    Sin supervisor: lanza los scripts y espera. Con `--supervisor`: latidos, reinicio con backoff,
+    afinidad/prioridad de CPU y el Gateway incluido, retenido hasta que votan todos los expertos.
+    """
     scripts = [
         "lobulo_percepcion/sensor_feeder.py",
         "lobulo_percepcion/n_talamo.py",
@@ -62,42 +69,72 @@ def lanzar_cerebro():
         "lobulo_riesgo/n_homeostasis.py",
         "lobulo_riesgo/n_guardian_vestibular.py",
         "lobulo_ejecucion/n_ejecutor.py",
-        "lobulo_riesgo/n_log_hipocampo.py" # Añadimos el hipocampo a la lista
+        "lobulo_riesgo/n_log_hipocampo.py", # Añadimos el hipocampo a la lista
+        "recolector_latencia.py"
     ]
 
+    if INFERENCIA_MODO == "servidor":
+        # Un solo proceso con TensorFlow para todos los expertos ML
+        scripts.insert(0, "lobulo_percepcion/servidor_inferencia.py")
+    if supervisado:
+        scripts.append("lobulo_ejecucion/mt5_gateway.py")
+
     print(f"{Fore.GREEN}--- 🧠 Iniciando Organismo Digital con Caja Negra Activa ---")
     print(f"{Fore.YELLOW} Archivo de log: {MASTER_LOG_FILE}")
+    if LOG_CONSOLA_NEURONAS:
+        print(f"{Fore.YELLOW} Consola: solo {', '.join(LOG_CONSOLA_NEURONAS)} (más avisos y errores)")
+    caja = CajaNegra(MASTER_LOG_FILE, COLORES)
     
     env = os.environ.copy()
     env["PYTHONIOENCODING"] = "utf-8"
     env["PYTHONPATH"] = os.getcwd()
 
+    # Las neuronas fusionadas se lanzan dentro de su núcleo, no como script propio
+    fusionadas = {n for nucleo in NUCLEOS_FUSIONADOS.values() for n in nucleo["neuronas"]}
+    comandos = [(os.path.basename(s).replace('.py', ''), [sys.executable, os.path.normcase(s)])
+                for s in scripts if os.path.basename(s).replace('.py', '') not in fusionadas]
+    for nombre, nucleo in NUCLEOS_FUSIONADOS.items():
+        comandos.append((nombre, [sys.executable, "nucleo_fusionado.py", *nucleo["neuronas"],
+                                  "--nombre", nombre, "--internos", *nucleo["internos"]]))
+
+    r = redis.Redis(host=REDIS_HOST, port=REDIS_PORT)
+    if supervisado:
+        capturar = lambda proc, nombre: threading.Thread(target=capturar_flujo, args=(proc, nombre, caja), daemon=True).start()
+        supervisor = Supervisor(r, comandos, env, capturar,
+                                lambda texto: caja.anotar("supervisor", texto))
+        print(f"{Fore.YELLOW} Modo supervisor: {len(comandos)} procesos vigilados por latido")
+        try:
+            supervisor.correr()
+        except KeyboardInterrupt:
+            print(f"\n{Fore.RED}🛑 Apagando organismo...")
+        finally:
+            caja.cerrar()
+        return
+
     procesos = []
-    for s in scripts:
-        script_path = os.path.normcase(s)
-        nombre = os.path.basename(s).replace('.py', '')
-        
+    for nombre, comando in comandos:
         try:
             proc = subprocess.Popen(
-                [sys.executable, script_path], 
+                comando, 
                 stdout=subprocess.PIPE, 
                 stderr=subprocess.STDOUT,
                 env=env,
                 text=False 
             )
-            t = threading.Thread(target=capturar_flujo, args=(proc, nombre), daemon=True)
+            t = threading.Thread(target=capturar_flujo, args=(proc, nombre, caja), daemon=True)
             t.start()
-            procesos.append(proc)
+            procesos.append((nombre, proc))
         except Exception as e:
             print(f"Error al lanzar {nombre}: {e}")
 
     try:
-        for p in procesos:
+        for _, p in procesos:
             p.wait()
     except KeyboardInterrupt:
         print(f"\n{Fore.RED}🛑 Apagando organismo...")
-        for p in procesos:
-            p.terminate()
+        detener_procesos(r, procesos)
+    finally:
+        caja.cerrar()
 
 if __name__ == "__main__":
-    lanzar_cerebro()
\ No newline at end of file
+    lanzar_cerebro(supervisado="--supervisor" in sys.argv[1:])
\ No newline at end of file
@@ -0,0 +1,145 @@
+"""
+Caja Negra del orquestador: un solo escritor para el log maestro y la consola.
+
+Los hilos lectores (uno por proceso hijo) solo encolan (neurona, hora, texto) en una cola
+acotada. Un hilo escritor:
+- Junta lo que haya en la cola (hasta LOG_LOTE líneas) y lo escribe de una vez en el archivo,
+  que mantiene abierto. Al pasar LOG_MAX_BYTES rota a `<log>.1.txt`, `<log>.2.txt`, ...
+- Hace eco en consola solo de las neuronas de LOG_CONSOLA_NEURONAS (vacío = todas) y como mucho
+  LOG_CONSOLA_LINEAS_SEG líneas por segundo y neurona. Los avisos y errores siempre salen.
+
+Con la cola por encima de LOG_COLA_PRESION, las líneas normales se descartan (y se cuentan);
+las prioritarias esperan sitio. Cada LOG_RESUMEN_SEG se anota un resumen de lo descartado y de
+lo silenciado en consola.
+"""
+import os
+import sys
+import time
+import queue
+import datetime
+import threading
+from collections import Counter
+
+from colorama import Fore, Style
+
+sys.path.append(os.getcwd())
+from config import (LOG_COLA_MAX, LOG_COLA_PRESION, LOG_LOTE, LOG_MAX_BYTES, LOG_CONSOLA_NEURONAS,
+                    LOG_CONSOLA_LINEAS_SEG, LOG_RESUMEN_SEG)
+
+# Líneas que nunca se descartan ni se silencian
+MARCAS_PRIORITARIAS = ("❌", "⚠️", "🛑", "🚨", "Traceback", "Error", "ERROR", "Exception")
+_FIN = None
+
+
+def es_prioritaria(texto):
+    return any(m in texto for m in MARCAS_PRIORITARIAS)
+
+
+class CajaNegra:
+    def __init__(self, ruta, colores=None, consola=LOG_CONSOLA_NEURONAS):
+        self.ruta = ruta
+        self.base, self.ext = os.path.splitext(ruta)
+        self.rotaciones = 0
+        self.colores = colores or {}
+        self.consola = set(consola)
+        self.cola = queue.Queue(maxsize=LOG_COLA_MAX)
+        self.umbral = int(LOG_COLA_MAX * LOG_COLA_PRESION)
+        self.descartadas = Counter()  # Por neurona; se suman desde los hilos lectores
+        self.lock_descartes = threading.Lock()
+        self.silenciadas = Counter()  # Solo las toca el escritor
+        self.cupos = {}               # {neurona: (segundo, líneas mostradas)}
+        self.f = open(ruta, "a", encoding="utf-8")
+        self.escritor = threading.Thread(target=self.escribir, daemon=True)
+        self.escritor.start()
+
+    def anotar(self, nombre, texto):
+        """Lo llaman los hilos lectores: no toca disco ni consola."""
+        item = (nombre, time.time(), texto)
+        if es_prioritaria(texto):
+            self.cola.put(item)
+            return
+        if self.cola.qsize() >= self.umbral:
+            with self.lock_descartes:
+                self.descartadas[nombre] += 1
+            return
+        try:
+            self.cola.put_nowait(item)
+        except queue.Full:
+            with self.lock_descartes:
+                self.descartadas[nombre] += 1
+
+    def mostrar(self, nombre, texto, segundo):
+        """¿Sale en consola? Filtro por neurona y cupo de líneas por segundo."""
+        if es_prioritaria(texto):
+            return True
+        if self.consola and nombre not in self.consola:
+            return False
+        seg, usadas = self.cupos.get(nombre, (None, 0))
+        if seg != segundo:
+            seg, usadas = segundo, 0
+        if usadas >= LOG_CONSOLA_LINEAS_SEG:
+            self.silenciadas[nombre] += 1
+            return False
+        self.cupos[nombre] = (seg, usadas + 1)
+        return True
+
+    def _rotar(self):
+        self.f.close()
+        self.rotaciones += 1
+        self.f = open(f"{self.base}.{self.rotaciones}{self.ext}", "a", encoding="utf-8")
+
+    def _resumen(self):
+        with self.lock_descartes:
+            descartadas, self.descartadas = self.descartadas, Counter()
+        silenciadas, self.silenciadas = self.silenciadas, Counter()
+        lineas = []
+        if descartadas:
+            lineas.append("🗑️ Líneas descartadas por presión: " + ", ".join(f"{n}={c}" for n, c in descartadas.most_common()))
+        if silenciadas:
+            lineas.append("🔇 Silenciadas en consola: " + ", ".join(f"{n}={c}" for n, c in silenciadas.most_common()))
+        return lineas
+
+    def escribir(self):
+        """Hilo escritor único."""
+        siguiente_resumen = time.monotonic() + LOG_RESUMEN_SEG
+        fin = False
+        while not fin:
+            try:
+                lote = [self.cola.get(timeout=1.0)]
+            except queue.Empty:
+                lote = []
+            while len(lote) < LOG_LOTE:
+                try:
+                    lote.append(self.cola.get_nowait())
+                except queue.Empty:
+                    break
+            if _FIN in lote:
+                fin = True
+                lote = [i for i in lote if i is not _FIN]
+
+            archivo, pantalla = [], []
+            for nombre, ts, texto in lote:
+                linea = f"[{datetime.datetime.fromtimestamp(ts).strftime('%H:%M:%S')}] [{nombre.upper()}] {texto}"
+                archivo.append(linea)
+                if self.mostrar(nombre, texto, int(ts)):
+                    pantalla.append(f"{self.colores.get(nombre, Fore.WHITE)}{linea}{Style.RESET_ALL}")
+
+            if fin or time.monotonic() >= siguiente_resumen:
+                siguiente_resumen = time.monotonic() + LOG_RESUMEN_SEG
+                for linea in self._resumen():
+                    archivo.append(linea)
+                    pantalla.append(f"{Fore.YELLOW}{linea}{Style.RESET_ALL}")
+
+            if archivo:
+                self.f.write("\n".join(archivo) + "\n")
+                self.f.flush()
+                if self.f.tell() >= LOG_MAX_BYTES:
+                    self._rotar()
+            if pantalla:
+                print("\n".join(pantalla), flush=True)
+        self.f.close()
+
+    def cerrar(self, timeout=5.0):
+        """Vacía la cola, anota el último resumen y cierra el archivo."""
+        self.cola.put(_FIN)
+        self.escritor.join(timeout)
@@ -0,0 +1,126 @@
+"""
+Codec de la Médula Espinal: formato binario versionado para los canales calientes.
+
+Trama binaria (little-endian):
+    [0xCB][id esquema][versión] [máscara de presencia] [campos fijos] [textos] [extras JSON]
+
+- Los campos fijos (float64 / int64 / bool) van en un único struct precompilado.
+- Los textos (Timestamp, experto_id...) van con prefijo de longitud uint32.
+- La máscara distingue "campo ausente" de "campo a cero", así `data.get(k, default)`
+  se comporta igual que con JSON.
+- Lo que no está en el esquema (o no encaja en su tipo) viaja en un apéndice JSON:
+  nunca se pierde información aunque el registro vaya por detrás del productor.
+
+`decodificar` acepta siempre ambos formatos (JSON empieza por '{', nunca por 0xCB),
+lo que permite migrar productores de uno en uno con WIRE_FORMATO.
+"""
+import os
+import sys
+import json
+import struct
+
+sys.path.append(os.getcwd())
+from config import WIRE_FORMATO, ESQUEMAS_WIRE
+from traza_medula import sellar
+
+MAGIC = 0xCB
+_CABECERA = struct.Struct("<BBB")
+_LONGITUD = struct.Struct("<I")
+_FORMATOS = {"f": "d", "i": "q", "b": "?"}
+
+
+_TIPOS_PY = {"f": float, "i": int, "b": bool, "s": str}
+_CEROS = {"f": 0.0, "i": 0, "b": False}
+
+
+class Esquema:
+    """Disposición fija de un canal: campos numéricos primero, textos después."""
+
+    def __init__(self, id_esquema, version, campos):
+        self.id = id_esquema
+        self.version = version
+        fijos = [(n, t) for n, t in campos if t != "s"]
+        self.nombres_fijos = [n for n, _ in fijos]
+        self.tipos_fijos = [_TIPOS_PY[t] for _, t in fijos]
+        self.ceros = [_CEROS[t] for _, t in fijos]
+        self.textos = [n for n, t in campos if t == "s"]
+        self.tipos = {n: _TIPOS_PY[t] for n, t in campos}
+        self.struct = struct.Struct("<" + "".join(_FORMATOS[t] for _, t in fijos))
+        self.bits = [1 << b for b in range(len(campos))]
+        self.completa_fijos = (1 << len(fijos)) - 1
+        self.bytes_mascara = (len(campos) + 7) // 8
+        self.cabecera = _CABECERA.pack(MAGIC, self.id, self.version)
+
+    def codificar(self, data):
+        valores = [data.get(n) for n in self.nombres_fijos]
+        encajan = [type(v) is t for v, t in zip(valores, self.tipos_fijos)]
+        mascara = sum(b for ok, b in zip(encajan, self.bits) if ok)
+        if mascara != self.completa_fijos:
+            valores = [v if ok else c for v, ok, c in zip(valores, encajan, self.ceros)]
+
+        textos = []
+        bit = len(self.nombres_fijos)
+        for nombre in self.textos:
+            v = data.get(nombre)
+            if type(v) is str:
+                crudo = v.encode("utf-8")
+                mascara |= 1 << bit
+                textos.append(_LONGITUD.pack(len(crudo)) + crudo)
+            bit += 1
+
+        # Campos fuera del esquema o con otro tipo: apéndice JSON
+        tipos = self.tipos
+        extras = {k: v for k, v in data.items() if type(v) is not tipos.get(k)}
+        partes = [self.cabecera, mascara.to_bytes(self.bytes_mascara, "little"), self.struct.pack(*valores)]
+        partes.extend(textos)
+        if extras:
+            partes.append(json.dumps(extras).encode("utf-8"))
+        return b"".join(partes)
+
+    def decodificar(self, buf):
+        pos = _CABECERA.size
+        mascara = int.from_bytes(buf[pos:pos + self.bytes_mascara], "little")
+        pos += self.bytes_mascara
+        valores = self.struct.unpack_from(buf, pos)
+        pos += self.struct.size
+
+        if mascara & self.completa_fijos == self.completa_fijos:
+            data = dict(zip(self.nombres_fijos, valores))
+        else:
+            data = {n: v for n, v, b in zip(self.nombres_fijos, valores, self.bits) if mascara & b}
+        bit = len(self.nombres_fijos)
+        for nombre in self.textos:
+            if mascara >> bit & 1:
+                (n,) = _LONGITUD.unpack_from(buf, pos)
+                pos += _LONGITUD.size
+                data[nombre] = bytes(buf[pos:pos + n]).decode("utf-8")
+                pos += n
+            bit += 1
+        if pos < len(buf):
+            data.update(json.loads(bytes(buf[pos:]).decode("utf-8")))
+        return data
+
+
+_POR_CANAL = {canal: Esquema(id_e, ver, campos) for canal, (id_e, ver, campos) in ESQUEMAS_WIRE.items()}
+_POR_ID = {(e.id, e.version): e for e in _POR_CANAL.values()}
+
+
+def codificar(canal, data, formato=None):
+    """Serializa `data` para `canal` (con o sin sufijo de símbolo). Sin esquema (o en modo "json") usa JSON."""
+    formato = formato or WIRE_FORMATO
+    data = sellar(canal, data)
+    esquema = _POR_CANAL.get(canal.partition(":")[0])
+    if formato == "binario" and esquema is not None:
+        return esquema.codificar(data)
+    return json.dumps(data)
+
+
+def decodificar(raw):
+    """Inverso de `codificar`: detecta el formato por el primer byte."""
+    if isinstance(raw, (bytes, bytearray, memoryview)) and len(raw) and raw[0] == MAGIC:
+        id_e, version = raw[1], raw[2]
+        esquema = _POR_ID.get((id_e, version))
+        if esquema is None:
+            raise ValueError(f"Esquema wire desconocido: id={id_e} v{version}. Actualiza ESQUEMAS_WIRE.")
+        return esquema.decodificar(raw)
+    return json.loads(raw)
@@ -3,6 +3,24 @@ import os
 REDIS_HOST = 'localhost'
 REDIS_PORT = 6379
 
+# Universo de Símbolos (multi-símbolo)
+# Cada canal de flujo/control se namespacea por símbolo: 'market_data_stream:BTCUSD'.
+SIMBOLOS = [s for s in os.environ.get("CEREBRO_SIMBOLOS", "BTCUSD").split(",") if s]
+SIMBOLO_DEFECTO = SIMBOLOS[0]
+FEEDER_PROCESOS = 1           # Procesos del feeder; los símbolos se reparten en shards
+
+def canal_simbolo(base, simbolo=SIMBOLO_DEFECTO):
+    return f"{base}:{simbolo}"
+
+def canales_simbolos(base, simbolos=None):
+    return [canal_simbolo(base, s) for s in (SIMBOLOS if simbolos is None else simbolos)]
+
+def separar_canal(nombre):
+    """'market_data_stream:BTCUSD' -> ('market_data_stream', 'BTCUSD'). Acepta bytes."""
+    if isinstance(nombre, bytes): nombre = nombre.decode('utf-8')
+    base, _, simbolo = nombre.partition(':')
+    return base, (simbolo or SIMBOLO_DEFECTO)
+
 # Canales de Flujo
 CH_MARKET_DATA = 'market_data_stream'
 CH_VESTIBULAR = 'vestibular_perception'
@@ -10,12 +28,184 @@ CH_BRAIN_PULSE = 'brain_raw_pulse'
 CH_BRAIN_STATE = 'brain_consensus_state'
 CH_VOTES = 'expert_votes_stream'
 CH_DECISION = 'brain_decision'
+CH_HTF_CONTEXT = 'htf_context_stream'
+CH_TICKS = 'tick_stream'
+KEY_HTF_CONTEXT = 'htf_context_data'
 
 # Canales de Control
 CH_RESULTS = 'reporte_operativa'
 CH_BLOCK = 'brain_block_signal'
 CH_HOMEOSTASIS = 'homeostasis_status'
+CH_REPLAY_ACK = 'replay_ack'
+CH_CONTROL_MODELOS = 'control_modelos'
+CH_REPUTACION = 'reputacion_delta'
+
+# Reloj de Velas del Feeder (segundos)
+FEEDER_GRACIA_SEG = 0.2       # Margen tras el cierre para velas tardías del broker
+FEEDER_REINTENTO_SEG = 0.05   # Sondeo corto mientras la vela nueva no aparece
+FEEDER_ESPERA_MAX_SEG = 5.0   # Tope de espera antes de rendirse hasta la próxima frontera
+
+# Ingesta del Feeder: "velas" (copy_rates por cierre de vela) o "ticks" (copy_ticks_from + velas locales)
+FEEDER_MODO = os.environ.get("CEREBRO_FEEDER_MODO", "velas")
+FEEDER_TICK_POLL_SEG = 0.05   # Pausa entre consultas incrementales de ticks
+FEEDER_TICKS_LOTE = 5000      # Máximo de ticks por consulta (si se llena, se vuelve a pedir)
+FEEDER_VELAS_LOCALES = 512    # Capacidad del buffer circular de velas agregadas por timeframe
+
+# Replay Histórico (sensor_feeder)
+REPLAY_VELOCIDAD = "ack"      # 0 = máxima, 1.0 = tiempo real, N = N×, "ack" = al ritmo de las confirmaciones
+REPLAY_CHUNK = 50000          # Filas leídas del CSV por bloque
+REPLAY_LOTE = 500             # Mensajes por pipeline de Redis
+# n_ejecutor confirma al cerrar la barrera de votos de la vela (decisión ya publicada)
+REPLAY_VENTANA_ACK = 64       # Modo "ack": velas en vuelo sin confirmar (1 = paso a paso estricto, determinista)
+REPLAY_CONSUMIDORES_ACK = ["n_talamo", "n_vestibular", "n_momentum", "n_visual", "n_homeostasis", "n_ejecutor"]
+REPLAY_ACK_TIMEOUT_SEG = 5.0  # Sin ack en este tiempo se comprueba si la neurona sigue viva
+REPLAY_ACK_REINTENTOS = 6     # Plazos seguidos sin ack de una neurona viva antes de abortar el replay
+
+# Backend de MetaTrader 5: "real" (terminal Windows) o "simulado" (mt5_simulado.py)
+MT5_BACKEND = os.environ.get("CEREBRO_MT5_BACKEND", "real")
+MT5_SIM_DATOS = "data/Dataset_Con_Regimenes.csv"
+MT5_SIM_VELOCIDAD = 1.0       # Reloj simulado respecto al real (60 = una vela M1 por segundo)
+MT5_SIM_INICIO = 400          # Vela de arranque: deja histórico para sembrar indicadores
+MT5_SIM_LATENCIA_MS = 40.0    # Latencia de llenado por order_send
+MT5_SIM_SLIPPAGE_PUNTOS = 5.0 # Desviación típica del slippage (en puntos)
+MT5_SIM_SPREAD_PUNTOS = 10    # Spread si el CSV no trae columna spread
+MT5_SIM_SEMILLA = 42
+MT5_SIM_TICKS_POR_VELA = 12  # Cadencia de ticks sintéticos (12 = uno cada 5 s de mercado)
+
+# Gateway MT5 (lobulo_ejecucion/mt5_gateway.py)
+GATEWAY_REINTENTOS = 3        # Intentos por ticket
+GATEWAY_TICK_MAX_EDAD_MS = 100.0  # Un tick más viejo que esto se vuelve a pedir al terminal
+GATEWAY_TICK_POLL_MS = 25.0       # Cadencia del hilo que mantiene caliente el último tick
+GATEWAY_METADATOS_SEG = 300.0     # Refresco periódico de symbol_info (también tras errores del servidor)
+GATEWAY_VENTANA_AGRUPAR_MS = 20.0 # Decisiones en la misma dirección dentro de la ventana = una orden (0 = sin agrupar)
+GATEWAY_MAX_AGRUPADAS = 10        # Órdenes lógicas por orden física
+GATEWAY_LOTE_MAX = 1.0            # Volumen máximo de una orden agrupada (además del volume_max del símbolo)
+
+# Servidor de Inferencia (servidor_inferencia.py)
+# "local" = cada experto carga su modelo; "servidor" = un solo proceso con TF sirve a todos
+INFERENCIA_MODO = os.environ.get("CEREBRO_INFERENCIA", "local")
+MODELOS_SERVIDOS = ["cerebro_hft_alpha"]  # Nombres del registro de modelos
+KEY_INFERENCIA_COLA = 'inferencia_peticiones'
+INFERENCIA_LOTE_MAX = 64      # Peticiones por llamada al modelo
+INFERENCIA_DEADLINE_MS = 2.0  # Espera máxima para juntar un lote tras la primera petición
+INFERENCIA_TIMEOUT_MS = 250.0 # El experto deja de esperar (y el servidor descarta) tras este tiempo
+
+# Transporte de la Médula Espinal (transporte_medula.py)
+# "pubsub" = PUBLISH/SUBSCRIBE (sin memoria); "streams" = Redis Streams con grupos de consumo
+MEDULA_TRANSPORTE = os.environ.get("CEREBRO_TRANSPORTE", "pubsub")
+STREAM_MAXLEN = 20000         # Mensajes retenidos por canal (aproximado)
+STREAM_LOTE = 100             # Mensajes por XREADGROUP
+STREAM_BLOQUEO_MS = 1000
+STREAM_REPORTE_LAG_SEG = 5.0
+STREAM_LAG_TOPE = 1000        # Redis < 7 no da "lag" en XINFO GROUPS: se cuenta con XRANGE hasta este tope
+KEY_MEDULA_LAG = 'medula_lag'
+
+# Memoria reciente y estado de neuronas (arranque en caliente tras un reinicio)
+# Con "pubsub" los canales de CANALES_CON_HISTORIA se guardan además en una lista acotada;
+# con "streams" la historia es el propio stream.
+CANALES_CON_HISTORIA = [CH_MARKET_DATA]
+KEY_HISTORIA = 'historia_medula'
+HISTORIA_MAXLEN = 512         # Mensajes retenidos por canal (>= ventana del experto más largo)
+KEY_ESTADO_NEURONAS = 'estado_neurona'
+
+# Formato de la Médula Espinal (codec_medula.py)
+# "json" mientras haya consumidores sin migrar; "binario" usa los esquemas de abajo.
+# Los consumidores decodifican ambos formatos siempre.
+WIRE_FORMATO = os.environ.get("CEREBRO_WIRE_FORMATO", "json")
+
+# Registro de campos: canal -> (id de esquema, versión, [(campo, tipo)])
+# Tipos: "f" float64, "i" int64, "b" bool, "s" texto. Cambiar campos = subir la versión.
+CAMPOS_INDICADORES = ["EMA_10", "EMA_20", "EMA_40", "EMA_80", "EMA_160", "EMA_320",
+                      "EMA_Princ", "EMA_Princ_Slope", "RSI_Val", "RSI_Velocidad", "MACD_Val",
+                      "DI_Plus", "DI_Minus", "ADX_Val", "ADX_Diff", "ATR_Act", "ATR_Rel", "Volumen_Relativo"]
+ESQUEMAS_WIRE = {
+    CH_MARKET_DATA: (1, 2, [("Timestamp", "s"), ("Close_Price", "f"), ("time", "f"), ("open", "f"),
+                            ("high", "f"), ("low", "f"), ("tick_volume", "f"), ("spread", "f"),
+                            ("real_volume", "f")]
+                           + [(c, "f") for c in CAMPOS_INDICADORES]
+                           + [(f"prob_regimen_{i}", "f") for i in range(7)] + [("traza", "s")]),
+    CH_VOTES: (2, 3, [("experto_id", "s"), ("voto", "i"), ("confianza", "f"), ("Timestamp", "s"), ("meta", "s"),
+                      ("modelo_version", "s"), ("traza", "s")]),
+    CH_BRAIN_PULSE: (3, 2, [("Timestamp", "s"), ("Close_Price", "f"), ("regime_id", "i"), ("confidence", "f"),
+                            ("traza", "s")]),
+    CH_BRAIN_STATE: (4, 2, [("Timestamp", "s"), ("regime_id", "i"), ("Close_Price", "f"), ("consenso_actual", "f"),
+                            ("traza", "s")]),
+    CH_DECISION: (5, 2, [("action", "s"), ("price_at_entry", "f"), ("regime", "i"), ("consenso", "f"),
+                         ("Timestamp", "s"), ("reason", "s"), ("traza", "s")]),
+    CH_TICKS: (6, 1, [("time_msc", "i"), ("bid", "f"), ("ask", "f"), ("last", "f"), ("volume", "f")]),
+    CH_BLOCK: (7, 1, [("expira", "f"), ("razon", "s")]),
+}
+
+# Trazas de latencia (traza_medula.py / recolector_latencia.py)
+# Canales cuyos payloads llevan "traza"; los orígenes la abren (valor = periodo de la vela en s)
+TRAZA_CANALES = [CH_MARKET_DATA, CH_BRAIN_PULSE, CH_VOTES, CH_BRAIN_STATE, CH_DECISION, CH_RESULTS]
+TRAZA_ORIGENES = {CH_MARKET_DATA: 60}
+TRAZA_SALTO_LENTO_MS = 50.0   # Un tramo por encima de esto se avisa
+TRAZA_REPORTE_SEG = 10.0
+KEY_LATENCIA_TRAZAS = 'latencia_trazas'
 
 # Riesgo y Rutas
 SL_MAXIMO_DIARIO = -10000.00
-PATH_MATRIZ_REPUTACION = "modelos/matriz_reputacion.json"
\ No newline at end of file
+BLOQUEO_POST_CIERRE_SEG = 10  # Periodo refractario tras cerrar un clúster (por símbolo)
+INSTANTANEA_MAX_PNL_SEG = 1.0 # Homeostasis: un nuevo máximo flotante se persiste como mucho una vez por segundo
+
+# Consenso por vela (lobulo_ejecucion/barrera_votos.py)
+EXPERTOS_CONSENSO = ["ia_visual_alpha_v1", "momentum_v1", "guardian_vestibular_v1"]
+EXPERTO_GUARDIAN = "guardian_vestibular_v1"
+CONSENSO_DEADLINE_MS = 250.0  # Espera máxima desde el pulso por los votos que falten
+CONSENSO_REPORTE = 100        # Cada cuántas decisiones se publica el SLO
+KEY_CONSENSO_SLO = 'consenso_slo'
+PATH_MATRIZ_REPUTACION = "modelos/matriz_reputacion.json"  # Solo para importar: la matriz viva está en KEY_REPUTACION
+KEY_REPUTACION = 'matriz_reputacion'
+N_REGIMENES = 7
+PATH_REGISTRO_MODELOS = "modelos/registro.json"
+
+# Diario del Hipocampo (lobulo_riesgo/diario_hipocampo.py)
+DIARIO_DIR = "bitacora_trading"
+DIARIO_LOTE = 256          # Registros por volcado
+DIARIO_FLUSH_SEG = 5.0     # Volcado máximo tras el primer registro pendiente
+
+# Caja Negra del orquestador (caja_negra.py)
+LOG_COLA_MAX = 20000              # Líneas en vuelo entre los lectores y el escritor
+LOG_COLA_PRESION = 0.8            # Por encima de esta fracción se descartan las líneas normales
+LOG_LOTE = 1000                   # Líneas por escritura
+LOG_MAX_BYTES = 50 * 1024 * 1024  # Rotación del log maestro
+LOG_CONSOLA_NEURONAS = [n for n in os.environ.get("CEREBRO_CONSOLA", "").split(",") if n]  # Vacío = todas
+LOG_CONSOLA_LINEAS_SEG = 20       # Eco máximo en consola por neurona
+LOG_RESUMEN_SEG = 60.0
+
+# Latidos y Supervisor (latido_medula.py / supervisor_neuronas.py)
+KEY_LATIDO = 'latido'              # latido:<proceso> -> hash {pid, estado, arranque, listo_seg, t}
+LATIDO_SEG = 1.0
+LATIDO_TTL_SEG = 5                 # Sin latido en este tiempo el proceso se da por colgado
+LATIDO_COLGADO_SEG = 30.0          # Un mensaje procesándose más que esto detiene el latido
+KEY_PARADA = 'parada'              # parada:<proceso>: parada ordenada (también en Windows, sin SIGTERM)
+PARADA_ESPERA_SEG = 5.0            # Plazo para salir por su cuenta antes de terminarlo a la fuerza
+PARADA_OCUPADO_SEG = 3.0           # Lo que una parada espera a que acabe el mensaje en curso (< PARADA_ESPERA_SEG)
+SUPERVISOR_ARRANQUE_MAX_SEG = 180.0  # Plazo para reportar "listo" (carga de TF incluida)
+SUPERVISOR_BACKOFF_SEG = 1.0       # Espera del primer reinicio; se duplica en cada caída seguida
+SUPERVISOR_BACKOFF_MAX_SEG = 60.0
+SUPERVISOR_ESTABLE_SEG = 120.0     # Vivo este tiempo: el backoff vuelve al inicio
+# Neuronas cuyo voto hace falta antes de dejar arrancar al Gateway
+NEURONAS_VOTANTES = ["n_visual", "n_momentum", "n_guardian_vestibular"]
+DEPENDENCIAS_ARRANQUE = {"mt5_gateway": NEURONAS_VOTANTES}  # El Supervisor no lanza al proceso hasta que estén listas
+KEY_SUPERVISOR = 'supervisor_estado'
+# Aislamiento de CPU por proceso: las críticas en núcleos propios, las pesadas en el resto
+AFINIDAD_CPU = {
+    "sensor_feeder": [0],
+    "n_ejecutor": [1],
+    "mt5_gateway": [2],
+    "n_visual": [3, 4, 5],
+    "servidor_inferencia": [3, 4, 5],
+    "n_log_hipocampo": [6],
+    "recolector_latencia": [6],
+}
+PRIORIDAD_PROCESOS = {  # nice (Linux) / clase de prioridad equivalente (Windows, con psutil)
+    "sensor_feeder": -5,
+    "n_ejecutor": -5,
+    "mt5_gateway": -5,
+    "n_visual": 5,
+    "servidor_inferencia": 5,
+    "n_log_hipocampo": 10,
+    "recolector_latencia": 10,
+}
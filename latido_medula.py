@@ -0,0 +1,176 @@
+"""
+Latidos de las neuronas para el Supervisor (supervisor_neuronas.py).
+
+Cada proceso arranca un `Latido`: un hilo que cada LATIDO_SEG escribe el hash
+`latido:<proceso>` (pid, estado, arranque, segundos hasta estar listo) con caducidad
+LATIDO_TTL_SEG. El proceso llama a `listo()` cuando ya puede trabajar (modelo cargado,
+ventana hidratada, suscrito). Un núcleo fusionado late también con el nombre de cada neurona
+que aloja (`alias`), así quien espera a `n_guardian_vestibular` no necesita saber dónde vive.
+
+Para detectar cuelgues, el bucle principal recorre sus mensajes con `latido.escuchar(pubsub)`:
+si un mensaje lleva más de LATIDO_COLGADO_SEG procesándose (p. ej. TF atascado) el hilo deja de
+latir, la clave caduca y el Supervisor reinicia el proceso.
+
+Parada ordenada: quien para un proceso escribe `parada:<proceso>` (`pedir_parada`). El hilo del
+latido lo ve en su siguiente vuelta, deja de admitir mensajes nuevos, espera (hasta
+PARADA_OCUPADO_SEG) a que termine el que está en `ocupado()`, ejecuta lo registrado con `al_parar`
+(p. ej. volcar el diario) y sale con código 0. No depende de señales: en Windows `terminate()` es TerminateProcess y no
+deja correr ningún `finally`.
+"""
+import os
+import sys
+import time
+import threading
+from contextlib import contextmanager
+
+sys.path.append(os.getcwd())
+from config import (KEY_LATIDO, KEY_PARADA, LATIDO_SEG, LATIDO_TTL_SEG, LATIDO_COLGADO_SEG, PARADA_ESPERA_SEG,
+                    PARADA_OCUPADO_SEG)
+
+
+def nombre_proceso():
+    """El Supervisor pasa el nombre en CEREBRO_PROCESO; a mano, el del script."""
+    return os.environ.get("CEREBRO_PROCESO") or os.path.splitext(os.path.basename(sys.argv[0]))[0]
+
+
+def clave_latido(nombre):
+    return f"{KEY_LATIDO}:{nombre}"
+
+
+def clave_parada(nombre):
+    return f"{KEY_PARADA}:{nombre}"
+
+
+def pedir_parada(r, nombre):
+    """El proceso `nombre` saldrá ordenadamente en su próximo latido (caduca si nadie la atiende)."""
+    r.set(clave_parada(nombre), 1, ex=int(PARADA_ESPERA_SEG * 2))
+
+
+class Latido(threading.Thread):
+    def __init__(self, r, nombre=None, alias=()):
+        super().__init__(daemon=True)
+        self.r = r
+        self.nombre = nombre or nombre_proceso()
+        self.claves = [clave_latido(n) for n in dict.fromkeys([self.nombre, *alias])]
+        self.arranque = time.time()
+        self.estado = "arrancando"
+        self.listo_seg = -1.0
+        self.ocupado_desde = None
+        self.avisado = False
+        self.al_parar_funciones = []
+        # Con `parando` activo ocupado() ya no deja empezar otro mensaje; el lock evita que uno
+        # empiece justo entre activarlo y mirar ocupado_desde
+        self.parando = threading.Event()
+        self.lock_ocupado = threading.Lock()
+
+    def run(self):
+        while True:
+            self.revisar_parada()
+            self.latir()
+            time.sleep(LATIDO_SEG)
+
+    def al_parar(self, funcion):
+        """`funcion()` se ejecuta (en este hilo) antes de salir por una parada pedida."""
+        self.al_parar_funciones.append(funcion)
+
+    def revisar_parada(self):
+        try:
+            if not self.r.delete(clave_parada(self.nombre)):
+                return
+        except Exception:
+            return
+        print(f"🛑 {self.nombre}: parada pedida, saliendo.", flush=True)
+        with self.lock_ocupado:
+            self.parando.set()
+        limite = time.monotonic() + PARADA_OCUPADO_SEG
+        while self.ocupado_desde is not None and time.monotonic() < limite:
+            time.sleep(0.01)
+        if self.ocupado_desde is not None:
+            print(f"⚠️ {self.nombre}: el mensaje en curso no terminó en {PARADA_OCUPADO_SEG:.0f} s, se sale igualmente.", flush=True)
+        for funcion in self.al_parar_funciones:
+            try:
+                funcion()
+            except Exception as e:
+                print(f"⚠️ {self.nombre}: error al parar: {e}", flush=True)
+        # El hilo principal puede estar bloqueado leyendo de Redis: se sale sin esperarlo
+        os._exit(0)
+
+    def latir(self):
+        ocupado = self.ocupado_desde
+        if ocupado is not None and time.monotonic() - ocupado > LATIDO_COLGADO_SEG:
+            if not self.avisado:
+                print(f"⚠️ {self.nombre}: un mensaje lleva {time.monotonic() - ocupado:.0f} s procesándose, sin latido.", flush=True)
+                self.avisado = True
+            return
+        self.avisado = False
+        try:
+            latido = {"pid": os.getpid(), "estado": self.estado, "arranque": self.arranque,
+                      "listo_seg": self.listo_seg, "t": time.time()}
+            pipe = self.r.pipeline(transaction=False)
+            for clave in self.claves:
+                pipe.hset(clave, mapping=latido)
+                pipe.expire(clave, LATIDO_TTL_SEG)
+            pipe.execute()
+        except Exception as e:
+            print(f"⚠️ {self.nombre}: latido fallido: {e}", flush=True)
+
+    def listo(self):
+        self.estado = "listo"
+        self.listo_seg = round(time.time() - self.arranque, 3)
+        self.latir()
+        print(f"🟢 {self.nombre} listo en {self.listo_seg:.1f} s", flush=True)
+
+    @contextmanager
+    def ocupado(self):
+        """
+        Marca un trabajo en curso: si dura más de LATIDO_COLGADO_SEG, se deja de latir. Con una
+        parada en marcha no se empieza: el hilo se queda aquí hasta que el latido cierre el proceso.
+        """
+        with self.lock_ocupado:
+            parando = self.parando.is_set()
+            if not parando:
+                self.ocupado_desde = time.monotonic()
+        while parando:
+            time.sleep(LATIDO_SEG)
+        try:
+            yield
+        finally:
+            self.ocupado_desde = None
+
+    def escuchar(self, pubsub):
+        """`pubsub.listen()` marcando como ocupado el tiempo que el bucle pasa con cada mensaje."""
+        for message in pubsub.listen():
+            with self.ocupado():
+                yield message
+
+
+def iniciar_latido(r, nombre=None, alias=()):
+    latido = Latido(r, nombre, alias)
+    latido.start()
+    return latido
+
+
+def leer_latidos(r, nombres):
+    """{nombre: hash del latido ({} si caducó o nunca latió)}."""
+    pipe = r.pipeline(transaction=False)
+    for n in nombres:
+        pipe.hgetall(clave_latido(n))
+    return {n: {k.decode("utf-8"): v.decode("utf-8") for k, v in h.items()}
+            for n, h in zip(nombres, pipe.execute())}
+
+
+def faltan_listos(r, nombres):
+    return [n for n, h in leer_latidos(r, nombres).items() if h.get("estado") != "listo"]
+
+
+def esperar_listos(r, nombres, quien="", aviso_seg=10.0):
+    """Bloquea hasta que todos los `nombres` laten como "listo"."""
+    siguiente_aviso = 0.0
+    while True:
+        faltan = faltan_listos(r, nombres)
+        if not faltan:
+            return
+        if time.monotonic() >= siguiente_aviso:
+            print(f"🚦 {quien or nombre_proceso()} en espera de: {', '.join(faltan)}", flush=True)
+            siguiente_aviso = time.monotonic() + aviso_seg
+        time.sleep(LATIDO_SEG)
@@ -30,16 +30,12 @@ def precalcular_senales_turbo():
     rsi = df.select("RSI_Val").to_numpy().flatten()
     
     print("🧩 Preparando matriz de ventanas (esto usa RAM)...")
-    # Creamos todas las ventanas de golpe usando 'sliding_window_view' de NumPy
-    from numpy.lib.stride_tricks import sliding_window_view
-    windows = sliding_window_view(data_ia, (VENTANA, len(COLUMNAS_IA))).reshape(-1, VENTANA, len(COLUMNAS_IA))
+    # Normalización masiva con el mismo Z-Score rodante que usa n_visual en vivo
+    from lobulo_percepcion.normalizacion import zscore_ventanas
+    marcas = df.select(pl.col("Timestamp").str.to_datetime().dt.epoch("s") // 60).to_numpy().flatten()
+    windows_norm = zscore_ventanas(data_ia, VENTANA, marcas)
     
-    print(f"⚡ Ejecutando IA sobre {len(windows)} velas en paralelo...")
-    # Normalización masiva (vectorizada)
-    # Z-Score: (x - mean) / std
-    means = windows.mean(axis=1, keepdims=True)
-    stds = windows.std(axis=1, keepdims=True) + 1e-8
-    windows_norm = (windows - means) / stds
+    print(f"⚡ Ejecutando IA sobre {len(windows_norm)} velas en paralelo...")
     
     # CARGAR MODELO
     model = tf.keras.models.load_model(MODEL_PATH, compile=False)
@@ -3,6 +3,10 @@ import numpy as np
 import tensorflow as tf
 from tensorflow.keras import layers, models
 import os
+import sys
+
+sys.path.append(os.getcwd())
+from lobulo_percepcion.normalizacion import zscore_ventanas
 
 # CONFIGURACIÓN MAESTRA (Extraída del Trial 15)
 BEST_PARAMS = {
@@ -37,17 +41,15 @@ def crear_modelo_final():
     input_data = df.select(columnas_input).to_numpy()
     labels = df.select("label").to_numpy().flatten()
     
-    X, Y = [], []
     ventana = BEST_PARAMS['ventana']
     
     print("🧠 Extrayendo secuencias temporales...")
-    for i in range(ventana, len(df) - BEST_PARAMS['horizonte']):
-        foto = input_data[i-ventana:i].copy()
-        foto = (foto - np.mean(foto, axis=0)) / (np.std(foto, axis=0) + 1e-8)
-        X.append(foto)
-        Y.append(labels[i])
-    
-    X, Y = np.array(X), np.array(Y)
+    # La foto de la etiqueta i son las `ventana` velas previas (terminan en i-1),
+    # normalizadas con el mismo Z-Score rodante que n_visual en vivo
+    marcas = df.select(pl.col("Timestamp").str.to_datetime().dt.epoch("s") // 60).to_numpy().flatten()
+    indices = np.arange(ventana, len(df) - BEST_PARAMS['horizonte'])
+    X = zscore_ventanas(input_data, ventana, marcas, finales=indices - 1)
+    Y = labels[indices]
 
     # 2. Arquitectura Híbrida CNN-LSTM
     model = models.Sequential([
@@ -0,0 +1,108 @@
+"""
+Barrera de votos por vela para el Ejecutor Maestro.
+
+Los votos y el pulso del Tálamo se agrupan por (símbolo, Timestamp de la vela). Una vela se
+decide en cuanto tiene pulso y votaron todos los expertos esperados para su régimen, o cuando
+vence CONSENSO_DEADLINE_MS desde la llegada del pulso. Un voto que llega después de decidir
+su vela no se mezcla con la siguiente: se cuenta como tardío.
+
+Lógica pura (sin Redis ni hilos): el Ejecutor la alimenta y pregunta qué velas están listas.
+"""
+import time
+from collections import Counter, OrderedDict, deque
+
+
+class BarraVotos:
+    __slots__ = ("simbolo", "ts", "votos", "pulso", "t_pulso", "t_primero", "esperados", "traza", "replay_seq")
+
+    def __init__(self, simbolo, ts):
+        self.simbolo = simbolo
+        self.ts = ts
+        self.votos = {}        # {experto_id: voto} en orden de llegada
+        self.pulso = None      # (regime_id, Close_Price)
+        self.t_pulso = None
+        self.t_primero = time.monotonic()
+        self.esperados = ()
+        self.traza = None      # Traza del último mensaje que llegó: el que completó la vela
+        self.replay_seq = None  # Vela del replay "ack" (viene con el pulso)
+
+    def faltantes(self):
+        return [e for e in self.esperados if e not in self.votos]
+
+
+class BarreraVotos:
+    def __init__(self, esperados, deadline_ms, purga_seg=60.0, recordadas=64):
+        """`esperados(regime_id)` devuelve los expertos cuyo voto hace falta en ese régimen."""
+        self.esperados = esperados
+        self.deadline = deadline_ms / 1000.0
+        self.purga = purga_seg
+        self.abiertas = OrderedDict()   # {(simbolo, ts): BarraVotos}
+        self.decididas = {}             # {simbolo: deque([(ts, t_decision)])}
+        self.recordadas = recordadas
+        self.tardios = Counter()        # Votos que llegaron con su vela ya decidida
+        self.ausentes = Counter()       # Expertos que faltaban al vencer el deadline
+
+    def _barra(self, simbolo, ts):
+        clave = (simbolo, ts)
+        barra = self.abiertas.get(clave)
+        if barra is None:
+            barra = self.abiertas[clave] = BarraVotos(simbolo, ts)
+        return barra
+
+    def _decidida(self, simbolo, ts):
+        for ts_d, t_d in self.decididas.get(simbolo, ()):
+            if ts_d == ts:
+                return t_d
+        return None
+
+    def _cerrar(self, barra):
+        del self.abiertas[(barra.simbolo, barra.ts)]
+        self.decididas.setdefault(barra.simbolo, deque(maxlen=self.recordadas)).append((barra.ts, time.monotonic()))
+        return barra
+
+    def voto(self, simbolo, ts, experto, voto, traza=None):
+        """Registra un voto. Devuelve la barra si quedó completa, o ("tardio", ms) si su vela ya se decidió."""
+        t_decision = self._decidida(simbolo, ts)
+        if t_decision is not None:
+            self.tardios[experto] += 1
+            return "tardio", (time.monotonic() - t_decision) * 1000.0
+        barra = self._barra(simbolo, ts)
+        barra.votos[experto] = voto
+        barra.traza = traza or barra.traza
+        if barra.pulso is not None and not barra.faltantes():
+            return self._cerrar(barra)
+        return None
+
+    def pulso(self, simbolo, ts, regime_id, price, traza=None, replay_seq=None):
+        """Registra el pulso de la vela. Devuelve la barra si ya estaban todos los votos."""
+        if self._decidida(simbolo, ts) is not None:
+            return None
+        barra = self._barra(simbolo, ts)
+        barra.pulso = (regime_id, price)
+        barra.t_pulso = time.monotonic()
+        barra.traza = traza or barra.traza
+        barra.replay_seq = replay_seq
+        barra.esperados = tuple(self.esperados(regime_id))
+        if not barra.faltantes():
+            return self._cerrar(barra)
+        return None
+
+    def vencidas(self):
+        """Barras con pulso cuyo deadline venció (se deciden con los votos presentes)."""
+        ahora = time.monotonic()
+        listas = []
+        for barra in list(self.abiertas.values()):
+            if barra.pulso is not None:
+                if ahora - barra.t_pulso >= self.deadline:
+                    self.ausentes.update(barra.faltantes())
+                    listas.append(self._cerrar(barra))
+            elif ahora - barra.t_primero >= self.purga:
+                # Votos de una vela cuyo pulso nunca llegó
+                del self.abiertas[(barra.simbolo, barra.ts)]
+        return listas
+
+    def espera(self, maximo=1.0):
+        """Segundos hasta el próximo deadline (acotado a `maximo`)."""
+        ahora = time.monotonic()
+        restantes = [b.t_pulso + self.deadline - ahora for b in self.abiertas.values() if b.pulso is not None]
+        return max(0.0, min(restantes + [maximo]))
@@ -0,0 +1,146 @@
+"""
+Matriz de Reputación en memoria: régimen x experto como array denso.
+
+Fuente de verdad: el hash KEY_REPUTACION en Redis ("regimen|experto" -> peso, más "version").
+Quien recalcula pesos llama a `publicar_pesos`: escribe el hash, sube la versión en la misma
+transacción y publica solo los cambios en CH_REPUTACION. El Ejecutor aplica el delta en
+memoria; si detecta un salto de versión (se perdió un delta) relee el hash completo.
+
+Quién escribe: ninguna neurona en vivo recalcula pesos. El JSON lo genera la evaluación
+offline de expertos y llega a la matriz viva con el importador (que usa `publicar_pesos`, así
+el Ejecutor lo recibe como un delta más, sin reiniciar):
+    python lobulo_ejecucion/matriz_reputacion.py importar
+Una vez existe el hash, el Ejecutor ya no lee el JSON: un JSON nuevo no cuenta hasta importarlo.
+Un recalculador en línea futuro debe llamar a `publicar_pesos` igual.
+"""
+import os
+import sys
+import json
+
+import numpy as np
+
+sys.path.append(os.getcwd())
+from config import (REDIS_HOST, REDIS_PORT, PATH_MATRIZ_REPUTACION, KEY_REPUTACION, CH_REPUTACION,
+                    N_REGIMENES, EXPERTOS_CONSENSO)
+from codec_medula import codificar
+from transporte_medula import publicar
+
+PESO_DEFECTO = 1.0
+
+
+def _texto(v):
+    return v.decode("utf-8") if isinstance(v, bytes) else v
+
+
+class MatrizReputacion:
+    def __init__(self, expertos=EXPERTOS_CONSENSO, regimenes=N_REGIMENES):
+        self.expertos = []
+        self.indice = {}
+        self.pesos = np.full((regimenes, 0), PESO_DEFECTO)
+        self.version = 0
+        for e in expertos:
+            self.indice_de(e)
+
+    def indice_de(self, experto):
+        """Columna del experto; uno nuevo entra con el peso por defecto en todos los regímenes."""
+        i = self.indice.get(experto)
+        if i is None:
+            i = self.indice[experto] = len(self.expertos)
+            self.expertos.append(experto)
+            self.pesos = np.hstack([self.pesos, np.full((len(self.pesos), 1), PESO_DEFECTO)])
+        return i
+
+    def fijar(self, regimen, experto, peso):
+        regimen = int(regimen)
+        if 0 <= regimen < len(self.pesos):
+            i = self.indice_de(experto)  # Antes de indexar: puede ampliar self.pesos
+            self.pesos[regimen, i] = float(peso)
+
+    def peso(self, regimen, experto):
+        i = self.indice.get(experto)
+        if i is None or not 0 <= regimen < len(self.pesos):
+            return PESO_DEFECTO
+        return self.pesos[regimen, i]
+
+    def ponderar(self, regimen, votos):
+        """
+        Suma ponderada de `votos` ({experto: voto}) en el régimen: un solo producto escalar.
+        Un experto desconocido pesa PESO_DEFECTO sin ampliar la matriz (camino de decisión).
+        """
+        if not votos:
+            return 0.0
+        v = np.fromiter(votos.values(), dtype=np.float64, count=len(votos))
+        if not 0 <= regimen < len(self.pesos):
+            return float(v.sum())
+        fila = self.pesos[regimen]
+        w = np.fromiter((PESO_DEFECTO if i is None else fila[i] for i in map(self.indice.get, votos)),
+                        dtype=np.float64, count=len(votos))
+        return float(w @ v)
+
+    def cargar_dict(self, matriz):
+        """Formato del JSON histórico: {"regimen": {"experto": peso}}."""
+        for regimen, pesos in matriz.items():
+            for experto, peso in pesos.items():
+                self.fijar(regimen, experto, peso)
+
+    def cargar_archivo(self, ruta=PATH_MATRIZ_REPUTACION):
+        if os.path.exists(ruta):
+            try:
+                with open(ruta, 'r') as f: self.cargar_dict(json.load(f))
+            except Exception:
+                pass
+
+    def cargar_redis(self, r):
+        """Relee el hash completo. Devuelve False si está vacío (aún no se migró)."""
+        crudo = {_texto(k): _texto(v) for k, v in r.hgetall(KEY_REPUTACION).items()}
+        if not crudo:
+            return False
+        self.pesos[:] = PESO_DEFECTO
+        self.version = int(crudo.pop("version", 0))
+        for campo, peso in crudo.items():
+            regimen, _, experto = campo.partition("|")
+            self.fijar(regimen, experto, peso)
+        return True
+
+    def aplicar_delta(self, r, delta):
+        """Delta publicado por `publicar_pesos`. Viejo o repetido: se ignora; hueco: relectura."""
+        version = delta.get("version", 0)
+        if version <= self.version:
+            return
+        if version != self.version + 1:
+            self.cargar_redis(r)
+            return
+        for campo, peso in delta.get("pesos", {}).items():
+            regimen, _, experto = campo.partition("|")
+            self.fijar(regimen, experto, peso)
+        self.version = version
+
+
+def publicar_pesos(r, cambios):
+    """`cambios` = {(regimen, experto): peso}. Escribe el hash, sube la versión y avisa el delta."""
+    pesos = {f"{regimen}|{experto}": float(peso) for (regimen, experto), peso in cambios.items()}
+    pipe = r.pipeline(transaction=True)
+    pipe.hset(KEY_REPUTACION, mapping=pesos)
+    pipe.hincrby(KEY_REPUTACION, "version", 1)
+    version = pipe.execute()[-1]
+    publicar(r, CH_REPUTACION, codificar(CH_REPUTACION, {"version": version, "pesos": pesos}))
+    return version
+
+
+def main():
+    import redis
+    if sys.argv[1:] != ["importar"]:
+        print("Uso: python lobulo_ejecucion/matriz_reputacion.py importar")
+        return
+    if not os.path.exists(PATH_MATRIZ_REPUTACION):
+        print(f"⚠️ {PATH_MATRIZ_REPUTACION} NO EXISTE, nada que importar.")
+        return
+    with open(PATH_MATRIZ_REPUTACION, 'r') as f:
+        matriz = json.load(f)
+    cambios = {(reg, exp): peso for reg, pesos in matriz.items() for exp, peso in pesos.items()}
+    version = publicar_pesos(redis.Redis(host=REDIS_HOST, port=REDIS_PORT), cambios)
+    print(f"📥 {len(cambios)} pesos importados a '{KEY_REPUTACION}' (versión {version})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,71 @@
-import MetaTrader5 as mt5
 import redis
-import json
 import time
 import sys
 import os
+import threading
 
 # Asegurar importación de configuración global desde la raíz del proyecto
 sys.path.append(os.getcwd())
-from config import REDIS_HOST, REDIS_PORT, CH_DECISION, CH_RESULTS
+from config import (REDIS_HOST, REDIS_PORT, CH_DECISION, CH_RESULTS, MT5_BACKEND,
+                    SIMBOLOS, GATEWAY_REINTENTOS, GATEWAY_TICK_MAX_EDAD_MS,
+                    GATEWAY_VENTANA_AGRUPAR_MS, GATEWAY_MAX_AGRUPADAS, GATEWAY_LOTE_MAX,
+                    GATEWAY_TICK_POLL_MS, GATEWAY_METADATOS_SEG,
+                    canal_simbolo, canales_simbolos, separar_canal)
+from codec_medula import codificar, decodificar
+from transporte_medula import publicar, suscribir
+from medidor_latencia import MedidorLatencia
+from traza_medula import continuar, SALTO_LLENADO
+from latido_medula import iniciar_latido
+
+if MT5_BACKEND == "simulado":
+    import mt5_simulado as mt5
+else:
+    import MetaTrader5 as mt5
+
+# Rechazos que delatan metadatos viejos (modo de llenado, volumen, precio): se refresca symbol_info
+RETCODES_METADATOS = {getattr(mt5, n) for n in ("TRADE_RETCODE_INVALID", "TRADE_RETCODE_INVALID_VOLUME",
+                                                "TRADE_RETCODE_INVALID_PRICE", "TRADE_RETCODE_INVALID_FILL")
+                      if hasattr(mt5, n)}
+
+class LoteOrdenes:
+    """Decisiones de apertura en la misma dirección que saldrán como una sola orden física."""
+    def __init__(self, accion):
+        self.accion = accion
+        self.consensos = []
+        self.trazas = []        # Una por decisión: cada resultado vuelve con la suya
+        self.t_inicio = time.monotonic()
 
 class MT5GatewayAlpha:
-    def __init__(self, symbol="BTCUSD", magic_number=123456, lot_size=0.01):
+    def __init__(self, symbols=None, magic_number=123456, lot_size=0.01):
         """
         Brazo Ejecutor Alpha v3.8.4.
         Misión: Traducción de señales neuronales en operaciones físicas en MT5.
         Corregido: Constantes de Filling Mode y blindaje contra respuestas nulas.
+        Multi-símbolo: el símbolo de cada orden viene del canal de decisión.
         """
-        self.symbol = symbol
+        if isinstance(symbols, str): symbols = [symbols]
+        self.symbols = list(symbols or SIMBOLOS)
         self.magic = int(magic_number)
         self.lot = lot_size
+        # Metadatos y último tick en memoria: construir una orden no toca el terminal
+        self.filling = {}   # {symbol: modo de llenado}
+        self.info_simbolo = {}  # {symbol: symbol_info}
+        self.ticks = {}     # {symbol: (time.monotonic(), tick)}, lo mantiene caliente mantener_cache()
+        self.ultimo_refresco = 0.0
+        self.lock_ticks = threading.Lock()
+        # MetaTrader5 no garantiza que su API sea segura entre hilos: toda llamada al terminal
+        # desde el bucle, el vigilante de lotes o el de la caché pasa en serie por llamar_mt5()
+        self.lock_mt5 = threading.Lock()
+        self.cobertura = False  # Cuenta de cobertura: las posiciones opuestas se liquidan por parejas (close-by)
+        self.latencias_cierre = MedidorLatencia()
+        # Agrupación de ráfagas: {symbol: LoteOrdenes} abierto durante GATEWAY_VENTANA_AGRUPAR_MS
+        self.lotes = {}
+        self.lock_lotes = threading.Lock()
+        self.despertar_lotes = threading.Event()
+        # Un envío a MT5 por símbolo a la vez: aperturas (lotes) y CLOSE_ALL no se cruzan.
+        # Orden de toma: primero el de ejecución del símbolo, luego lock_lotes.
+        self.locks_ejecucion = {}
+        self.parando = False    # Parada ordenada en curso: no se agrupan aperturas nuevas
         
         try:
             # Conexión a la Médula Espinal (Redis)
@@ -34,6 +81,7 @@ class MT5GatewayAlpha:
             sys.exit(1)
 
         self.verificar_cuenta()
+        self.refrescar_metadatos()
 
     def verificar_cuenta(self):
         """Protocolo de seguridad: Vision Global opera solo en Demo para esta fase."""
@@ -48,116 +96,347 @@ class MT5GatewayAlpha:
             mt5.shutdown()
             sys.exit(1)
             
-        print(f"🚀 Gateway BTC Activo | Pepperstone: {account_info.login} | Magic ID: {self.magic}")
+        self.cobertura = getattr(account_info, "margin_mode", None) == getattr(mt5, "ACCOUNT_MARGIN_MODE_RETAIL_HEDGING", 2)
+        print(f"🚀 Gateway Activo ({', '.join(self.symbols)}) | Pepperstone: {account_info.login} | Magic ID: {self.magic}")
 
-    def obtener_filling_mode(self):
+    def llamar_mt5(self, funcion, *args, **kwargs):
+        with self.lock_mt5:
+            return funcion(*args, **kwargs)
+
+    def refrescar_metadatos(self, symbols=None):
         """
-        Detecta dinámicamente el modo de ejecución permitido por el broker.
+        Detecta dinámicamente el modo de ejecución permitido por el broker y guarda el resto de
+        symbol_info (digits, point, volume_min/max/step) para construir órdenes sin IPC.
         Resuelve el error de constantes SYMBOL_FILLING_FOK.
         """
-        symbol_info = mt5.symbol_info(self.symbol)
-        if symbol_info is None:
-            return mt5.ORDER_FILLING_IOC
-        
-        # El filling_mode de symbol_info es un bitmask
-        # 1 = FOK (Fill or Kill), 2 = IOC (Immediate or Cancel)
-        filling_attr = symbol_info.filling_mode
-        
-        if filling_attr == 1:
-            return mt5.ORDER_FILLING_FOK
-        elif filling_attr == 2:
-            return mt5.ORDER_FILLING_IOC
-        else:
-            return mt5.ORDER_FILLING_IOC # Fallback estándar para la mayoría de brokers ECN
+        for symbol in symbols or self.symbols:
+            symbol_info = self.llamar_mt5(mt5.symbol_info, symbol)
+            if symbol_info is None:
+                print(f"⚠️ Sin symbol_info para {symbol}: se usará IOC hasta el próximo refresco.")
+                continue
+            
+            # El filling_mode de symbol_info es un bitmask
+            # 1 = FOK (Fill or Kill), 2 = IOC (Immediate or Cancel)
+            filling_attr = symbol_info.filling_mode
+            
+            if filling_attr == 1:
+                modo = mt5.ORDER_FILLING_FOK
+            elif filling_attr == 2:
+                modo = mt5.ORDER_FILLING_IOC
+            else:
+                modo = mt5.ORDER_FILLING_IOC # Fallback estándar para la mayoría de brokers ECN
+            self.filling[symbol] = modo
+            self.info_simbolo[symbol] = symbol_info
+        self.ultimo_refresco = time.monotonic()
+
+    def obtener_filling_mode(self, symbol):
+        if symbol not in self.filling:
+            self.refrescar_metadatos([symbol])
+        return self.filling.get(symbol, mt5.ORDER_FILLING_IOC)
+
+    def revisar_rechazo(self, symbol, retcode):
+        """Un rechazo por llenado/volumen/precio inválido suele ser un cambio del broker: se relee symbol_info."""
+        if retcode in RETCODES_METADATOS:
+            print(f"🔄 Rechazo {retcode} en {symbol}: refrescando metadatos del símbolo.")
+            self.refrescar_metadatos([symbol])
+
+    def tick_reciente(self, symbol, max_edad_ms=GATEWAY_TICK_MAX_EDAD_MS):
+        """Último tick del hilo de mantenimiento; solo se pide al terminal si caducó (fuera de lock_ticks)."""
+        with self.lock_ticks:
+            guardado = self.ticks.get(symbol)
+        if guardado is not None and (time.monotonic() - guardado[0]) * 1000.0 <= max_edad_ms:
+            return guardado[1]
+        ahora = time.monotonic()
+        tick = self.llamar_mt5(mt5.symbol_info_tick, symbol)
+        if tick is not None:
+            with self.lock_ticks:
+                # Si el hilo de la caché guardó uno más nuevo mientras tanto, se respeta
+                if symbol not in self.ticks or self.ticks[symbol][0] <= ahora:
+                    self.ticks[symbol] = (ahora, tick)
+        return tick
+
+    def mantener_cache(self):
+        """Hilo: refresca el tick de cada símbolo cada GATEWAY_TICK_POLL_MS y los metadatos cada GATEWAY_METADATOS_SEG."""
+        while True:
+            for symbol in self.symbols:
+                ahora = time.monotonic()
+                tick = self.llamar_mt5(mt5.symbol_info_tick, symbol)
+                if tick is not None:
+                    with self.lock_ticks:
+                        self.ticks[symbol] = (ahora, tick)
+            if time.monotonic() - self.ultimo_refresco >= GATEWAY_METADATOS_SEG:
+                self.refrescar_metadatos()
+            time.sleep(GATEWAY_TICK_POLL_MS / 1000.0)
+
+    def cerrar_ticket(self, symbol, p, filling):
+        """Cierra una posición (con reintentos). Devuelve el informe del ticket."""
+        informe = {"ticket": int(p.ticket), "ok": False, "retcode": None, "intentos": 0}
+        for intento in range(GATEWAY_REINTENTOS):
+            informe["intentos"] = intento + 1
+            # Tras un fallo el precio ya se movió: se exige un tick nuevo
+            tick = self.tick_reciente(symbol, GATEWAY_TICK_MAX_EDAD_MS if intento == 0 else 0.0)
+            if tick is None:
+                time.sleep(0.05)
+                continue
+
+            tipo_cierre = mt5.ORDER_TYPE_SELL if p.type == mt5.ORDER_TYPE_BUY else mt5.ORDER_TYPE_BUY
+            precio_cierre = tick.bid if p.type == mt5.ORDER_TYPE_BUY else tick.ask
+            
+            request = {
+                "action": mt5.TRADE_ACTION_DEAL,
+                "symbol": symbol,
+                "position": p.ticket,
+                "volume": p.volume,
+                "type": tipo_cierre,
+                "price": precio_cierre,
+                "deviation": 20,
+                "magic": self.magic,
+                "comment": f"Alpha v3.8.4 Close",
+                "type_time": mt5.ORDER_TIME_GTC,
+                "type_filling": filling,
+            }
+            
+            t0 = time.perf_counter()
+            res = self.llamar_mt5(mt5.order_send, request)
+            latencia_ms = (time.perf_counter() - t0) * 1000.0
+            
+            # --- BLINDAJE CONTRA NoneType ---
+            if res is None:
+                print(f"❌ ERROR: MT5 devolvió None en ticket #{p.ticket}. Intento {intento+1}/{GATEWAY_REINTENTOS}")
+                time.sleep(0.05)
+                continue
+
+            informe["retcode"] = res.retcode
+            if res.retcode == mt5.TRADE_RETCODE_DONE:
+                # Slippage en puntos, positivo = en contra (vender más barato / comprar más caro)
+                info = self.info_simbolo.get(symbol)
+                punto = info.point if info else 1.0
+                desliz = (precio_cierre - res.price) if tipo_cierre == mt5.ORDER_TYPE_SELL else (res.price - precio_cierre)
+                informe.update(ok=True, pnl=float(p.profit), precio=res.price, latencia_ms=round(latencia_ms, 2),
+                               slippage_pts=round(desliz / punto, 1))
+                self.latencias_cierre.registrar(latencia_ms)
+                return informe
+            print(f"⚠️ Fallo intento {intento+1} para #{p.ticket}: {res.comment}")
+            self.revisar_rechazo(symbol, res.retcode)
+            filling = self.obtener_filling_mode(symbol)
+            informe["comentario"] = res.comment
+        return informe
+
+    def emparejar(self, positions):
+        """Parejas compra/venta del mismo volumen para close-by y el resto de tickets sueltos."""
+        compras = [p for p in positions if p.type == mt5.ORDER_TYPE_BUY]
+        ventas = [p for p in positions if p.type != mt5.ORDER_TYPE_BUY]
+        pares, sueltas = [], []
+        for p in compras:
+            q = next((v for v in ventas if abs(v.volume - p.volume) < 1e-9), None)
+            if q is None:
+                sueltas.append(p)
+            else:
+                ventas.remove(q)
+                pares.append((p, q))
+        return pares, sueltas + ventas
+
+    def cerrar_par(self, symbol, p, q):
+        """
+        Close-by: una sola petición cierra la compra `p` contra la venta `q` al precio de apertura
+        de `q`, sin cruzar el spread. Devuelve los informes de los dos tickets, o None si el
+        terminal lo rechaza (los tickets vuelven al cierre uno a uno).
+        """
+        request = {
+            "action": mt5.TRADE_ACTION_CLOSE_BY,
+            "position": p.ticket,
+            "position_by": q.ticket,
+            "magic": self.magic,
+            "comment": f"Alpha v3.8.4 CloseBy",
+        }
+        t0 = time.perf_counter()
+        res = self.llamar_mt5(mt5.order_send, request)
+        latencia_ms = (time.perf_counter() - t0) * 1000.0
+        if res is None or res.retcode != mt5.TRADE_RETCODE_DONE:
+            motivo = res.comment if res is not None else "None"
+            print(f"⚠️ Close-by #{p.ticket}/#{q.ticket} rechazado ({motivo}): se cierran por separado.")
+            return None
+        self.latencias_cierre.registrar(latencia_ms)
+        return [{"ticket": int(t.ticket), "ok": True, "retcode": res.retcode, "intentos": 1, "pnl": float(t.profit),
+                 "precio": res.price, "latencia_ms": round(latencia_ms, 2), "slippage_pts": 0.0,
+                 "cerrado_con": int(o.ticket)} for t, o in ((p, q), (q, p))]
 
-    def cerrar_todo_real(self, reason="N/A"):
+    def cerrar_todo_real(self, symbol, reason="N/A"):
         """
-        Liquida físicamente todas las posiciones del bot con sistema de reintentos.
-        Blindado contra errores de tipo None en la respuesta del terminal.
+        Liquida físicamente todas las posiciones del bot. En cuentas de cobertura las posiciones
+        opuestas salen por parejas (close-by, una petición por pareja); el resto, ticket a ticket.
+        Los envíos van en serie (llamar_mt5): no hay constancia de que el terminal admita varios
+        order_send a la vez. Blindado contra errores de tipo None en la respuesta del terminal.
+        Informa en reporte_operativa cuántos tickets se cerraron, cuáles fallaron y el detalle por ticket.
         """
-        print(f"📡 Iniciando Liquidación Física: {reason}")
-        positions = mt5.positions_get(symbol=self.symbol, magic=self.magic)
+        print(f"📡 Iniciando Liquidación Física {symbol}: {reason}")
+        ch_resultados = canal_simbolo(CH_RESULTS, symbol)
+        positions = self.llamar_mt5(mt5.positions_get, symbol=symbol, magic=self.magic)
         
         if not positions:
             print(f"ℹ️ No hay posiciones abiertas con Magic {self.magic}.")
-            self.r.publish(CH_RESULTS, json.dumps({"status": "closed", "final_pnl": 0.0, "razon": "SIN_POSICIONES"}))
+            publicar(self.r, ch_resultados, codificar(ch_resultados, {"status": "closed", "final_pnl": 0.0, "razon": "SIN_POSICIONES"}))
             return
 
-        filling = self.obtener_filling_mode()
-        posiciones_cerradas_con_exito = 0
-        pnl_final_acumulado = 0.0
+        filling = self.obtener_filling_mode(symbol)
+        t0 = time.perf_counter()
+        pares, sueltas = self.emparejar(positions) if self.cobertura else ([], list(positions))
+        informes = []
+        for p, q in pares:
+            par = self.cerrar_par(symbol, p, q)
+            if par is None:
+                sueltas += [p, q]
+            else:
+                informes += par
+        informes += [self.cerrar_ticket(symbol, p, filling) for p in sueltas]
+        total_ms = (time.perf_counter() - t0) * 1000.0
 
-        for p in positions:
-            # Sistema de 3 reintentos por ticket para garantizar el cierre
-            for intento in range(3):
-                tick = mt5.symbol_info_tick(self.symbol)
-                if tick is None:
-                    time.sleep(0.1)
-                    continue
-
-                tipo_cierre = mt5.ORDER_TYPE_SELL if p.type == mt5.ORDER_TYPE_BUY else mt5.ORDER_TYPE_BUY
-                precio_cierre = tick.bid if p.type == mt5.ORDER_TYPE_BUY else tick.ask
-                
-                request = {
-                    "action": mt5.TRADE_ACTION_DEAL,
-                    "symbol": self.symbol,
-                    "position": p.ticket,
-                    "volume": p.volume,
-                    "type": tipo_cierre,
-                    "price": precio_cierre,
-                    "deviation": 20,
-                    "magic": self.magic,
-                    "comment": f"Alpha v3.8.4 Close",
-                    "type_time": mt5.ORDER_TIME_GTC,
-                    "type_filling": filling,
-                }
-                
-                res = mt5.order_send(request)
-                
-                # --- BLINDAJE CONTRA NoneType ---
-                if res is None:
-                    print(f"❌ ERROR: MT5 devolvió None en ticket #{p.ticket}. Intento {intento+1}/3")
-                    time.sleep(0.2)
-                    continue
-                    
-                if res.retcode == mt5.TRADE_RETCODE_DONE:
-                    pnl_final_acumulado += p.profit
-                    posiciones_cerradas_con_exito += 1
-                    print(f"🛑 MT5 CERRADO: Ticket #{p.ticket} ejecutado con éxito.")
-                    break
-                else:
-                    print(f"⚠️ Fallo intento {intento+1} para #{p.ticket}: {res.comment}")
-                    time.sleep(0.1)
+        cerrados = [i for i in informes if i["ok"]]
+        fallidos = [i["ticket"] for i in informes if not i["ok"]]
+        pnl_final_acumulado = sum(i["pnl"] for i in cerrados)
+        for i in cerrados:
+            contra = f" (close-by con #{i['cerrado_con']})" if "cerrado_con" in i else ""
+            print(f"🛑 MT5 CERRADO: Ticket #{i['ticket']}{contra} en {i['latencia_ms']:.1f} ms | Slippage: {i['slippage_pts']:+.1f} pts")
+        p50, p99 = self.latencias_cierre.percentiles()
+        print(f"⏱️ Liquidación {symbol}: {len(cerrados)}/{len(informes)} tickets en {total_ms:.1f} ms "
+              f"(envío->llenado p50: {p50:.1f} ms | p99: {p99:.1f} ms)")
 
         # Solo informamos el cierre exitoso si logramos cerrar posiciones
-        if posiciones_cerradas_con_exito > 0:
-            self.r.publish(CH_RESULTS, json.dumps({
-                "status": "closed",
+        if cerrados:
+            publicar(self.r, ch_resultados, codificar(ch_resultados, {
+                "status": "closed" if not fallidos else "parcial",
                 "final_pnl": round(pnl_final_acumulado, 2),
                 "razon": reason,
-                "timestamp": time.time()
+                "timestamp": time.time(),
+                "cerrados": len(cerrados),
+                "fallidos": fallidos,
+                "liquidacion_ms": round(total_ms, 2),
+                "detalle": informes
             }))
+            if fallidos:
+                print(f"⚠️ CIERRE PARCIAL {symbol}: siguen abiertos en MT5 {fallidos}")
         else:
             print("❌ FALLO TOTAL DE CIERRE: Las posiciones siguen abiertas en MT5.")
-            self.r.publish(CH_RESULTS, json.dumps({"status": "error_cierre", "razon": "FALLO_MT5"}))
+            publicar(self.r, ch_resultados, codificar(ch_resultados, {"status": "error_cierre", "razon": "FALLO_MT5",
+                                                                       "fallidos": fallidos, "detalle": informes}))
+
+    def volumen_max(self, symbol):
+        info = self.info_simbolo.get(symbol)
+        return min(GATEWAY_LOTE_MAX, info.volume_max) if info else GATEWAY_LOTE_MAX
 
-    def ejecutar_orden_mercado(self, accion, consenso):
+    def lock_ejecucion(self, symbol):
+        with self.lock_lotes:
+            lock = self.locks_ejecucion.get(symbol)
+            if lock is None:
+                lock = self.locks_ejecucion[symbol] = threading.Lock()
+            return lock
+
+    def encolar_orden(self, symbol, accion, consenso, traza=None):
         """
-        Ejecuta una apertura de posición inmediata.
+        Agrupa las aperturas de una ráfaga. El lote abierto sale antes de tiempo si cambia la
+        dirección o si ya no cabe otra orden (máximo de órdenes o de volumen).
         """
-        tick = mt5.symbol_info_tick(self.symbol)
+        if self.parando:
+            print(f"🛑 Parada en curso: se descarta {accion} en {symbol}.")
+            return
+        traza = continuar(traza, "mt5_gateway")
+        self.obtener_filling_mode(symbol)
+        with self.lock_ejecucion(symbol):
+            if GATEWAY_VENTANA_AGRUPAR_MS <= 0:
+                self.ejecutar_orden_mercado(symbol, accion, consenso, trazas=[traza])
+                return
+            self._encolar(symbol, accion, consenso, traza)
+
+    def _encolar(self, symbol, accion, consenso, traza):
+        salientes = []
+        with self.lock_lotes:
+            lote = self.lotes.get(symbol)
+            if lote is not None and lote.accion != accion:
+                salientes.append(self.lotes.pop(symbol))
+                lote = None
+            if lote is None:
+                lote = self.lotes[symbol] = LoteOrdenes(accion)
+                self.despertar_lotes.set()
+            lote.consensos.append(consenso)
+            lote.trazas.append(traza)
+            if (len(lote.consensos) >= GATEWAY_MAX_AGRUPADAS
+                    or (len(lote.consensos) + 1) * self.lot > self.volumen_max(symbol) + 1e-9):
+                salientes.append(self.lotes.pop(symbol))
+        for lote in salientes:
+            self.ejecutar_lote(symbol, lote)
+
+    def vaciar_lote(self, symbol):
+        """Envía ya el lote abierto del símbolo (antes de un CLOSE_ALL, con su lock de ejecución tomado)."""
+        with self.lock_lotes:
+            lote = self.lotes.pop(symbol, None)
+        if lote is not None:
+            self.ejecutar_lote(symbol, lote)
+
+    def al_parar(self):
+        """Parada ordenada (hilo del latido): no se admiten aperturas y se envía lo que estaba agrupándose."""
+        self.parando = True
+        with self.lock_lotes:
+            pendientes = list(self.lotes)
+        for symbol in pendientes:
+            with self.lock_ejecucion(symbol):
+                self.vaciar_lote(symbol)
+
+    def vigilar_lotes(self):
+        """
+        Hilo: envía cada lote cuando vence su ventana. El lote se saca de `lotes` ya con el lock
+        de ejecución del símbolo: un CLOSE_ALL no puede colarse entre sacarlo y enviarlo
+        (no lo vería en vaciar_lote, liquidaría antes del llenado y la posición sobreviviría).
+        """
+        ventana = GATEWAY_VENTANA_AGRUPAR_MS / 1000.0
+        while True:
+            ahora = time.monotonic()
+            with self.lock_lotes:
+                vencidos = [s for s, l in self.lotes.items() if ahora - l.t_inicio >= ventana]
+                espera = min([l.t_inicio + ventana - ahora for s, l in self.lotes.items() if s not in vencidos] + [1.0])
+            for symbol in vencidos:
+                with self.lock_ejecucion(symbol):
+                    with self.lock_lotes:
+                        # Mientras se esperaba el lock pudo salir (CLOSE_ALL, cambio de dirección)
+                        lote = self.lotes.get(symbol)
+                        if lote is None or time.monotonic() - lote.t_inicio < ventana:
+                            continue
+                        del self.lotes[symbol]
+                    self.ejecutar_lote(symbol, lote)
+            self.despertar_lotes.wait(max(espera, 0.0))
+            self.despertar_lotes.clear()
+
+    def ejecutar_lote(self, symbol, lote):
+        n = len(lote.consensos)
+        consenso = round(sum(lote.consensos) / n, 2)
+        self.ejecutar_orden_mercado(symbol, lote.accion, consenso, logicas=n, trazas=lote.trazas)
+
+    def ejecutar_orden_mercado(self, symbol, accion, consenso, logicas=1, trazas=None):
+        """
+        Ejecuta una apertura de posición inmediata por `logicas` decisiones (volumen lot * logicas).
+        El llenado se notifica como `logicas` órdenes separadas, como si hubieran salido una a una,
+        cada una con la traza de su decisión (`trazas`) sellada en el envío y en el llenado.
+        """
+        trazas = trazas or [None] * logicas
+        ch_resultados = canal_simbolo(CH_RESULTS, symbol)
+        tick = self.tick_reciente(symbol)
         if tick is None:
             print("❌ Error: No se pudo obtener el tick para abrir posición.")
             return
 
         order_type = mt5.ORDER_TYPE_BUY if accion == "BUY" else mt5.ORDER_TYPE_SELL
         price = tick.ask if accion == "BUY" else tick.bid
-        filling = self.obtener_filling_mode()
+        filling = self.obtener_filling_mode(symbol)
         
+        volumen = round(self.lot * logicas, 8)
+        info = self.info_simbolo.get(symbol)
+        if info is not None:
+            if info.volume_step:
+                volumen = round(round(volumen / info.volume_step) * info.volume_step, 8)
+            volumen = min(max(volumen, info.volume_min), info.volume_max)
         request = {
             "action": mt5.TRADE_ACTION_DEAL,
-            "symbol": self.symbol,
-            "volume": self.lot,
+            "symbol": symbol,
+            "volume": volumen,
             "type": order_type,
             "price": price,
             "deviation": 20,
@@ -167,41 +446,64 @@ class MT5GatewayAlpha:
             "type_filling": filling,
         }
 
-        result = mt5.order_send(request)
+        trazas = [continuar(t, "order_send") for t in trazas]
+        result = self.llamar_mt5(mt5.order_send, request)
+        trazas = [continuar(t, SALTO_LLENADO) for t in trazas]
         
         if result is None:
             print(f"❌ ERROR CRÍTICO: order_send (Open) devolvió None.")
             return
 
         if result.retcode == mt5.TRADE_RETCODE_DONE:
-            print(f"✅ MT5 OPEN: {accion} @ {result.price} (Ticket: #{result.order})")
-            # Notificamos a Homeostasis para que registre la orden en su cúmulo
-            self.r.publish(CH_RESULTS, json.dumps({
-                "ticket": result.order,
-                "action": accion,
-                "price": result.price,
-                "volume": self.lot,
-                "status": "executed",
-                "timestamp": time.time()
-            }))
+            agrupada = f" x{logicas} agrupadas" if logicas > 1 else ""
+            print(f"✅ MT5 OPEN: {accion} {volumen} @ {result.price} (Ticket: #{result.order}){agrupada}")
+            # Notificamos a Homeostasis una orden por decisión, todas con el precio del llenado común
+            pipe = self.r.pipeline(transaction=False)
+            ahora = time.time()
+            for traza in trazas:
+                resultado = {
+                    "ticket": result.order,
+                    "action": accion,
+                    "price": result.price,
+                    "volume": self.lot,
+                    "status": "executed",
+                    "timestamp": ahora,
+                    "agrupadas": logicas
+                }
+                if traza: resultado["traza"] = traza
+                publicar(pipe, ch_resultados, codificar(ch_resultados, resultado))
+            pipe.execute()
         else:
             print(f"❌ FALLO APERTURA MT5: {result.comment} (Código: {result.retcode})")
+            self.revisar_rechazo(symbol, result.retcode)
 
     def escuchar(self):
         """Escucha permanente de órdenes provenientes del Ejecutor o Homeostasis."""
-        pubsub = self.r.pubsub()
-        pubsub.subscribe(CH_DECISION)
-        print(f"🎧 Gateway v3.8.4 escuchando órdenes de ejecución en BTCUSD...")
+        latido = iniciar_latido(self.r)
+        latido.al_parar(self.al_parar)
+        # Sin esperar a los expertos: un CLOSE_ALL se atiende aunque falte alguno. La espera
+        # para abrir la aplica el Supervisor (DEPENDENCIAS_ARRANQUE) antes de lanzarnos.
+        pubsub = suscribir(self.r, canales_simbolos(CH_DECISION, self.symbols), "mt5_gateway")
+        print(f"🎧 Gateway v3.8.4 escuchando órdenes de ejecución en {', '.join(self.symbols)}...")
+        threading.Thread(target=self.mantener_cache, daemon=True).start()
+        if GATEWAY_VENTANA_AGRUPAR_MS > 0:
+            threading.Thread(target=self.vigilar_lotes, daemon=True).start()
+        latido.listo()
         
-        for message in pubsub.listen():
+        for message in latido.escuchar(pubsub):
             if message['type'] == 'message':
-                data = json.loads(message['data'])
+                _, symbol = separar_canal(message['channel'])
+                data = decodificar(message['data'])
                 accion = data.get('action')
                 
                 if accion == "CLOSE_ALL":
-                    self.cerrar_todo_real(data.get('reason', 'Brain Trigger'))
+                    # Lo que estaba agrupándose se abre primero para que también se liquide;
+                    # con el lock, un lote que el vigilante ya estaba enviando termina antes
+                    with self.lock_ejecucion(symbol):
+                        self.vaciar_lote(symbol)
+                        self.cerrar_todo_real(symbol, data.get('reason', 'Brain Trigger'))
                 elif accion in ["BUY", "SELL"]:
-                    self.ejecutar_orden_mercado(accion, data.get('consenso', 0.0))
+                    self.encolar_orden(symbol, accion, data.get('consenso', 0.0), data.get('traza'))
 
 if __name__ == "__main__":
     gateway = MT5GatewayAlpha()
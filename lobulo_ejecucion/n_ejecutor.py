@@ -1,55 +1,149 @@
-import redis, json, os, sys
+import redis, json, os, sys, time, threading
 from rich.console import Console
 sys.path.append(os.getcwd())
 from config import *
+from codec_medula import codificar, decodificar
+from transporte_medula import publicar, suscribir
+from lobulo_ejecucion.barrera_votos import BarreraVotos
+from lobulo_ejecucion.matriz_reputacion import MatrizReputacion
+from medidor_latencia import MedidorLatencia
+from traza_medula import continuar
+from latido_medula import iniciar_latido
+from lobulo_percepcion.motor_replay import confirmar_replay
 console = Console()
 
 class EjecutorMaestro:
     def __init__(self):
         self.r = redis.Redis(host=REDIS_HOST, port=REDIS_PORT)
-        self.matriz_reputacion = self.cargar_pesos()
-        self.votos_actuales = {}
+        # Pesos por defecto hasta `cargar_pesos`, que se llama ya suscrito a CH_REPUTACION.
+        # Luego se actualizan por deltas: nada de disco en el camino de decisión
+        self.matriz_reputacion = MatrizReputacion()
+        # Votos agrupados por vela: solo se suman votos del mismo Timestamp que el pulso
+        self.barrera = BarreraVotos(self.expertos_esperados, CONSENSO_DEADLINE_MS)
+        self.latencias = MedidorLatencia()  # Pulso -> decisión (ms)
+        self.decisiones = 0
+        self.a_tiempo = 0
+        # El vigilante de deadlines y el bucle de mensajes comparten la barrera
+        self.lock = threading.Lock()
+        self.despertar = threading.Event()  # Un pulso nuevo abre un deadline: el vigilante recalcula su espera
+        self.bloqueos = {}  # {simbolo: time.monotonic() en que termina el periodo refractario}
 
     def cargar_pesos(self):
-        if os.path.exists(PATH_MATRIZ_REPUTACION):
-            try:
-                with open(PATH_MATRIZ_REPUTACION, 'r') as f: return json.load(f)
-            except: pass
-        return {str(i): {} for i in range(7)}
-
-    def decidir(self, regime_id, price, timestamp):
-        reg = str(regime_id)
-        voto_final = 0.0
-        for exp_id, voto in self.votos_actuales.items():
-            peso = self.matriz_reputacion.get(reg, {}).get(exp_id, 1.0)
-            if exp_id == "guardian_vestibular_v1" and voto == 0: voto_final *= 0.1
-            else: voto_final += (voto * peso)
-
-        self.r.publish(CH_BRAIN_STATE, json.dumps({
-            "Timestamp": timestamp, "regime_id": regime_id,
-            "Close_Price": price, "consenso_actual": round(voto_final, 2)
-        }))
+        matriz = MatrizReputacion()
+        # El JSON solo se lee si el hash aún no se migró (matriz_reputacion.py importar)
+        if not matriz.cargar_redis(self.r): matriz.cargar_archivo()
+        return matriz
+
+    def expertos_esperados(self, regime_id):
+        """Expertos cuyo voto cambia el consenso en este régimen (peso 0 = no se le espera)."""
+        return [e for e in EXPERTOS_CONSENSO if e == EXPERTO_GUARDIAN or self.matriz_reputacion.peso(regime_id, e) != 0]
+
+    def sincronizar_bloqueos(self):
+        """Al arrancar: copia en memoria los bloqueos que ya estaban activos (TTL restante de la clave)."""
+        pipe = self.r.pipeline(transaction=False)
+        for simbolo in SIMBOLOS: pipe.pttl(f"{CH_BLOCK}_active:{simbolo}")
+        for simbolo, ttl_ms in zip(SIMBOLOS, pipe.execute()):
+            if ttl_ms and ttl_ms > 0: self.bloqueos[simbolo] = time.monotonic() + ttl_ms / 1000.0
+
+    def bloquear(self, simbolo, expira):
+        # `expira` es epoch: un aviso viejo (p. ej. reentregado por Streams) no bloquea de más
+        hasta = time.monotonic() + (expira - time.time())
+        if hasta > self.bloqueos.get(simbolo, 0.0): self.bloqueos[simbolo] = hasta
+
+    def bloqueado(self, simbolo):
+        return time.monotonic() < self.bloqueos.get(simbolo, 0.0)
+
+    def recibir_voto(self, simbolo, data):
+        with self.lock:
+            lista = self.barrera.voto(simbolo, data.get('Timestamp'), data['experto_id'], data['voto'], data.get('traza'))
+            if isinstance(lista, tuple):
+                console.print(f"[dim]🐢 Voto tardío {data['experto_id']} {simbolo} [{data.get('Timestamp')}] +{lista[1]:.0f} ms tras decidir[/dim]")
+            elif lista is not None:
+                self.cerrar_barra(lista, vencida=False)
+
+    def recibir_pulso(self, simbolo, data):
+        with self.lock:
+            lista = self.barrera.pulso(simbolo, data['Timestamp'], data['regime_id'], data['Close_Price'], data.get('traza'),
+                                       data.get('replay_seq'))
+            if lista is not None: self.cerrar_barra(lista, vencida=False)
+            else: self.despertar.set()
+
+    def vigilar(self):
+        """Hilo: decide las velas cuyo deadline venció aunque no llegue ningún mensaje más."""
+        while True:
+            with self.lock:
+                for barra in self.barrera.vencidas(): self.cerrar_barra(barra, vencida=True)
+                espera = self.barrera.espera()
+            self.despertar.wait(espera)
+            self.despertar.clear()
+
+    def cerrar_barra(self, barra, vencida):
+        regime_id, price = barra.pulso
+        self.decidir(barra.simbolo, regime_id, price, barra.ts, barra.votos, barra.traza)
+        # Con la decisión ya publicada: el replay "ack" puede soltar la vela siguiente
+        confirmar_replay(self.r, {"replay_seq": barra.replay_seq}, "n_ejecutor")
+        self.latencias.registrar((time.monotonic() - barra.t_pulso) * 1000)
+        self.decisiones += 1
+        if vencida:
+            console.print(f"[yellow]⏰ Deadline {barra.simbolo} [{barra.ts}]: sin voto de {', '.join(barra.faltantes())}[/yellow]")
+        else:
+            self.a_tiempo += 1
+        if self.decisiones % CONSENSO_REPORTE == 0: self.reportar_slo()
+
+    def reportar_slo(self):
+        p50, p99 = self.latencias.percentiles()
+        completas = self.a_tiempo / self.decisiones
+        self.r.hset(KEY_CONSENSO_SLO, mapping={
+            "p50_ms": round(p50, 2), "p99_ms": round(p99, 2), "completas": round(completas, 4),
+            "decisiones": self.decisiones, "ausentes": json.dumps(dict(self.barrera.ausentes)),
+            "tardios": json.dumps(dict(self.barrera.tardios)), "ts": time.time()
+        })
+        console.print(f"[dim]⏱️ Consenso pulso->decisión p50: {p50:.1f} ms | p99: {p99:.1f} ms | completas: {completas:.1%}[/dim]")
+
+    def decidir(self, simbolo, regime_id, price, timestamp, votos, traza=None):
+        voto_final = self.matriz_reputacion.ponderar(regime_id, votos)
+        # Veto del Guardián (voto 0 = ruido alto): atenúa el consenso de la vela
+        if votos.get(EXPERTO_GUARDIAN) == 0: voto_final *= 0.1
+
+        # Explícita: la decisión puede salir del hilo vigilante, que no leyó ningún mensaje
+        traza = continuar(traza, "n_ejecutor")
+        estado = {"Timestamp": timestamp, "regime_id": regime_id,
+                  "Close_Price": price, "consenso_actual": round(voto_final, 2)}
+        if traza: estado["traza"] = traza
+        ch_estado = canal_simbolo(CH_BRAIN_STATE, simbolo)
+        publicar(self.r, ch_estado, codificar(ch_estado, estado))
 
         # PARAMETRO OPTUNA: 0.7535
-        if not self.r.exists(f"{CH_BLOCK}_active") and abs(voto_final) >= 0.75:
+        if not self.bloqueado(simbolo) and abs(voto_final) >= 0.75:
             accion = "BUY" if voto_final > 0 else "SELL"
             payload = {
                 "action": accion, "price_at_entry": price, "regime": regime_id,
                 "consenso": round(voto_final, 2), "Timestamp": timestamp
             }
-            self.r.publish(CH_DECISION, json.dumps(payload))
-            console.print(f"[bold cyan]🚀 DISPARO OPTIMIZADO:[/bold cyan] {accion} | Cons: {voto_final:.2f}")
+            if traza: payload["traza"] = traza
+            ch_decision = canal_simbolo(CH_DECISION, simbolo)
+            publicar(self.r, ch_decision, codificar(ch_decision, payload))
+            console.print(f"[bold cyan]🚀 DISPARO OPTIMIZADO:[/bold cyan] {accion} {simbolo} | Cons: {voto_final:.2f}")
 
 def main():
     e = EjecutorMaestro()
-    pubsub = e.r.pubsub()
-    pubsub.subscribe(CH_VOTES, CH_RESULTS, CH_BRAIN_PULSE)
-    for message in pubsub.listen():
+    latido = iniciar_latido(e.r)
+    pubsub = suscribir(e.r, canales_simbolos(CH_VOTES) + canales_simbolos(CH_BRAIN_PULSE)
+                       + canales_simbolos(CH_BLOCK) + [CH_REPUTACION], "n_ejecutor")
+    # Después de suscribirse: un cierre o un delta de reputación entre ambas cosas llega por el
+    # canal, no se pierde (un delta ya incluido en el hash leído se ignora por versión)
+    e.matriz_reputacion = e.cargar_pesos()
+    e.sincronizar_bloqueos()
+    threading.Thread(target=e.vigilar, daemon=True).start()
+    latido.listo()
+    for message in latido.escuchar(pubsub):
         if message['type'] == 'message':
-            canal = message['channel'].decode('utf-8')
-            data = json.loads(message['data'])
-            if canal == CH_VOTES: e.votos_actuales[data['experto_id']] = data['voto']
-            elif canal == CH_RESULTS: e.matriz_reputacion = e.cargar_pesos()
-            elif canal == CH_BRAIN_PULSE: e.decidir(data['regime_id'], data['Close_Price'], data['Timestamp'])
+            canal, simbolo = separar_canal(message['channel'])
+            data = decodificar(message['data'])
+            if canal == CH_VOTES: e.recibir_voto(simbolo, data)
+            elif canal == CH_REPUTACION:
+                with e.lock: e.matriz_reputacion.aplicar_delta(e.r, data)
+            elif canal == CH_BRAIN_PULSE: e.recibir_pulso(simbolo, data)
+            elif canal == CH_BLOCK: e.bloquear(simbolo, data['expira'])
 
-if __name__ == "__main__": main()
\ No newline at end of file
+if __name__ == "__main__": main()
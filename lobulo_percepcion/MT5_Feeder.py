@@ -1,4 +1,3 @@
-import MetaTrader5 as mt5
 import polars as pl
 import redis
 import json
@@ -7,18 +6,62 @@ import sys
 import os
 import numpy as np
 from datetime import datetime, timezone
+from multiprocessing import Process
 
 # Asegurar que reconozca la raíz para importar la configuración global
 sys.path.append(os.getcwd())
-from config import REDIS_HOST, REDIS_PORT, CH_MARKET_DATA
+from config import (REDIS_HOST, REDIS_PORT, CH_MARKET_DATA, CH_HTF_CONTEXT, KEY_HTF_CONTEXT, CH_TICKS,
+                    FEEDER_GRACIA_SEG, FEEDER_REINTENTO_SEG, FEEDER_ESPERA_MAX_SEG, MT5_BACKEND,
+                    FEEDER_MODO, FEEDER_TICK_POLL_SEG, FEEDER_TICKS_LOTE, FEEDER_VELAS_LOCALES,
+                    SIMBOLOS, FEEDER_PROCESOS, canal_simbolo)
+
+if MT5_BACKEND == "simulado":
+    import mt5_simulado as mt5
+else:
+    import MetaTrader5 as mt5
+from lobulo_percepcion.motor_indicadores import MotorIndicadores
+from lobulo_percepcion.reloj_velas import RelojVelas
+from lobulo_percepcion.agregador_velas import AgregadorVelas
+from codec_medula import codificar
+from transporte_medula import publicar
+
+# Velas de histórico para sembrar el motor y velas recientes por consulta
+VELAS_SEMILLA = 400
+VELAS_POLL = 5
+
+def firma_vela(rates):
+    """Huella de la vela en formación: si no cambia, no hay nada que recalcular ni publicar."""
+    if rates is None: return None
+    u = rates[-1]
+    return (int(u['time']), float(u['high']), float(u['low']), float(u['close']), int(u['tick_volume']))
+
+class EstadoSimbolo:
+    """Memoria sensorial independiente de cada símbolo del shard."""
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.motor_m1 = MotorIndicadores()
+        self.motor_m15 = MotorIndicadores()
+        self.time_m1 = None
+        self.time_m15 = None
+        self.firma_htf = None
+        self.version_htf = 0
+        self.ultima_vela_m1 = None
+        # Modo ticks: velas M1/M15 agregadas localmente y cursor de la última lectura
+        self.ag_m1 = None
+        self.ag_m15 = None
+        self.ultimo_msc = 0
+        self.vistos_msc = 0  # Ticks ya consumidos con time_msc == ultimo_msc
 
 class MT5FeederAlpha:
-    def __init__(self, symbol="BTCUSD"):
+    def __init__(self, symbols=None):
         """
         Sensor v3.7: Proporciona flujos síncronos para M1 y M15.
         Garantiza que el Tálamo Fractal reciba datos en la resolución correcta.
+        Un mismo proceso atiende un shard de símbolos con un solo reloj de velas.
         """
-        self.symbol = symbol
+        if isinstance(symbols, str): symbols = [symbols]
+        self.symbols = list(symbols or SIMBOLOS)
+        self.estados = {s: EstadoSimbolo(s) for s in self.symbols}
         try:
             self.r = redis.Redis(host=REDIS_HOST, port=REDIS_PORT)
             print(f"✅ Feeder v3.7 conectado a Redis")
@@ -28,17 +71,67 @@ class MT5FeederAlpha:
         if not mt5.initialize():
             print(f"❌ Error al inicializar MT5: {mt5.last_error()}"); sys.exit(1)
             
-        print(f"⚡ Sensor Alpha BTC Activo | Sincronizando M1 y M15...")
+        print(f"⚡ Sensor Alpha Activo | {', '.join(self.symbols)} | Sincronizando M1 y M15...")
 
-    def obtener_datos(self, timeframe, n=400):
-        rates = mt5.copy_rates_from_pos(self.symbol, timeframe, 0, n)
+    def obtener_datos(self, symbol, timeframe, n=400):
+        rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, n)
         if rates is None or len(rates) == 0: return None
         return pl.DataFrame(rates)
 
+    def obtener_rates(self, symbol, timeframe, n):
+        """Array estructurado crudo de MT5 (sin pasar por Polars) para el motor incremental."""
+        rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, n)
+        if rates is None or len(rates) == 0: return None
+        return rates
+
+    def esperar_velas_nuevas(self, vencidos, limite):
+        """
+        Tras una frontera, sondea juntos todos los símbolos del shard hasta que el broker entregue
+        sus velas nuevas. Cada símbolo se publica (con su propio pipeline) en cuanto tiene las
+        suyas: uno ilíquido solo se retrasa a sí mismo, y como mucho hasta `limite`
+        (FEEDER_ESPERA_MAX_SEG), momento en que sale con lo último disponible.
+        MT5 solo sirve velas símbolo a símbolo (`copy_rates_from_pos`): cada ronda hace una consulta
+        corta por símbolo y timeframe aún pendiente.
+        """
+        esperas = {}
+        for est in self.estados.values():
+            esperas[est.symbol] = {mt5.TIMEFRAME_M1: est.time_m1}
+            if mt5.TIMEFRAME_M15 in vencidos:
+                esperas[est.symbol][mt5.TIMEFRAME_M15] = est.time_m15
+        velas = {s: {} for s in esperas}
+
+        while esperas:
+            vencido = time.time() >= limite
+            for symbol in list(esperas):
+                faltan = esperas[symbol]
+                for tf, ultimo_time in list(faltan.items()):
+                    rates = self.obtener_rates(symbol, tf, VELAS_POLL)
+                    if rates is None: continue
+                    velas[symbol][tf] = rates
+                    if int(rates[-1]['time']) != ultimo_time: del faltan[tf]
+                if faltan and not vencido: continue
+                del esperas[symbol]
+                self.emitir_simbolo(self.estados[symbol], velas[symbol].get(mt5.TIMEFRAME_M1),
+                                    velas[symbol].get(mt5.TIMEFRAME_M15))
+            if esperas: time.sleep(FEEDER_REINTENTO_SEG)
+
+    def ultima_fila(self, symbol, motor, timeframe, rates=None):
+        """
+        Indicadores de la vela en formación en O(1): solo pide las últimas velas.
+        Si hay un hueco (p. ej. el proceso estuvo congelado) se vuelve a sembrar con histórico.
+        """
+        if rates is None:
+            rates = self.obtener_rates(symbol, timeframe, VELAS_POLL)
+        fila = motor.actualizar(rates)
+        if fila is None:
+            fila = motor.sembrar(self.obtener_rates(symbol, timeframe, VELAS_SEMILLA))
+        return fila
+
     def calcular_indicadores(self, df: pl.DataFrame):
         """
         Calcula la matriz de 19 indicadores. 
         Se usa la misma lógica para ambos timeframes para mantener la coherencia.
+        Referencia vectorizada de `MotorIndicadores`, que es lo que usa `stream()`.
         """
         # 1-6. Estructura de EMAs
         for s in [10, 20, 40, 80, 160, 320]:
@@ -84,35 +177,157 @@ class MT5FeederAlpha:
 
         return df
 
+    def publicar_htf(self, pipe, est, row_htf):
+        """Caché HTF versionada por símbolo: SET para lecturas puntuales + PUBLISH para suscriptores."""
+        est.version_htf += 1
+        row_htf["Close_Price"] = row_htf.pop("close")
+        row_htf["version"] = est.version_htf
+        row_htf["symbol"] = est.symbol
+        payload = json.dumps(row_htf)
+        pipe.set(canal_simbolo(KEY_HTF_CONTEXT, est.symbol), payload)
+        publicar(pipe, canal_simbolo(CH_HTF_CONTEXT, est.symbol), payload)
+
+    def emitir_simbolo(self, est, rates_m1, rates_m15=None):
+        """Un ciclo sensorial de un símbolo: HTF (si cambió) y M1 (si es vela nueva) en un solo viaje a Redis."""
+        if rates_m15 is None:
+            # M15 no estaba vencido: basta la vela en formación
+            rates_m15 = self.obtener_rates(est.symbol, mt5.TIMEFRAME_M15, VELAS_POLL)
+        pipe = self.r.pipeline(transaction=False)
+        self.publicar_velas(pipe, est, rates_m1, rates_m15)
+        pipe.execute()
+
+    def publicar_velas(self, pipe, est, rates_m1, rates_m15):
+        """Calcula y encola HTF (si su vela cambió) y M1 (si la vela es nueva) a partir de velas recientes."""
+        # 1. FLUJO HTF (M15): solo si la vela M15 es nueva o cambió
+        firma = firma_vela(rates_m15)
+        if firma is not None and firma != est.firma_htf:
+            row_htf = self.ultima_fila(est.symbol, est.motor_m15, mt5.TIMEFRAME_M15, rates_m15)
+            if row_htf is not None:
+                # Publicamos en un canal específico para HTF antes que el M1 que lo consume
+                self.publicar_htf(pipe, est, row_htf)
+                est.firma_htf = firma
+                est.time_m15 = firma[0]
+
+        # 2. FLUJO OPERATIVO (M1)
+        last_m1 = self.ultima_fila(est.symbol, est.motor_m1, mt5.TIMEFRAME_M1, rates_m1)
+        if last_m1 is not None:
+            est.time_m1 = int(last_m1['time'])
+            ts = datetime.fromtimestamp(est.time_m1, tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+            
+            if ts != est.ultima_vela_m1:
+                data = {k: (float(v) if isinstance(v, (float, int)) else str(v)) for k, v in last_m1.items()}
+                data["Close_Price"] = data.pop("close")
+                data["Timestamp"] = ts
+                ch = canal_simbolo(CH_MARKET_DATA, est.symbol)
+                publicar(pipe, ch, codificar(ch, data))
+                est.ultima_vela_m1 = ts
+
+    # --- Modo ticks ---
+
+    def sembrar_ticks(self, est):
+        """Siembra motores y agregadores con histórico del broker y fija el cursor en el último tick."""
+        info = mt5.symbol_info(est.symbol)
+        punto = info.point if info is not None else 0.01
+        est.ag_m1 = AgregadorVelas(60, FEEDER_VELAS_LOCALES, punto)
+        est.ag_m15 = AgregadorVelas(900, FEEDER_VELAS_LOCALES, punto)
+        for tf, motor, ag in ((mt5.TIMEFRAME_M1, est.motor_m1, est.ag_m1), (mt5.TIMEFRAME_M15, est.motor_m15, est.ag_m15)):
+            rates = self.obtener_rates(est.symbol, tf, VELAS_SEMILLA)
+            motor.sembrar(rates)
+            ag.sembrar(rates)
+        tick = mt5.symbol_info_tick(est.symbol)
+        # Lo ocurrido hasta este tick ya está dentro de la vela sembrada
+        est.ultimo_msc = int(tick.time_msc) if tick is not None else int(time.time() * 1000)
+        est.vistos_msc = FEEDER_TICKS_LOTE
+
+    def leer_ticks(self, est):
+        """
+        Ticks nuevos desde el cursor (copy_ticks_from pide por segundo: se descartan los ya vistos).
+        Un lote lleno sin nada nuevo significa más de FEEDER_TICKS_LOTE ticks en el mismo segundo:
+        copy_ticks_from no pagina dentro de un segundo, así que el cursor salta al siguiente.
+        """
+        lotes = []
+        while True:
+            ticks = mt5.copy_ticks_from(est.symbol, est.ultimo_msc // 1000, FEEDER_TICKS_LOTE, mt5.COPY_TICKS_ALL)
+            if ticks is None or len(ticks) == 0: break
+            msc = ticks["time_msc"]
+            iguales = np.flatnonzero(msc == est.ultimo_msc)
+            nuevos = msc > est.ultimo_msc
+            nuevos[iguales[est.vistos_msc:]] = True
+            if nuevos.any():
+                lotes.append(ticks[nuevos])
+                ultimo = int(msc[-1])
+                est.vistos_msc = int(np.count_nonzero(msc == ultimo))
+                est.ultimo_msc = ultimo
+            elif len(ticks) == FEEDER_TICKS_LOTE:
+                print(f"⚠️ {est.symbol}: más de {FEEDER_TICKS_LOTE} ticks en un segundo; se salta el resto del segundo.")
+                est.ultimo_msc = (est.ultimo_msc // 1000 + 1) * 1000
+                est.vistos_msc = 0
+                continue
+            if len(ticks) < FEEDER_TICKS_LOTE: break
+        if not lotes: return None
+        return lotes[0] if len(lotes) == 1 else np.concatenate(lotes)
+
+    def procesar_ticks(self, pipe, est):
+        """Publica los ticks nuevos y, si abrieron vela M1, recalcula indicadores con las velas locales."""
+        ticks = self.leer_ticks(est)
+        if ticks is None: return
+        ch = canal_simbolo(CH_TICKS, est.symbol)
+        for time_msc, bid, ask, last, volume in ticks[["time_msc", "bid", "ask", "last", "volume"]].tolist():
+            publicar(pipe, ch, codificar(ch, {"time_msc": time_msc, "bid": bid, "ask": ask,
+                                              "last": last, "volume": float(volume)}))
+
+        est.ag_m15.agregar_ticks(ticks)
+        if est.ag_m1.agregar_ticks(ticks):
+            self.publicar_velas(pipe, est, est.ag_m1.ultimas(VELAS_POLL), est.ag_m15.ultimas(VELAS_POLL))
+
+    def stream_ticks(self):
+        """
+        Ingesta por ticks: consultas incrementales cortas en lugar de 400 velas por sondeo.
+        Los ticks salen por CH_TICKS en cuanto llegan; las velas M1/M15 se agregan en local
+        y el flujo de velas se publica igual que en modo "velas" (una vez por vela M1 nueva).
+        """
+        print(f"📡 Transmitiendo ticks y 19 señales fractales a la Médula Espinal...")
+        for est in self.estados.values():
+            self.sembrar_ticks(est)
+
+        while True:
+            pipe = self.r.pipeline(transaction=False)
+            for est in self.estados.values():
+                self.procesar_ticks(pipe, est)
+            pipe.execute()
+            time.sleep(FEEDER_TICK_POLL_SEG)
+
     def stream(self):
+        """
+        Ciclo dirigido por cierres de vela: duerme hasta la frontera M1/M15 (+ gracia),
+        espera la vela nueva del broker y solo recalcula un timeframe si su vela cambió.
+        Cada símbolo sale en su propio pipeline de Redis en cuanto su vela está lista.
+        """
+        if FEEDER_MODO == "ticks":
+            return self.stream_ticks()
         print(f"📡 Transmitiendo 19 señales fractales a la Médula Espinal...")
-        ultima_vela_m1 = None
+        reloj = RelojVelas({mt5.TIMEFRAME_M1: 60, mt5.TIMEFRAME_M15: 900}, gracia=FEEDER_GRACIA_SEG)
+        vencidos = []
         
         while True:
-            # 1. FLUJO HTF (M15)
-            df_m15 = self.obtener_datos(mt5.TIMEFRAME_M15, 400)
-            if df_m15 is not None:
-                df_m15 = self.calcular_indicadores(df_m15)
-                row_htf = df_m15.tail(1).to_dicts()[0]
-                row_htf["Close_Price"] = row_htf.pop("close")
-                # Publicamos en un canal específico para HTF
-                self.r.set("htf_context_data", json.dumps(row_htf))
-
-            # 2. FLUJO OPERATIVO (M1)
-            df_m1 = self.obtener_datos(mt5.TIMEFRAME_M1, 400)
-            if df_m1 is not None:
-                df_m1 = self.calcular_indicadores(df_m1)
-                last_m1 = df_m1.tail(1).to_dicts()[0]
-                ts = datetime.fromtimestamp(int(last_m1['time']), tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
-                
-                if ts != ultima_vela_m1:
-                    data = {k: (float(v) if isinstance(v, (float, int)) else str(v)) for k, v in last_m1.items()}
-                    data["Close_Price"] = data.pop("close")
-                    data["Timestamp"] = ts
-                    self.r.publish(CH_MARKET_DATA, json.dumps(data))
-                    ultima_vela_m1 = ts
-            
-            time.sleep(0.5)
+            self.esperar_velas_nuevas(vencidos, time.time() + FEEDER_ESPERA_MAX_SEG)
+            _, vencidos = reloj.esperar()
+
+def _correr_shard(symbols):
+    MT5FeederAlpha(symbols).stream()
+
+def lanzar_feeder(symbols=None, procesos=FEEDER_PROCESOS):
+    """Reparte los símbolos en `procesos` shards (round-robin). Con 1 shard corre en este proceso."""
+    symbols = list(symbols or SIMBOLOS)
+    procesos = max(1, min(procesos, len(symbols)))
+    if procesos == 1:
+        _correr_shard(symbols)
+        return
+    shards = [symbols[i::procesos] for i in range(procesos)]
+    hijos = [Process(target=_correr_shard, args=(shard,), daemon=True) for shard in shards]
+    for h in hijos: h.start()
+    print(f"🧩 Feeder repartido en {procesos} shards: {shards}")
+    for h in hijos: h.join()
 
 if __name__ == "__main__":
-    MT5FeederAlpha().stream()
\ No newline at end of file
+    lanzar_feeder()
@@ -0,0 +1,76 @@
+import numpy as np
+
+# Misma disposición que el array de `copy_rates_from_pos`, así el MotorIndicadores
+# consume indistintamente velas del broker o velas agregadas localmente.
+DTYPE_VELAS = np.dtype([("time", "<i8"), ("open", "<f8"), ("high", "<f8"), ("low", "<f8"),
+                        ("close", "<f8"), ("tick_volume", "<u8"), ("spread", "<i4"), ("real_volume", "<u8")])
+
+
+class AgregadorVelas:
+    """
+    Construye velas de `periodo` segundos a partir de ticks, en un buffer circular numpy.
+
+    Precio de la vela = bid (como las velas de MT5). `tick_volume` cuenta ticks y
+    `spread` guarda el último spread en puntos. Solo se conservan las últimas
+    `capacidad` velas: lo justo para el motor incremental, sin volver a pedir histórico.
+    """
+
+    def __init__(self, periodo, capacidad=512, punto=0.01):
+        self.periodo = int(periodo)
+        self.capacidad = int(capacidad)
+        self.punto = punto
+        self.buf = np.zeros(self.capacidad, dtype=DTYPE_VELAS)
+        self.n = 0  # Velas escritas desde la siembra (la última es la que está en formación)
+
+    def _fila(self, k):
+        return self.buf[k % self.capacidad]
+
+    def sembrar(self, rates):
+        """Arranca desde velas del broker (la última puede estar en formación)."""
+        self.n = 0
+        if rates is None: return
+        for vela in rates[-self.capacidad:]:
+            self.buf[self.n % self.capacidad] = vela
+            self.n += 1
+
+    def tiempo_actual(self):
+        return int(self._fila(self.n - 1)["time"]) if self.n else None
+
+    def agregar_ticks(self, ticks):
+        """
+        Incorpora un lote de ticks ordenados. Devuelve cuántas velas nuevas se abrieron.
+        Los ticks anteriores a la vela en formación (llegados tarde) se ignoran.
+        """
+        if ticks is None or len(ticks) == 0: return 0
+        cubetas = (ticks["time"] // self.periodo) * self.periodo
+        bid = ticks["bid"]
+        spreads = np.rint((ticks["ask"] - bid) / self.punto).astype(np.int32)
+        cortes = np.concatenate(([0], np.flatnonzero(np.diff(cubetas)) + 1, [len(ticks)]))
+
+        nuevas = 0
+        actual = self.tiempo_actual()
+        for a, b in zip(cortes[:-1], cortes[1:]):
+            t = int(cubetas[a])
+            tramo = bid[a:b]
+            if actual is not None and t < actual:
+                continue
+            if actual is not None and t == actual:
+                fila = self.buf[(self.n - 1) % self.capacidad]
+                fila["high"] = max(float(fila["high"]), float(tramo.max()))
+                fila["low"] = min(float(fila["low"]), float(tramo.min()))
+                fila["close"] = tramo[-1]
+                fila["tick_volume"] += b - a
+                fila["spread"] = spreads[b - 1]
+                continue
+            self.buf[self.n % self.capacidad] = (t, tramo[0], tramo.max(), tramo.min(), tramo[-1], b - a, spreads[b - 1], 0)
+            self.n += 1
+            nuevas += 1
+            actual = t
+        return nuevas
+
+    def ultimas(self, cantidad):
+        """Copia de las últimas `cantidad` velas en orden cronológico (formato copy_rates)."""
+        cantidad = min(int(cantidad), self.n, self.capacidad)
+        if cantidad <= 0: return None
+        idx = np.arange(self.n - cantidad, self.n) % self.capacidad
+        return self.buf[idx]
@@ -0,0 +1,56 @@
+import numpy as np
+
+
+class InferenciaCompilada:
+    """
+    Llamada al modelo Keras sin el coste fijo de `model.predict`.
+
+    Traza el modelo una sola vez con `tf.function` (firma (lote, ventana, columnas));
+    si XLA está disponible se compila con `jit_compile`. Los lotes se rellenan hasta la
+    siguiente potencia de 2 (<= lote_max) para que solo existan log2(lote_max) formas
+    compiladas. El calentamiento al arrancar paga el trazado de todas ellas antes de la
+    primera vela real.
+    """
+
+    def __init__(self, model, ventana, columnas, lote_max=1, jit_compile=True, calentamientos=20, version=None):
+        import tensorflow as tf
+        self.model = model
+        self.version = version
+        self.lotes = [1]
+        while self.lotes[-1] < lote_max:
+            self.lotes.append(self.lotes[-1] * 2)
+        self.entradas = {b: np.zeros((b, ventana, columnas), dtype=np.float32) for b in self.lotes}
+        firma = [tf.TensorSpec((None, ventana, columnas), tf.float32)]
+
+        def llamar(x):
+            return model(x, training=False)
+
+        self.modo = "xla"
+        try:
+            self._fn = tf.function(llamar, input_signature=firma, jit_compile=jit_compile)
+            self._fn(self.entradas[1])
+        except Exception:
+            # Algunos builds (p. ej. Windows sin XLA) no compilan: grafo trazado sin JIT
+            self.modo = "grafo"
+            self._fn = tf.function(llamar, input_signature=firma)
+        for b in self.lotes:
+            self._fn(self.entradas[b])
+        for _ in range(calentamientos):
+            self._fn(self.entradas[1])
+
+    def predecir_lote(self, fotos):
+        """`fotos` es (n, ventana, columnas); devuelve (n, clases)."""
+        n = len(fotos)
+        maximo = self.lotes[-1]
+        if n > maximo:
+            return np.concatenate([self.predecir_lote(fotos[i:i + maximo]) for i in range(0, n, maximo)])
+        lote = next(b for b in self.lotes if b >= n)
+        entrada = self.entradas[lote]
+        entrada[:n] = fotos
+        return self._fn(entrada).numpy()[:n]
+
+    def predecir(self, foto_norm):
+        """`foto_norm` es (ventana, columnas); devuelve el vector de probabilidades."""
+        entrada = self.entradas[1]
+        entrada[0] = foto_norm
+        return self._fn(entrada).numpy()[0]
@@ -0,0 +1,195 @@
+from collections import deque
+
+# Columnas crudas que entrega mt5.copy_rates_from_pos (mismo orden que el DataFrame de Polars)
+CAMPOS_VELA = ["time", "open", "high", "low", "close", "tick_volume", "spread", "real_volume"]
+
+SPANS_EMA = [10, 20, 40, 80, 160, 320]
+N_ADX = 14
+N_RSI = 14
+VENTANA_VOLUMEN = 20
+
+
+def vela_desde_rates(rates, i):
+    """Convierte la fila i del array estructurado de MT5 en un dict con tipos nativos de Python."""
+    fila = rates[i]
+    vela = {}
+    for campo in CAMPOS_VELA:
+        valor = fila[campo]
+        vela[campo] = float(valor) if campo in ("open", "high", "low", "close") else int(valor)
+    return vela
+
+
+class EWMAjustada:
+    """
+    Media exponencial equivalente a `ewm_mean(span=s)` de Polars (adjust=True, min_periods=1).
+    Mantiene numerador y denominador ponderados: cada vela nueva cuesta O(1).
+    """
+    __slots__ = ("decaimiento", "num", "den")
+
+    def __init__(self, span):
+        self.decaimiento = 1.0 - 2.0 / (span + 1.0)
+        self.num = 0.0
+        self.den = 0.0
+
+    def avanzar(self, x):
+        self.num = x + self.decaimiento * self.num
+        self.den = 1.0 + self.decaimiento * self.den
+        return self.num / self.den
+
+    def previsualizar(self, x):
+        """Valor que tendría la media con `x` como último dato, sin consolidar el estado."""
+        return (x + self.decaimiento * self.num) / (1.0 + self.decaimiento * self.den)
+
+
+class MotorIndicadores:
+    """
+    Motor incremental de los 19 indicadores de `MT5FeederAlpha.calcular_indicadores`.
+
+    Se siembra una sola vez con el histórico y después solo consume las velas nuevas:
+    - Las velas cerradas se consolidan en el estado (EWM, diferencias, ventana de volumen).
+    - La vela en formación se evalúa sobre el estado consolidado sin modificarlo, de modo
+      que puede recalcularse en cada tick sin corromper la serie.
+
+    El resultado es el mismo que aplicar las expresiones de Polars sobre toda la serie
+    desde la siembra. El estado acumula todo el histórico (no una ventana fija), así que
+    la siembra debe tener al menos las 400 velas que usaba el cálculo completo.
+    """
+
+    def __init__(self):
+        self._reiniciar()
+
+    def _reiniciar(self):
+        self.ema = {s: EWMAjustada(s) for s in SPANS_EMA}
+        self.ema_12 = EWMAjustada(12)
+        self.ema_26 = EWMAjustada(26)
+        self.ganancia = EWMAjustada(N_RSI)
+        self.perdida = EWMAjustada(N_RSI)
+        self.atr = EWMAjustada(N_ADX)
+        self.dm_pos = EWMAjustada(N_ADX)
+        self.dm_neg = EWMAjustada(N_ADX)
+        self.adx = EWMAjustada(N_ADX)
+
+        self.volumenes = deque(maxlen=VENTANA_VOLUMEN - 1)
+        self.suma_volumen = 0.0
+
+        # Memoria de la última vela consolidada (equivalente a los .shift(1) de Polars)
+        self.vela_previa = None
+        self.ema_princ_previa = None
+        self.rsi_previo = None
+        self.adx_previo = None
+        self.ultimo_tiempo = None
+
+    # --- API pública ---
+
+    def sembrar(self, rates):
+        """
+        Inicializa el estado con el histórico. La última fila se trata como vela en formación.
+        Hace falta al menos una vela cerrada: sin ella no hay `ultimo_tiempo` desde el que
+        `actualizar` pueda seguir, y se devuelve None (siembra insuficiente).
+        """
+        self._reiniciar()
+        if rates is None or len(rates) < 2:
+            return None
+        for i in range(len(rates) - 1):
+            self.cerrar_vela(vela_desde_rates(rates, i))
+        return self.evaluar(vela_desde_rates(rates, len(rates) - 1))
+
+    def actualizar(self, rates):
+        """
+        Consume un bloque corto de velas recientes (p. ej. las últimas 5).
+        Consolida las que cerraron desde la última llamada y devuelve la fila de
+        indicadores de la vela en formación. Devuelve None si el bloque no solapa
+        con el estado (hueco de datos): el llamador debe volver a sembrar.
+        """
+        if rates is None or len(rates) == 0:
+            return None
+        if self.ultimo_tiempo is None or int(rates[0]["time"]) > self.ultimo_tiempo:
+            return None
+        if int(rates[-1]["time"]) <= self.ultimo_tiempo:
+            return None
+
+        for i in range(len(rates) - 1):
+            if int(rates[i]["time"]) > self.ultimo_tiempo:
+                self.cerrar_vela(vela_desde_rates(rates, i))
+        return self.evaluar(vela_desde_rates(rates, len(rates) - 1))
+
+    def cerrar_vela(self, vela):
+        """Consolida una vela cerrada en el estado incremental."""
+        fila = self._calcular(vela, consolidar=True)
+        self.vela_previa = vela
+        self.ema_princ_previa = fila["EMA_Princ"]
+        self.rsi_previo = fila["RSI_Val"]
+        self.adx_previo = fila["ADX_Val"]
+        self.ultimo_tiempo = vela["time"]
+
+        vol = float(vela["tick_volume"])
+        if len(self.volumenes) == self.volumenes.maxlen:
+            self.suma_volumen -= self.volumenes[0]
+        self.volumenes.append(vol)
+        self.suma_volumen += vol
+        return fila
+
+    def evaluar(self, vela):
+        """Indicadores de la vela en formación sin alterar el estado consolidado."""
+        return self._calcular(vela, consolidar=False)
+
+    # --- Núcleo de cálculo ---
+
+    def _calcular(self, vela, consolidar):
+        paso = (lambda ewm, x: ewm.avanzar(x)) if consolidar else (lambda ewm, x: ewm.previsualizar(x))
+        close, high, low = vela["close"], vela["high"], vela["low"]
+        previa = self.vela_previa
+
+        fila = dict(vela)
+
+        # 1-6. Estructura de EMAs
+        for s in SPANS_EMA:
+            fila[f"EMA_{s}"] = paso(self.ema[s], close)
+
+        # 7-8. EMA Principal y Pendiente
+        fila["EMA_Princ"] = fila["EMA_20"]
+        fila["EMA_Princ_Slope"] = None if self.ema_princ_previa is None else fila["EMA_Princ"] - self.ema_princ_previa
+
+        # 9-10. RSI y Velocidad
+        delta = 0.0 if previa is None else close - previa["close"]
+        gain = paso(self.ganancia, delta if delta > 0 else 0.0)
+        loss = paso(self.perdida, -delta if delta < 0 else 0.0)
+        fila["RSI_Val"] = 100 - (100 / (1 + (gain / (loss + 1e-9))))
+        fila["RSI_Velocidad"] = None if self.rsi_previo is None else fila["RSI_Val"] - self.rsi_previo
+
+        # 11. MACD
+        fila["MACD_Val"] = paso(self.ema_12, close) - paso(self.ema_26, close)
+
+        # 12-15. ADX / DMI / ATR
+        if previa is None:
+            tr, p_dm_raw, m_dm_raw = high - low, 0.0, 0.0
+        else:
+            tr = max(high - low, abs(high - previa["close"]), abs(low - previa["close"]))
+            diff_h = high - previa["high"]
+            diff_l = previa["low"] - low
+            p_dm_raw = diff_h if (diff_h > diff_l and diff_h > 0) else 0.0
+            m_dm_raw = diff_l if (diff_l > diff_h and diff_l > 0) else 0.0
+
+        atr = paso(self.atr, tr)
+        p_dm = paso(self.dm_pos, p_dm_raw)
+        m_dm = paso(self.dm_neg, m_dm_raw)
+        p_di = 100 * (p_dm / (atr + 1e-9))
+        m_di = 100 * (m_dm / (atr + 1e-9))
+        dx = 100 * abs(p_di - m_di) / (p_di + m_di + 1e-9)
+        adx_val = paso(self.adx, dx)
+
+        fila["DI_Plus"] = p_di
+        fila["DI_Minus"] = m_di
+        fila["ADX_Val"] = adx_val
+        fila["ADX_Diff"] = None if self.adx_previo is None else adx_val - self.adx_previo
+        fila["ATR_Act"] = atr
+        fila["ATR_Rel"] = atr / close
+
+        # 18. Volumen Relativo (media móvil simple de 20 incluyendo la vela actual)
+        if len(self.volumenes) < VENTANA_VOLUMEN - 1:
+            fila["Volumen_Relativo"] = None
+        else:
+            media = (self.suma_volumen + vela["tick_volume"]) / VENTANA_VOLUMEN
+            fila["Volumen_Relativo"] = vela["tick_volume"] / media if media else float("nan")
+
+        return fila
@@ -0,0 +1,198 @@
+import sys
+import os
+import json
+import time
+
+import redis
+
+sys.path.append(os.getcwd())
+from config import (REDIS_HOST, REDIS_PORT, CH_MARKET_DATA, CH_REPLAY_ACK,
+                    REPLAY_VELOCIDAD, REPLAY_CHUNK, REPLAY_LOTE,
+                    REPLAY_VENTANA_ACK, REPLAY_CONSUMIDORES_ACK, REPLAY_ACK_TIMEOUT_SEG, REPLAY_ACK_REINTENTOS,
+                    SIMBOLO_DEFECTO, canal_simbolo)
+from codec_medula import codificar
+from transporte_medula import publicar
+from latido_medula import esperar_listos, faltan_listos
+
+
+def confirmar_replay(r, data, neurona):
+    """
+    Lado consumidor del modo "ack": la neurona avisa que terminó de procesar la vela.
+    No hace nada con datos en vivo (sin `replay_seq`), así que es seguro llamarlo siempre.
+    """
+    seq = data.get('replay_seq')
+    if seq is not None:
+        r.publish(CH_REPLAY_ACK, json.dumps({"neurona": neurona, "replay_seq": seq}))
+
+
+class MotorReplay:
+    """
+    Alimentador de Memoria de alto rendimiento (sustituye al bucle iterrows + sleep fijo).
+
+    Lee el CSV por bloques y publica en lotes con pipeline de Redis. `velocidad` define el ritmo:
+    - 0      -> lo más rápido posible (lotes de `lote` velas por viaje a Redis).
+    - 1.0    -> tiempo real según la columna Timestamp.
+    - N      -> N veces más rápido que el tiempo real.
+    - "ack"  -> al ritmo de `consumidores_ack`, con una ventana de crédito: como mucho `ventana`
+               velas publicadas sin que todos los consumidores las hayan confirmado (el Ejecutor
+               confirma al decidir). Es contrapresión: la neurona más lenta marca el ritmo y
+               nunca acumula más de `ventana` velas en cola. Con `ventana` = 1 es paso a paso
+               estricto, el modo determinista de backtest: ninguna neurona ve la vela n+1 antes
+               de que todas hayan terminado con la n. La primera vela sale cuando todos los
+               consumidores laten como listos.
+    """
+
+    def __init__(self, file_path, velocidad=REPLAY_VELOCIDAD, chunk=REPLAY_CHUNK, lote=REPLAY_LOTE,
+                 consumidores_ack=REPLAY_CONSUMIDORES_ACK, simbolo=SIMBOLO_DEFECTO, ventana=REPLAY_VENTANA_ACK):
+        self.file_path = file_path
+        self.velocidad = velocidad
+        self.chunk = chunk
+        self.lote = lote
+        self.consumidores_ack = set(consumidores_ack)
+        self.ventana = max(int(ventana), 1)
+        self.confirmadas = {}  # {neurona: última replay_seq confirmada}
+        self.canal = canal_simbolo(CH_MARKET_DATA, simbolo)
+        self.r = redis.Redis(host=REDIS_HOST, port=REDIS_PORT)
+        self.publicadas = 0
+
+    def leer_bloques(self):
+        """Genera (registros, epochs) por bloque sin cargar el CSV completo en memoria."""
+        # Importación diferida: las neuronas solo usan confirmar_replay y no deben cargar pandas
+        import pandas as pd
+        for bloque in pd.read_csv(self.file_path, chunksize=self.chunk):
+            if 'Timestamp' in bloque.columns:
+                epochs = ((pd.to_datetime(bloque['Timestamp']) - pd.Timestamp("1970-01-01")) / pd.Timedelta(seconds=1)).tolist()
+            else:
+                epochs = [None] * len(bloque)
+            yield bloque.to_dict('records'), epochs
+
+    # --- Modos de publicación ---
+
+    def _publicar_lote(self, payloads):
+        pipe = self.r.pipeline(transaction=False)
+        for p in payloads:
+            publicar(pipe, self.canal, p)
+        pipe.execute()
+        self.publicadas += len(payloads)
+
+    def _reproducir_maximo(self):
+        pendientes = []
+        for registros, _ in self.leer_bloques():
+            for reg in registros:
+                pendientes.append(codificar(self.canal, reg))
+                if len(pendientes) >= self.lote:
+                    self._publicar_lote(pendientes)
+                    pendientes = []
+        if pendientes:
+            self._publicar_lote(pendientes)
+
+    def _reproducir_ritmo(self):
+        """Tiempo real o N×: agrupa en un lote todas las velas cuyo instante ya venció."""
+        t0_reloj, t0_mercado = None, None
+        pendientes = []
+        for registros, epochs in self.leer_bloques():
+            for reg, epoch in zip(registros, epochs):
+                if epoch is not None:
+                    if t0_mercado is None:
+                        t0_reloj, t0_mercado = time.monotonic(), epoch
+                    objetivo = t0_reloj + (epoch - t0_mercado) / self.velocidad
+                    espera = objetivo - time.monotonic()
+                    if espera > 0:
+                        if pendientes:
+                            self._publicar_lote(pendientes)
+                            pendientes = []
+                        time.sleep(espera)
+                pendientes.append(codificar(self.canal, reg))
+                if len(pendientes) >= self.lote:
+                    self._publicar_lote(pendientes)
+                    pendientes = []
+        if pendientes:
+            self._publicar_lote(pendientes)
+
+    def _leer_acks(self, acks, timeout):
+        """Espera un ack hasta `timeout` y recoge también los que ya estén en cola."""
+        msg = acks.get_message(timeout=timeout)
+        while msg is not None:
+            if msg['type'] == 'message':
+                ack = json.loads(msg['data'])
+                neurona = ack.get('neurona')
+                if neurona in self.confirmadas:
+                    # Cada neurona procesa en orden: confirmar la vela n confirma las anteriores
+                    self.confirmadas[neurona] = max(self.confirmadas[neurona], ack.get('replay_seq', 0))
+            msg = acks.get_message(timeout=0.0)
+
+    def _esperar_acks(self, acks, seq):
+        """
+        Bloquea hasta que todos los consumidores hayan confirmado la vela `seq`. Una neurona que
+        se retrasa se sigue esperando mientras lata; si murió o no avanza tras
+        REPLAY_ACK_REINTENTOS plazos, el replay se aborta: un backtest sin ella no vale.
+        """
+        plazos = 0
+        limite = time.monotonic() + REPLAY_ACK_TIMEOUT_SEG
+        avance = min(self.confirmadas.values())
+        while True:
+            faltan = sorted(n for n, s in self.confirmadas.items() if s < seq)
+            if not faltan:
+                return
+            if min(self.confirmadas.values()) > avance:
+                avance, plazos = min(self.confirmadas.values()), 0
+                limite = time.monotonic() + REPLAY_ACK_TIMEOUT_SEG
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                plazos += 1
+                caidas = faltan_listos(self.r, faltan)
+                if caidas:
+                    raise RuntimeError(f"Replay abortado en vela #{seq}: {', '.join(caidas)} sin latido (caída o reiniciándose)")
+                if plazos >= REPLAY_ACK_REINTENTOS:
+                    raise RuntimeError(f"Replay abortado en vela #{seq}: sin ack de {faltan} "
+                                       f"tras {plazos * REPLAY_ACK_TIMEOUT_SEG:.0f} s")
+                print(f"⚠️ Replay: vela #{seq} sigue esperando a {faltan} ({plazos}/{REPLAY_ACK_REINTENTOS})")
+                limite = time.monotonic() + REPLAY_ACK_TIMEOUT_SEG
+                continue
+            self._leer_acks(acks, restante)
+
+    def _reproducir_ack(self):
+        acks = self.r.pubsub()
+        acks.subscribe(CH_REPLAY_ACK)
+        acks.get_message(timeout=1.0)  # Confirmación de la suscripción
+        # Una neurona que aún carga (p. ej. TF en n_visual) perdería la vela 1 por Pub/Sub
+        esperar_listos(self.r, sorted(self.consumidores_ack), "Replay")
+        self.confirmadas = dict.fromkeys(self.consumidores_ack, 0)
+        # Se publica en tandas de media ventana: la otra media sigue en vuelo mientras tanto
+        tanda = min(self.lote, max(self.ventana // 2, 1))
+        seq = 0
+        pendientes = []
+
+        for registros, _ in self.leer_bloques():
+            for reg in registros:
+                seq += 1
+                reg['replay_seq'] = seq
+                pendientes.append(codificar(self.canal, reg))
+                if len(pendientes) >= tanda:
+                    # Crédito: tras esta tanda no puede haber más de `ventana` velas sin confirmar
+                    self._esperar_acks(acks, seq - self.ventana)
+                    self._publicar_lote(pendientes)
+                    pendientes = []
+        if pendientes:
+            self._esperar_acks(acks, seq - self.ventana)
+            self._publicar_lote(pendientes)
+        # El replay termina cuando todas las neuronas terminaron la última vela
+        self._esperar_acks(acks, seq)
+
+        acks.close()
+
+    def reproducir(self):
+        print(f"🧠 Leyendo Memoria Histórica: {self.file_path} | Velocidad: {self.velocidad}")
+        inicio = time.monotonic()
+
+        if self.velocidad == "ack":
+            self._reproducir_ack()
+        elif not self.velocidad:
+            self._reproducir_maximo()
+        else:
+            self._reproducir_ritmo()
+
+        duracion = time.monotonic() - inicio
+        print(f"✅ Replay terminado: {self.publicadas} velas en {duracion:.1f}s "
+              f"({self.publicadas / max(duracion, 1e-9):.0f} velas/s)")
+        return self.publicadas
@@ -1,15 +1,20 @@
 import redis
-import json
 import os
 import sys
 
 sys.path.append(os.getcwd())
-from config import REDIS_HOST, REDIS_PORT, CH_MARKET_DATA, CH_VOTES
+from config import REDIS_HOST, REDIS_PORT, CH_MARKET_DATA, CH_VOTES, canal_simbolo, canales_simbolos, separar_canal
+from lobulo_percepcion.motor_replay import confirmar_replay
+from codec_medula import codificar, decodificar
+from transporte_medula import publicar, suscribir_hidratado
+from latido_medula import iniciar_latido
+from traza_medula import continuar
 
 def main():
     r = redis.Redis(host=REDIS_HOST, port=REDIS_PORT)
-    pubsub = r.pubsub()
-    pubsub.subscribe(CH_MARKET_DATA)
+    latido = iniciar_latido(r)
+    # Arranque en caliente: la última vela ya publicada de cada símbolo hace de precio anterior
+    pubsub, historia = suscribir_hidratado(r, canales_simbolos(CH_MARKET_DATA), "n_momentum", 1)
 
     # Identificador único para el sistema de reputación
     # Si creas otro archivo, cámbiale este ID a "momentum_v2"
@@ -17,12 +22,18 @@ def main():
 
     print(f"--- ⚡ Experto Momentum Activo: {EXPERTO_ID} ---")
 
-    # Memoria simple para detectar dirección
-    precio_anterior = None
+    # Memoria simple para detectar dirección (una por símbolo)
+    precios_anteriores = {}
+    for canal, payloads in historia.items():
+        if payloads:
+            precios_anteriores[separar_canal(canal)[1]] = decodificar(payloads[-1]).get('Close_Price', 0)
 
-    for message in pubsub.listen():
+    latido.listo()
+    for message in latido.escuchar(pubsub):
         if message['type'] == 'message':
-            data = json.loads(message['data'])
+            _, simbolo = separar_canal(message['channel'])
+            data = decodificar(message['data'])
+            precio_anterior = precios_anteriores.get(simbolo)
             
             precio_actual = data.get('Close_Price', 0)
             adx = data.get('ADX_Val', 0)
@@ -49,16 +60,20 @@ def main():
                 "confianza": round(confianza, 2),
                 "Timestamp": data.get('Timestamp')
             }
+            traza = continuar(data.get("traza"), "n_momentum")
+            if traza: voto_payload["traza"] = traza
             
             # Publicar voto en el canal democrático
-            r.publish(CH_VOTES, json.dumps(voto_payload))
+            ch = canal_simbolo(CH_VOTES, simbolo)
+            publicar(r, ch, codificar(ch, voto_payload))
             
             # Actualizar memoria
-            precio_anterior = precio_actual
+            precios_anteriores[simbolo] = precio_actual
+            confirmar_replay(r, data, "n_momentum")
             
             if voto != 0:
                 dir_label = "BUY" if voto == 1 else "SELL"
-                print(f"🗳️ {EXPERTO_ID} votó {dir_label} | Conf: {confianza:.2f}")
+                print(f"🗳️ {EXPERTO_ID} votó {dir_label} {simbolo} | Conf: {confianza:.2f}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
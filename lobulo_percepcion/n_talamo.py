@@ -1,27 +1,33 @@
-import redis, json, sys, os
+import sys, os
 sys.path.append(os.getcwd())
-from config import REDIS_HOST, REDIS_PORT, CH_MARKET_DATA, CH_BRAIN_PULSE
+from config import CH_MARKET_DATA, CH_BRAIN_PULSE
+from nucleo_fusionado import correr_neurona
 
-def main():
-    r = redis.Redis(host=REDIS_HOST, port=REDIS_PORT)
-    pubsub = r.pubsub()
-    pubsub.subscribe(CH_MARKET_DATA)
-    # flush=True asegura que aparezca en el orquestador inmediatamente
-    print("--- 🧠 Neurona Talamica Activada: Emitiendo Pulso Crudo ---", flush=True)
+class NeuronaTalamo:
+    NOMBRE = "n_talamo"
+    ENTRADAS = [CH_MARKET_DATA]
+    SALIDAS = [CH_BRAIN_PULSE]
+
+    def __init__(self):
+        # flush=True asegura que aparezca en el orquestador inmediatamente
+        print("--- 🧠 Neurona Talamica Activada: Emitiendo Pulso Crudo ---", flush=True)
 
-    for message in pubsub.listen():
-        if message['type'] == 'message':
-            data = json.loads(message['data'])
-            regimenes = {i: data.get(f'prob_regimen_{i}', 0) for i in range(7)}
-            id_dominante = max(regimenes, key=regimenes.get)
-            
-            brain_pulse = {
-                "Timestamp": data.get('Timestamp'),
-                "Close_Price": data.get('Close_Price'),
-                "regime_id": id_dominante,
-                "confidence": regimenes[id_dominante]
-            }
-            r.publish(CH_BRAIN_PULSE, json.dumps(brain_pulse))
+    def procesar(self, canal, simbolo, data, emitir):
+        regimenes = {i: data.get(f'prob_regimen_{i}', 0) for i in range(7)}
+        id_dominante = max(regimenes, key=regimenes.get)
+        
+        brain_pulse = {
+            "Timestamp": data.get('Timestamp'),
+            "Close_Price": data.get('Close_Price'),
+            "regime_id": id_dominante,
+            "confidence": regimenes[id_dominante]
+        }
+        # Backtest "ack": el Ejecutor confirma la vela cuando cierra su barrera
+        if 'replay_seq' in data: brain_pulse['replay_seq'] = data['replay_seq']
+        emitir(CH_BRAIN_PULSE, simbolo, brain_pulse)
+
+def main():
+    correr_neurona(NeuronaTalamo())
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,13 +1,24 @@
 import redis
-import json
 import numpy as np
-import tensorflow as tf
 import os
 import sys
+import time
+import threading
 
 # Asegurar que reconozca la raíz para importar config
 sys.path.append(os.getcwd())
-from config import REDIS_HOST, REDIS_PORT, CH_MARKET_DATA, CH_VOTES
+from config import (REDIS_HOST, REDIS_PORT, CH_MARKET_DATA, CH_VOTES, INFERENCIA_MODO,
+                    canal_simbolo, canales_simbolos, separar_canal)
+from lobulo_percepcion.motor_replay import confirmar_replay
+from lobulo_percepcion.inferencia_visual import InferenciaCompilada
+from medidor_latencia import MedidorLatencia
+from lobulo_percepcion.servidor_inferencia import ClienteInferencia
+from lobulo_percepcion.registro_modelos import resolver, RecargadorModelo
+from lobulo_percepcion.normalizacion import ZScoreRodante, marca_vela
+from codec_medula import codificar, decodificar
+from transporte_medula import publicar, suscribir_hidratado
+from latido_medula import iniciar_latido
+from traza_medula import continuar
 
 # PARÁMETROS DEL TRIAL 15
 VENTANA = 45
@@ -15,85 +26,174 @@ COLUMNAS_INPUT = [
     'EMA_10', 'EMA_20', 'EMA_40', 'EMA_80', 'EMA_160', 'EMA_320', 
     'DI_Plus', 'DI_Minus', 'ADX_Val', 'RSI_Val', 'MACD_Val', 'ATR_Rel'
 ]
+REPORTE_LATENCIA_VELAS = 100  # Cada cuántas inferencias se imprime p50/p99
+MODELO = "cerebro_hft_alpha"   # Nombre en el registro de modelos
+
+def cargar_motor(ruta, version):
+    """Carga + trazado + calentamiento: la primera vela con este modelo ya no paga la compilación."""
+    import tensorflow as tf
+    model = tf.keras.models.load_model(ruta)
+    return InferenciaCompilada(model, VENTANA, len(COLUMNAS_INPUT), version=version)
+
+# Identidad para la Matriz de Reputación
+EXPERTO_ID = "ia_visual_alpha_v1"
+
+def publicar_voto(r, simbolo, data, pred, version):
+    """Traduce las probabilidades del modelo al contrato de votos y publica el voto del símbolo."""
+    ts = data.get('Timestamp')
+    idx_clase = np.argmax(pred)
+    confianza = float(pred[idx_clase])
+
+    # --- MAPEO AL CONTRATO DE VOTOS ---
+    # Clases originales: 0=Neutral, 1=BUY, 2=SELL
+    voto = 0
+    if idx_clase == 1: voto = 1   # BUY
+    elif idx_clase == 2: voto = -1 # SELL
+
+    # 3. Construcción del Voto
+    voto_payload = {
+        "experto_id": EXPERTO_ID,
+        "voto": voto,
+        "confianza": round(confianza, 2),
+        "Timestamp": ts,
+        "meta": f"Predicción clase {idx_clase} con {confianza:.2%}",
+        "modelo_version": str(version)
+    }
+    traza = continuar(data.get("traza"), "n_visual")
+    if traza: voto_payload["traza"] = traza
+
+    # 4. Publicación en el canal democrático
+    ch = canal_simbolo(CH_VOTES, simbolo)
+    publicar(r, ch, codificar(ch, voto_payload))
+
+    if voto != 0:
+        dir_label = "BUY" if voto == 1 else "SELL"
+        print(f"[{ts}] {EXPERTO_ID} votó {dir_label} {simbolo} | Conf: {confianza:.2%}")
+
+def registrar_latencia(latencias, t0):
+    latencias.registrar((time.perf_counter() - t0) * 1000)
+    if latencias.total % REPORTE_LATENCIA_VELAS == 0:
+        p50, p99 = latencias.percentiles()
+        print(f"⏱️ {EXPERTO_ID} inferencia p50: {p50:.3f} ms | p99: {p99:.3f} ms")
+
+def recoger_votos(r, cliente, latencias):
+    """
+    Hilo de respuestas del servidor de inferencia: el bucle principal solo envía ventanas,
+    así las de todos los símbolos de una vela viajan juntas y el servidor puede agruparlas.
+    """
+    while True:
+        try:
+            resultados = cliente.recibir()
+        except Exception as e:
+            print(f"Error recogiendo inferencias en IA Visual: {e}")
+            time.sleep(1)
+            continue
+        for (simbolo, data, t0), pred, version in resultados:
+            try:
+                if pred is None:
+                    print(f"[{data.get('Timestamp')}] {EXPERTO_ID}: servidor de inferencia sin respuesta, vela sin voto.")
+                    continue
+                registrar_latencia(latencias, t0)
+                publicar_voto(r, simbolo, data, pred, version)
+            except Exception as e:
+                print(f"Error publicando voto en IA Visual: {e}")
+            finally:
+                confirmar_replay(r, data, "n_visual")
 
 def main():
     print("[EXPERTO IA VISUAL]: Iniciando carga del Cerebro Alpha...")
-    
-    # Identidad para la Matriz de Reputación
-    EXPERTO_ID = "ia_visual_alpha_v1"
-
-    # 1. Carga del Modelo
-    ruta_modelo = os.path.join(os.getcwd(), 'modelos', 'cerebro_hft_alpha.h5')
-    if not os.path.exists(ruta_modelo):
-        print(f"ERROR: El archivo {ruta_modelo} NO EXISTE.")
-        return
-
-    try:
-        model = tf.keras.models.load_model(ruta_modelo)
-        print(f"Modelo {EXPERTO_ID} cargado exitosamente.")
-    except Exception as e:
-        print(f"ERROR AL CARGAR EL MODELO: {e}")
-        return
 
     # 2. Conexión a la Médula Espinal (Redis)
     r = redis.Redis(host=REDIS_HOST, port=REDIS_PORT)
-    pubsub = r.pubsub()
-    pubsub.subscribe(CH_MARKET_DATA)
+    # Late ya durante la carga de TF: el Supervisor distingue "arrancando" de "caído"
+    latido = iniciar_latido(r)
+
+    # 1. Carga del Modelo (o cliente del servidor de inferencia compartido)
+    recargador = None
+    if INFERENCIA_MODO == "servidor":
+        # Sin TensorFlow en este proceso: el servidor junta nuestras ventanas con las de otros expertos
+        # (y hace él mismo la recarga en caliente de versiones)
+        motor = ClienteInferencia(r, MODELO, EXPERTO_ID)
+        print(f"Modelo {EXPERTO_ID} servido por servidor_inferencia.")
+    else:
+        ruta_modelo, version = resolver(MODELO)
+        if not os.path.exists(ruta_modelo):
+            print(f"ERROR: El archivo {ruta_modelo} NO EXISTE.")
+            return
 
-    memoria_velas = []
+        try:
+            motor = cargar_motor(ruta_modelo, version)
+            print(f"Modelo {EXPERTO_ID} {version} cargado exitosamente. Inferencia: {motor.modo}")
+        except Exception as e:
+            print(f"ERROR AL CARGAR EL MODELO: {e}")
+            return
+        # Versiones nuevas se cargan y calientan en segundo plano (registro_modelos.py publicar ...)
+        recargador = RecargadorModelo(r, MODELO, cargar_motor)
+        recargador.start()
+    # Arranque en caliente: la ventana se rellena con las últimas velas ya publicadas (sin votar)
+    # y la suscripción sigue justo después de la última, sin huecos ni velas repetidas
+    t0 = time.perf_counter()
+    pubsub, historia = suscribir_hidratado(r, canales_simbolos(CH_MARKET_DATA), "n_visual", VENTANA)
+
+    # Una ventana de velas independiente por símbolo
+    memorias = {}
+    for canal, payloads in historia.items():
+        _, simbolo = separar_canal(canal)
+        memoria_velas = memorias[simbolo] = ZScoreRodante(VENTANA, len(COLUMNAS_INPUT))
+        for raw in payloads:
+            vela = decodificar(raw)
+            memoria_velas.agregar([vela.get(col, 0) for col in COLUMNAS_INPUT], marca_vela(vela.get('Timestamp')))
+    hidratadas = sum(len(p) for p in historia.values())
+    print(f"💧 {EXPERTO_ID} hidratado con {hidratadas} velas en {(time.perf_counter() - t0) * 1000:.1f} ms")
+    latencias = MedidorLatencia()
+    servidor = INFERENCIA_MODO == "servidor"
+    if servidor:
+        threading.Thread(target=recoger_votos, args=(r, motor, latencias), daemon=True).start()
     print(f"👁️ Experto {EXPERTO_ID} activo. Esperando pulso sensorial...")
+    latido.listo()
 
-    for message in pubsub.listen():
+    for message in latido.escuchar(pubsub):
         if message['type'] == 'message':
+            data = {}
+            en_vuelo = False  # La confirmación del replay la hace el hilo de respuestas
             try:
-                data = json.loads(message['data'])
+                _, simbolo = separar_canal(message['channel'])
+                data = decodificar(message['data'])
+
+                # Cambio de modelo atómico entre velas: las ventanas por símbolo se conservan
+                nuevo = recargador.tomar() if recargador else None
+                if nuevo is not None:
+                    motor = nuevo
+                    print(f"🔁 {EXPERTO_ID} opera ahora con {MODELO} {motor.version}")
+
+                memoria_velas = memorias.get(simbolo)
+                if memoria_velas is None:
+                    memoria_velas = memorias[simbolo] = ZScoreRodante(VENTANA, len(COLUMNAS_INPUT))
                 ts = data.get('Timestamp')
                 
-                # Extraer indicadores para la IA
-                inputs = [data.get(col, 0) for col in COLUMNAS_INPUT]
-                memoria_velas.append(inputs)
-
-                # Mantener solo el tamaño de la ventana
-                if len(memoria_velas) > VENTANA:
-                    memoria_velas.pop(0)
+                # Extraer indicadores para la IA (el buffer circular descarta la vela más vieja;
+                # media y desviación se actualizan en O(columnas))
+                memoria_velas.agregar([data.get(col, 0) for col in COLUMNAS_INPUT], marca_vela(ts))
 
-                if len(memoria_velas) == VENTANA:
-                    # Preparación de la "foto" para la IA
-                    foto = np.array(memoria_velas)
-                    
-                    # Normalización Z-Score (tal como en el entrenamiento)
+                if memoria_velas.lista():
+                    t0 = time.perf_counter()
+                    # Normalización Z-Score (idéntica a la del entrenamiento: normalizacion.zscore_ventanas)
                     # $$Z = \frac{x - \mu}{\sigma}$$
-                    foto_norm = (foto - np.mean(foto, axis=0)) / (np.std(foto, axis=0) + 1e-8)
-                    
-                    # Predicción
-                    pred = model.predict(foto_norm.reshape(1, VENTANA, len(COLUMNAS_INPUT)), verbose=0)[0]
-                    idx_clase = np.argmax(pred)
-                    confianza = float(pred[idx_clase])
-
-                    # --- MAPEO AL CONTRATO DE VOTOS ---
-                    # Clases originales: 0=Neutral, 1=BUY, 2=SELL
-                    voto = 0
-                    if idx_clase == 1: voto = 1   # BUY
-                    elif idx_clase == 2: voto = -1 # SELL
-
-                    # 3. Construcción del Voto
-                    voto_payload = {
-                        "experto_id": EXPERTO_ID,
-                        "voto": voto,
-                        "confianza": round(confianza, 2),
-                        "Timestamp": ts,
-                        "meta": f"Predicción clase {idx_clase} con {confianza:.2%}"
-                    }
-
-                    # 4. Publicación en el canal democrático
-                    r.publish(CH_VOTES, json.dumps(voto_payload))
+                    foto_norm = memoria_velas.normalizada()
                     
-                    if voto != 0:
-                        dir_label = "BUY" if voto == 1 else "SELL"
-                        print(f"[{ts}] {EXPERTO_ID} votó {dir_label} | Conf: {confianza:.2%}")
+                    # Predicción (con servidor, sin esperar: vota el hilo de respuestas)
+                    if servidor:
+                        motor.enviar(foto_norm, (simbolo, data, t0))
+                        en_vuelo = True
+                        continue
+                    pred = motor.predecir(foto_norm)
+                    registrar_latencia(latencias, t0)
+                    publicar_voto(r, simbolo, data, pred, motor.version)
 
             except Exception as e:
                 print(f"Error procesando vela en IA Visual: {e}")
+            finally:
+                if not en_vuelo: confirmar_replay(r, data, "n_visual")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
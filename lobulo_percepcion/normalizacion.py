@@ -0,0 +1,172 @@
+"""
+Normalización Z-Score por ventana deslizante, compartida entre el experto en vivo y el
+entrenamiento/backtest offline.
+
+En lugar de recalcular media y desviación de toda la ventana en cada vela, se mantienen
+sumas y sumas de cuadrados rodantes (O(columnas) por vela). Para que la cancelación no
+degrade la precisión:
+- Las sumas se llevan sobre datos desplazados (x - K), con K = la fila del último reanclaje.
+- Cada `reanclaje` velas las sumas se recalculan exactas desde la ventana.
+
+Los reanclajes caen en velas cuya `marca` (p. ej. minuto epoch) es múltiplo de `reanclaje`,
+no en "cada N velas desde que arrancó el proceso". Así el experto en vivo y el cálculo por
+lotes sobre el histórico hacen exactamente las mismas operaciones en el mismo orden desde el
+primer reanclaje común, y el resultado es idéntico bit a bit.
+"""
+import calendar
+import time
+
+import numpy as np
+
+EPS = 1e-8
+
+
+def marca_vela(ts, periodo=60):
+    """'YYYY-mm-dd HH:MM:SS' (UTC) -> número de vela epoch (epoch // periodo). None si no se puede leer."""
+    try:
+        return calendar.timegm(time.strptime(ts, "%Y-%m-%d %H:%M:%S")) // periodo
+    except (TypeError, ValueError):
+        return None
+
+
+class VentanaCircular:
+    """
+    Ventana deslizante preasignada de `ventana` x `columnas` sin pop(0) ni np.array por vela.
+
+    Cada fila se escribe dos veces (posición i e i + ventana), así las últimas `ventana`
+    filas siempre forman un bloque contiguo del buffer y se leen como vista, sin copiar.
+    """
+
+    def __init__(self, ventana, columnas):
+        self.ventana = ventana
+        self.buf = np.zeros((2 * ventana, columnas), dtype=np.float64)
+        self.pos = 0
+        self.llenas = 0
+
+    def agregar(self, fila):
+        self.buf[self.pos] = fila
+        self.buf[self.pos + self.ventana] = fila
+        self.pos = (self.pos + 1) % self.ventana
+        self.llenas = min(self.llenas + 1, self.ventana)
+
+    def lista(self):
+        return self.llenas == self.ventana
+
+    def mas_antigua(self):
+        return self.buf[self.pos]
+
+    def vista(self):
+        """Las últimas `ventana` filas en orden cronológico (vista, no copia)."""
+        return self.buf[self.pos:self.pos + self.ventana]
+
+
+def _sumas_exactas(filas, k):
+    y = filas - k
+    return np.add.accumulate(y, axis=0)[-1], np.add.accumulate(y * y, axis=0)[-1]
+
+
+def _toca_reanclar(n, marca, reanclaje):
+    if n == 0: return True
+    if marca is None: return n % reanclaje == 0
+    return marca % reanclaje == 0
+
+
+class ZScoreRodante:
+    """Forma en vivo: una fila por vela, estadísticas incrementales y ventana normalizada."""
+
+    def __init__(self, ventana, columnas, reanclaje=None, eps=EPS):
+        self.memoria = VentanaCircular(ventana, columnas)
+        self.ventana = ventana
+        self.reanclaje = reanclaje or ventana
+        self.eps = eps
+        self.n = 0
+        self.k = np.zeros(columnas)
+        self.s = np.zeros(columnas)
+        self.q = np.zeros(columnas)
+
+    def agregar(self, fila, marca=None):
+        x = np.asarray(fila, dtype=np.float64)
+        if _toca_reanclar(self.n, marca, self.reanclaje):
+            self.memoria.agregar(x)
+            self.k = x.copy()
+            recientes = self.memoria.vista()[-min(self.n + 1, self.ventana):]
+            self.s, self.q = _sumas_exactas(recientes, self.k)
+        else:
+            y_nueva = x - self.k
+            if self.n >= self.ventana:
+                y_vieja = self.memoria.mas_antigua() - self.k
+                self.s = self.s + (y_nueva - y_vieja)
+                self.q = self.q + (y_nueva * y_nueva - y_vieja * y_vieja)
+            else:
+                self.s = self.s + y_nueva
+                self.q = self.q + y_nueva * y_nueva
+            self.memoria.agregar(x)
+        self.n += 1
+
+    def lista(self):
+        return self.memoria.lista()
+
+    def estadisticas(self):
+        """(media, desviación) de la ventana actual, en coordenadas desplazadas por K."""
+        n_ef = min(self.n, self.ventana)
+        media = self.s / n_ef
+        return media, np.sqrt(np.maximum(self.q / n_ef - media * media, 0.0))
+
+    def normalizada(self):
+        """Ventana actual normalizada: ((x - K) - media) / (std + eps)."""
+        media, std = self.estadisticas()
+        return ((self.memoria.vista() - self.k) - media) / (std + self.eps)
+
+
+def estadisticas_rodantes(datos, ventana, marcas=None, reanclaje=None):
+    """
+    Forma por lotes de ZScoreRodante sobre una serie completa (T x columnas).
+    Devuelve (K, media, std) por vela con exactamente la misma aritmética que la forma en vivo.
+    """
+    x = np.asarray(datos, dtype=np.float64)
+    total = len(x)
+    reanclaje = reanclaje or ventana
+    indices = np.arange(total)
+    if marcas is None:
+        anclas = indices % reanclaje == 0
+    else:
+        anclas = np.asarray(marcas) % reanclaje == 0
+    anclas[:1] = True
+    inicios = np.flatnonzero(anclas)
+    fines = np.append(inicios[1:], total)
+
+    k = np.empty_like(x)
+    s = np.empty_like(x)
+    q = np.empty_like(x)
+    for a, b in zip(inicios, fines):
+        ka = x[a]
+        k[a:b] = ka
+        s0, q0 = _sumas_exactas(x[max(0, a - ventana + 1):a + 1], ka)
+        t = indices[a + 1:b]
+        y_nueva = x[a + 1:b] - ka
+        sale = (t >= ventana)[:, None]
+        y_vieja = np.where(sale, x[np.maximum(t - ventana, 0)] - ka, 0.0)
+        # Antes de llenar la ventana no sale ninguna fila: se suma y_nueva tal cual
+        ds = np.where(sale, y_nueva - y_vieja, y_nueva)
+        dq = np.where(sale, y_nueva * y_nueva - y_vieja * y_vieja, y_nueva * y_nueva)
+        s[a:b] = np.add.accumulate(np.vstack([s0[None], ds]), axis=0)
+        q[a:b] = np.add.accumulate(np.vstack([q0[None], dq]), axis=0)
+
+    n_ef = np.minimum(indices + 1, ventana)[:, None]
+    media = s / n_ef
+    return k, media, np.sqrt(np.maximum(q / n_ef - media * media, 0.0))
+
+
+def zscore_ventanas(datos, ventana, marcas=None, reanclaje=None, finales=None, eps=EPS):
+    """
+    Ventanas normalizadas (N x ventana x columnas) que terminan en los índices `finales`
+    (por defecto todas: ventana-1 .. T-1). Misma salida que ZScoreRodante.normalizada().
+    """
+    from numpy.lib.stride_tricks import sliding_window_view
+    x = np.asarray(datos, dtype=np.float64)
+    k, media, std = estadisticas_rodantes(x, ventana, marcas, reanclaje)
+    if finales is None:
+        finales = np.arange(ventana - 1, len(x))
+    finales = np.asarray(finales)
+    ventanas = sliding_window_view(x, ventana, axis=0).transpose(0, 2, 1)[finales - ventana + 1]
+    return ((ventanas - k[finales][:, None, :]) - media[finales][:, None, :]) / (std[finales][:, None, :] + eps)
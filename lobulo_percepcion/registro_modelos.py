@@ -0,0 +1,156 @@
+"""
+Registro versionado de modelos (modelos/registro.json) y recarga en caliente.
+
+    {"cerebro_hft_alpha": {"activa": "v2",
+                           "versiones": {"v1": "modelos/cerebro_hft_alpha/v1.h5",
+                                         "v2": "modelos/cerebro_hft_alpha/v2.h5"}}}
+
+Sin entrada en el registro se usa el archivo histórico `modelos/<nombre>.h5` como versión "base".
+
+Publicar un modelo reentrenado (copia, activa y avisa a los expertos en marcha):
+    python lobulo_percepcion/registro_modelos.py publicar cerebro_hft_alpha nuevo.h5
+Volver a una versión anterior:
+    python lobulo_percepcion/registro_modelos.py activar cerebro_hft_alpha v1
+"""
+import os
+import sys
+import json
+import shutil
+import argparse
+import threading
+
+sys.path.append(os.getcwd())
+from config import REDIS_HOST, REDIS_PORT, PATH_REGISTRO_MODELOS, CH_CONTROL_MODELOS
+
+DIR_MODELOS = os.path.dirname(PATH_REGISTRO_MODELOS)
+VERSION_BASE = "base"
+
+
+def cargar_registro():
+    if os.path.exists(PATH_REGISTRO_MODELOS):
+        with open(PATH_REGISTRO_MODELOS, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+
+def guardar_registro(registro):
+    # Escritura atómica: un experto que lee a la vez nunca ve un JSON a medias
+    tmp = PATH_REGISTRO_MODELOS + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(registro, f, indent=2)
+    os.replace(tmp, PATH_REGISTRO_MODELOS)
+
+
+def resolver(nombre, version=None):
+    """(ruta, versión) del modelo: la versión pedida o la activa del registro."""
+    entrada = cargar_registro().get(nombre)
+    if entrada is None:
+        if version not in (None, VERSION_BASE):
+            raise KeyError(f"{nombre} no tiene versiones registradas")
+        return os.path.join(DIR_MODELOS, f"{nombre}.h5"), VERSION_BASE
+    version = version or entrada["activa"]
+    if version not in entrada["versiones"]:
+        raise KeyError(f"{nombre}: versión {version} no registrada")
+    return entrada["versiones"][version], version
+
+
+def registrar(nombre, origen, version=None, activar=True):
+    registro = cargar_registro()
+    entrada = registro.setdefault(nombre, {"activa": None, "versiones": {}})
+    if version is None:
+        numeros = [int(v[1:]) for v in entrada["versiones"] if v[1:].isdigit()]
+        version = f"v{max(numeros, default=0) + 1}"
+    destino = os.path.join(DIR_MODELOS, nombre, f"{version}{os.path.splitext(origen)[1]}")
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    shutil.copy2(origen, destino)
+    entrada["versiones"][version] = destino.replace(os.sep, "/")
+    if activar or entrada["activa"] is None:
+        entrada["activa"] = version
+    guardar_registro(registro)
+    return version
+
+
+def activar(nombre, version):
+    registro = cargar_registro()
+    if version not in registro.get(nombre, {}).get("versiones", {}):
+        raise KeyError(f"{nombre}: versión {version} no registrada")
+    registro[nombre]["activa"] = version
+    guardar_registro(registro)
+
+
+def ordenar_carga(r, nombre, version=None):
+    """Comando de control: los procesos que sirven `nombre` cargan la versión en segundo plano."""
+    r.publish(CH_CONTROL_MODELOS, json.dumps({"accion": "cargar", "modelo": nombre, "version": version}))
+
+
+class RecargadorModelo(threading.Thread):
+    """
+    Escucha CH_CONTROL_MODELOS y prepara (carga + calentamiento) la versión nueva en segundo plano.
+    El bucle del experto llama a `tomar()` entre velas: el cambio es atómico y la ventana
+    de velas no se toca. `cargar(ruta, version)` debe devolver el motor ya calentado.
+    """
+
+    def __init__(self, r, nombre, cargar):
+        super().__init__(daemon=True)
+        self.r = r
+        self.nombre = nombre
+        self.cargar = cargar
+        self.pendiente = None
+
+    def run(self):
+        pubsub = self.r.pubsub()
+        pubsub.subscribe(CH_CONTROL_MODELOS)
+        for message in pubsub.listen():
+            if message['type'] != 'message':
+                continue
+            try:
+                orden = json.loads(message['data'])
+                if orden.get("accion") != "cargar" or orden.get("modelo") != self.nombre:
+                    continue
+                ruta, version = resolver(self.nombre, orden.get("version"))
+                print(f"🔄 {self.nombre}: cargando versión {version} en segundo plano...", flush=True)
+                self.pendiente = self.cargar(ruta, version)
+                print(f"✅ {self.nombre}: versión {version} lista, entra en la próxima vela.", flush=True)
+            except Exception as e:
+                print(f"❌ {self.nombre}: recarga fallida, se mantiene el modelo actual: {e}", flush=True)
+
+    def tomar(self):
+        """Motor nuevo si hay uno listo (una sola vez), si no None."""
+        motor, self.pendiente = self.pendiente, None
+        return motor
+
+
+def main():
+    import redis
+    parser = argparse.ArgumentParser(description="Registro versionado de modelos")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p = sub.add_parser("publicar", help="Registra un archivo como versión nueva, la activa y la recarga en caliente")
+    p.add_argument("nombre")
+    p.add_argument("archivo")
+    p.add_argument("--version", default=None)
+    p.add_argument("--sin-activar", action="store_true")
+    a = sub.add_parser("activar", help="Activa una versión ya registrada y la recarga en caliente")
+    a.add_argument("nombre")
+    a.add_argument("version")
+    sub.add_parser("listar")
+    args = parser.parse_args()
+
+    if args.comando == "listar":
+        print(json.dumps(cargar_registro(), indent=2))
+        return
+
+    r = redis.Redis(host=REDIS_HOST, port=REDIS_PORT)
+    if args.comando == "publicar":
+        version = registrar(args.nombre, args.archivo, args.version, activar=not args.sin_activar)
+        print(f"📦 {args.nombre} {version} registrado")
+        if args.sin_activar:
+            return
+    else:
+        activar(args.nombre, args.version)
+        version = args.version
+    ordenar_carga(r, args.nombre, version)
+    print(f"📡 Orden de recarga enviada: {args.nombre} -> {version}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+import time
+
+
+class RelojVelas:
+    """
+    Marcapasos del Feeder: duerme hasta el siguiente cierre de vela en lugar de sondear.
+
+    `periodos` mapea un identificador de timeframe (p. ej. mt5.TIMEFRAME_M1) a su
+    duración en segundos. `gracia` es el margen tras la frontera para dar tiempo a que
+    el broker publique la vela nueva.
+    """
+
+    def __init__(self, periodos, gracia=0.2):
+        self.periodos = dict(periodos)
+        self.gracia = gracia
+
+    def proxima_frontera(self, ahora=None):
+        """Epoch del próximo cierre de cualquiera de los timeframes vigilados."""
+        ahora = time.time() if ahora is None else ahora
+        return min((int(ahora // p) + 1) * p for p in self.periodos.values())
+
+    def vencidos(self, frontera):
+        """Timeframes cuya vela cierra exactamente en `frontera`."""
+        return [tf for tf, p in self.periodos.items() if frontera % p == 0]
+
+    def esperar(self):
+        """Bloquea hasta la próxima frontera + gracia. Devuelve (frontera, timeframes vencidos)."""
+        frontera = self.proxima_frontera()
+        restante = frontera + self.gracia - time.time()
+        if restante > 0:
+            time.sleep(restante)
+        return frontera, self.vencidos(frontera)
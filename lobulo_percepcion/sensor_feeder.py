@@ -3,34 +3,18 @@ import os
 # Añade la carpeta superior al path de Python
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-import pandas as pd
-import redis
-import json
-import time
-from config import REDIS_HOST, REDIS_PORT, CH_MARKET_DATA
+from lobulo_percepcion.motor_replay import MotorReplay
+from latido_medula import iniciar_latido
 
-def start_historical_feeder(file_path):
-    # Conectamos a la "Médula Espinal"
-    r = redis.Redis(host=REDIS_HOST, port=REDIS_PORT)
-    
-    print(f"🧠 Leyendo Memoria Histórica: {file_path}")
-    # Leemos el CSV (asegúrate de que la ruta sea correcta en tu carpeta /data)
-    df = pd.read_csv(file_path)
-    
-    print(f"✅ Cargadas {len(df)} velas de un minuto. Iniciando flujo sensorial...")
-
-    for index, row in df.iterrows():
-        # Convertimos la fila a un diccionario
-        tick_data = row.to_dict()
-        
-        # Publicamos el paquete sensorial completo en Redis
-        # Todas las neuronas suscritas recibirán este pulso simultáneamente
-        r.publish(CH_MARKET_DATA, json.dumps(tick_data))
-        
-        # Control de velocidad: 
-        # 0.01 = 100 velas por segundo (Super-entrenamiento)
-        # 1.0  = Velocidad real M1
-        time.sleep(0.01) 
+def start_historical_feeder(file_path, velocidad=None):
+    # Conectamos a la "Médula Espinal" y reproducimos la memoria por bloques
+    # Control de velocidad (config.REPLAY_VELOCIDAD):
+    # "ack" = Al ritmo de las neuronas (REPLAY_VENTANA_ACK = 1: paso a paso determinista, Backtest)
+    # 0     = Máxima velocidad (Super-entrenamiento)
+    # 1.0   = Velocidad real M1
+    motor = MotorReplay(file_path) if velocidad is None else MotorReplay(file_path, velocidad=velocidad)
+    iniciar_latido(motor.r).listo()
+    return motor.reproducir()
 
 if __name__ == "__main__":
-    start_historical_feeder('data/Dataset_Con_Regimenes.csv')
\ No newline at end of file
+    start_historical_feeder('data/Dataset_Con_Regimenes.csv')
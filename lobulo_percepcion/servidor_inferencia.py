@@ -0,0 +1,228 @@
+"""
+Servidor de Inferencia: un solo proceso con TensorFlow sirve a todos los expertos ML.
+
+Protocolo sobre Redis:
+- El experto hace RPUSH a KEY_INFERENCIA_COLA con [cabecera JSON][ventana float32] sin esperar
+  respuesta: las ventanas de todos los símbolos de una vela salen seguidas y un hilo del
+  experto recoge las respuestas de su propia clave (`resp`) y las empareja por id.
+- El servidor bloquea hasta la primera petición y, durante INFERENCIA_DEADLINE_MS, junta las
+  que lleguen (de cualquier experto y símbolo) hasta INFERENCIA_LOTE_MAX.
+- Agrupa por modelo, hace una llamada por lote y responde con
+  [id uint64][long. versión uint8][versión del modelo][probabilidades float32].
+- Los modelos salen del registro versionado y se recargan en caliente entre lotes.
+- Las peticiones más viejas que INFERENCIA_TIMEOUT_MS se descartan: su experto ya no espera.
+
+Requiere Redis >= 6.0 (BLPOP con timeout fraccionario); servidor y cliente lo comprueban al
+arrancar. Los lotes se sacan con LRANGE+LTRIM en MULTI (LPOP con cuenta es de 6.2).
+"""
+import os
+import sys
+import json
+import time
+import struct
+import itertools
+import threading
+from contextlib import nullcontext
+
+import numpy as np
+import redis
+
+sys.path.append(os.getcwd())
+from config import (REDIS_HOST, REDIS_PORT, KEY_INFERENCIA_COLA, MODELOS_SERVIDOS, INFERENCIA_LOTE_MAX,
+                    INFERENCIA_DEADLINE_MS, INFERENCIA_TIMEOUT_MS)
+from lobulo_percepcion.inferencia_visual import InferenciaCompilada
+from medidor_latencia import MedidorLatencia
+from lobulo_percepcion.registro_modelos import resolver, RecargadorModelo
+from latido_medula import iniciar_latido
+
+_LONGITUD = struct.Struct("<I")
+_ID = struct.Struct("<QB")
+REPORTE_LOTES = 500
+REDIS_MINIMO = (6, 0)
+
+
+def comprobar_redis(r):
+    """Falla al arrancar (y no con un ResponseError a media vela) si el Redis es demasiado viejo."""
+    try:
+        version = r.info("server").get("redis_version", "0")
+    except redis.ResponseError:
+        return  # INFO deshabilitado (p. ej. Redis gestionado): no se puede comprobar
+    if tuple(int(p) for p in str(version).split(".")[:2]) < REDIS_MINIMO:
+        raise RuntimeError(f"El servidor de inferencia requiere Redis >= {'.'.join(map(str, REDIS_MINIMO))} "
+                           f"(encontrado {version})")
+
+
+def sacar_lote(r, clave, n):
+    """Hasta `n` elementos de la cabeza de la lista, de forma atómica y válido en cualquier Redis."""
+    pipe = r.pipeline(transaction=True)
+    pipe.lrange(clave, 0, n - 1)
+    pipe.ltrim(clave, n, -1)
+    return pipe.execute()[0]
+
+
+def empaquetar_peticion(id_peticion, modelo, resp, foto):
+    foto = np.ascontiguousarray(foto, dtype=np.float32)
+    cabecera = json.dumps({"id": id_peticion, "modelo": modelo, "resp": resp,
+                           "forma": foto.shape, "ts": time.time()}).encode("utf-8")
+    return _LONGITUD.pack(len(cabecera)) + cabecera + foto.tobytes()
+
+
+def desempaquetar_peticion(raw):
+    (n,) = _LONGITUD.unpack_from(raw, 0)
+    cabecera = json.loads(raw[_LONGITUD.size:_LONGITUD.size + n])
+    foto = np.frombuffer(raw, dtype=np.float32, offset=_LONGITUD.size + n).reshape(cabecera["forma"])
+    return cabecera, foto
+
+
+class ClienteInferencia:
+    """
+    Lado del experto: `enviar` no espera (varias peticiones en vuelo a la vez) y `recibir`,
+    desde un hilo aparte, devuelve las respuestas emparejadas por id y las que vencieron.
+    """
+
+    def __init__(self, r, modelo, cliente, timeout_ms=INFERENCIA_TIMEOUT_MS):
+        self.r = r
+        self.modelo = modelo
+        self.resp = f"{KEY_INFERENCIA_COLA}:resp:{cliente}"
+        self.timeout = timeout_ms / 1000.0
+        self.ids = itertools.count(1)
+        self.pendientes = {}  # {id: (contexto, límite monotonic)}
+        self.lock = threading.Lock()
+        comprobar_redis(r)
+        self.r.delete(self.resp)
+
+    def enviar(self, foto_norm, contexto=None):
+        """Encola la ventana y vuelve enseguida; `contexto` acompaña a la respuesta en `recibir`."""
+        id_peticion = next(self.ids)
+        with self.lock:
+            self.pendientes[id_peticion] = (contexto, time.monotonic() + self.timeout)
+        try:
+            self.r.rpush(KEY_INFERENCIA_COLA, empaquetar_peticion(id_peticion, self.modelo, self.resp, foto_norm))
+        except Exception:
+            # No salió: que no venza después como si el servidor no hubiera respondido
+            with self.lock:
+                self.pendientes.pop(id_peticion, None)
+            raise
+        return id_peticion
+
+    def recibir(self, espera_seg=0.1):
+        """[(contexto, probabilidades, versión)]; probabilidades None si venció sin respuesta."""
+        item = self.r.blpop(self.resp, timeout=espera_seg)
+        raws = []
+        if item is not None:
+            raws.append(item[1])
+            raws.extend(sacar_lote(self.r, self.resp, INFERENCIA_LOTE_MAX))
+
+        resultados = []
+        with self.lock:
+            for raw in raws:
+                id_resp, n = _ID.unpack_from(raw, 0)
+                pendiente = self.pendientes.pop(id_resp, None)
+                if pendiente is None:
+                    continue  # Respuesta tardía de una petición ya vencida: se ignora
+                version = raw[_ID.size:_ID.size + n].decode("utf-8")
+                resultados.append((pendiente[0], np.frombuffer(raw, dtype=np.float32, offset=_ID.size + n), version))
+            ahora = time.monotonic()
+            for id_peticion in [i for i, (_, limite) in self.pendientes.items() if limite <= ahora]:
+                resultados.append((self.pendientes.pop(id_peticion)[0], None, None))
+        return resultados
+
+
+class ServidorInferencia:
+    def __init__(self, r, modelos=MODELOS_SERVIDOS, lote_max=INFERENCIA_LOTE_MAX):
+        import tensorflow as tf
+        comprobar_redis(r)
+        self.r = r
+        self.tf = tf
+        self.lote_max = lote_max
+        self.motores = {}
+        self.recargadores = {}
+        for nombre in modelos:
+            ruta, version = resolver(nombre)
+            if not os.path.exists(ruta):
+                print(f"⚠️ Modelo {nombre}: {ruta} NO EXISTE, no se sirve.")
+                continue
+            self.motores[nombre] = self.cargar(ruta, version)
+            print(f"🧠 Modelo {nombre} {version} servido (lote máx {lote_max}, {self.motores[nombre].modo})")
+            self.recargadores[nombre] = RecargadorModelo(r, nombre, self.cargar)
+            self.recargadores[nombre].start()
+        self.latencias = MedidorLatencia()
+        self.tamanos = MedidorLatencia()
+
+    def cargar(self, ruta, version):
+        model = self.tf.keras.models.load_model(ruta, compile=False)
+        _, ventana, columnas = model.input_shape
+        return InferenciaCompilada(model, ventana, columnas, lote_max=self.lote_max, version=version)
+
+    def recoger_lote(self):
+        """
+        Primera petición bloqueante y luego lo que llegue antes del deadline: lo ya encolado
+        sale de una vez y, mientras falte, se bloquea en BLPOP solo el tiempo que queda.
+        """
+        item = self.r.blpop(KEY_INFERENCIA_COLA, timeout=1)
+        if item is None:
+            return []
+        lote = [item[1]]
+        limite = time.monotonic() + INFERENCIA_DEADLINE_MS / 1000.0
+        while len(lote) < self.lote_max:
+            lote.extend(sacar_lote(self.r, KEY_INFERENCIA_COLA, self.lote_max - len(lote)))
+            restante = limite - time.monotonic()
+            if len(lote) >= self.lote_max or restante <= 0:
+                break
+            item = self.r.blpop(KEY_INFERENCIA_COLA, timeout=restante)
+            if item is None:
+                break
+            lote.append(item[1])
+        return lote
+
+    def atender(self, lote):
+        # Cambio de versión entre lotes: ningún lote mezcla dos modelos
+        for nombre, recargador in self.recargadores.items():
+            nuevo = recargador.tomar()
+            if nuevo is not None:
+                self.motores[nombre] = nuevo
+                print(f"🔁 Modelo {nombre} ahora en {nuevo.version}", flush=True)
+
+        ahora = time.time()
+        por_modelo = {}
+        for raw in lote:
+            cabecera, foto = desempaquetar_peticion(raw)
+            if (ahora - cabecera["ts"]) * 1000.0 > INFERENCIA_TIMEOUT_MS:
+                continue
+            por_modelo.setdefault(cabecera["modelo"], []).append((cabecera, foto))
+
+        pipe = self.r.pipeline(transaction=False)
+        for modelo, peticiones in por_modelo.items():
+            motor = self.motores.get(modelo)
+            if motor is None:
+                continue
+            t0 = time.perf_counter()
+            probs = motor.predecir_lote(np.stack([foto for _, foto in peticiones]))
+            self.latencias.registrar((time.perf_counter() - t0) * 1000)
+            self.tamanos.registrar(len(peticiones))
+            version = str(motor.version).encode("utf-8")
+            for (cabecera, _), p in zip(peticiones, probs):
+                pipe.rpush(cabecera["resp"], _ID.pack(cabecera["id"], len(version)) + version + p.astype(np.float32).tobytes())
+                pipe.expire(cabecera["resp"], 60)
+        pipe.execute()
+
+        if self.latencias.total and self.latencias.total % REPORTE_LOTES == 0:
+            p50, p99 = self.latencias.percentiles()
+            medio, _ = self.tamanos.percentiles()
+            print(f"⏱️ Inferencia por lote p50: {p50:.3f} ms | p99: {p99:.3f} ms | lote mediano: {medio:.0f}")
+
+    def servir(self, latido=None):
+        print(f"🛰️ Servidor de inferencia escuchando en '{KEY_INFERENCIA_COLA}' | Deadline: {INFERENCIA_DEADLINE_MS} ms")
+        if latido is not None:
+            latido.listo()
+        while True:
+            lote = self.recoger_lote()
+            if lote:
+                with latido.ocupado() if latido is not None else nullcontext():
+                    self.atender(lote)
+
+
+if __name__ == "__main__":
+    r = redis.Redis(host=REDIS_HOST, port=REDIS_PORT)
+    latido = iniciar_latido(r)  # Antes de cargar TF: la carga cuenta como "arrancando"
+    ServidorInferencia(r).servir(latido)
@@ -0,0 +1,148 @@
+"""
+Diario binario del Hipocampo: registros de ancho fijo con columnas tipadas (dtype de numpy).
+
+- Los eventos se acumulan en un buffer preasignado y se escriben de un solo `write` cuando
+  llegan a DIARIO_LOTE registros o pasan DIARIO_FLUSH_SEG segundos desde el primero pendiente.
+- Cada día tiene su archivo (`diario_AAAAMMDD.v<versión>.bin`), solo de anexado. Cada volcado
+  hace fsync; si el proceso muere a mitad de un registro, el trozo cortado se descarta al
+  reabrir el archivo (el tamaño siempre es múltiplo del registro).
+- Leer un mes es `np.fromfile` por archivo, sin parsear texto:
+
+    from lobulo_riesgo.diario_hipocampo import cargar_diario
+    df = cargar_diario("20261001", "20261031")
+
+Si cambian las columnas hay que subir VERSION_DIARIO: los archivos viejos siguen legibles con
+su propio dtype (DTYPES_DIARIO).
+"""
+import os
+import sys
+import time
+import glob
+import datetime
+import threading
+
+import numpy as np
+
+sys.path.append(os.getcwd())
+from config import DIARIO_DIR, DIARIO_LOTE, DIARIO_FLUSH_SEG
+
+VERSION_DIARIO = 1
+DTYPES_DIARIO = {
+    1: np.dtype([
+        ("ts", "<f8"),              # Epoch de la grabación
+        ("ts_mercado", "S19"),      # Timestamp de la vela ("AAAA-MM-DD HH:MM:SS")
+        ("simbolo", "S12"),
+        ("regimen", "<i2"),
+        ("evento", "S16"),
+        ("accion", "S10"),
+        ("consenso", "<f4"),
+        ("ordenes", "<i4"),
+        ("pnl_cierre", "<f8"),
+        ("razon", "S32"),
+        ("pnl_flotante", "<f8"),
+        ("pnl_total", "<f8"),
+    ]),
+}
+DTYPE_DIARIO = DTYPES_DIARIO[VERSION_DIARIO]
+
+
+def ruta_diario(dia, directorio=DIARIO_DIR, version=VERSION_DIARIO):
+    return os.path.join(directorio, f"diario_{dia}.v{version}.bin")
+
+
+class DiarioHipocampo:
+    def __init__(self, directorio=DIARIO_DIR, lote=DIARIO_LOTE, flush_seg=DIARIO_FLUSH_SEG):
+        os.makedirs(directorio, exist_ok=True)
+        self.directorio = directorio
+        self.flush_seg = flush_seg
+        self.buffer = np.zeros(lote, dtype=DTYPE_DIARIO)
+        self.n = 0
+        self.t_pendiente = None
+        self.dia = None
+        self.f = None
+        self.lock = threading.Lock()
+
+    def _abrir(self, dia):
+        if self.f is not None:
+            self.f.close()
+        ruta = ruta_diario(dia, self.directorio)
+        self.f = open(ruta, "ab")
+        sobra = self.f.tell() % DTYPE_DIARIO.itemsize
+        if sobra:
+            # Registro a medio escribir de una caída anterior
+            self.f.truncate(self.f.tell() - sobra)
+            self.f.seek(0, os.SEEK_END)
+        self.dia = dia
+        return ruta
+
+    def anotar(self, **campos):
+        """Añade un registro (las columnas que falten quedan a cero / vacías)."""
+        with self.lock:
+            dia = datetime.datetime.now().strftime("%Y%m%d")
+            if dia != self.dia:
+                # Rotación diaria: lo pendiente pertenece al día anterior
+                self._volcar()
+                self._abrir(dia)
+            self.buffer[self.n] = np.zeros((), dtype=DTYPE_DIARIO)
+            fila = self.buffer[self.n]
+            fila["ts"] = time.time()
+            for campo, valor in campos.items():
+                fila[campo] = valor.encode("utf-8") if isinstance(valor, str) else valor
+            self.n += 1
+            if self.t_pendiente is None:
+                self.t_pendiente = time.monotonic()
+            if self.n == len(self.buffer):
+                self._volcar()
+
+    def _volcar(self):
+        if not self.n or self.f is None:
+            return
+        self.f.write(self.buffer[:self.n].tobytes())
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        self.n = 0
+        self.t_pendiente = None
+
+    def volcar(self):
+        with self.lock:
+            self._volcar()
+
+    def vigilar(self):
+        """Hilo: vuelca lo pendiente cuando lleva DIARIO_FLUSH_SEG sin escribirse."""
+        while True:
+            with self.lock:
+                espera = self.flush_seg
+                if self.t_pendiente is not None:
+                    espera = self.t_pendiente + self.flush_seg - time.monotonic()
+                    if espera <= 0:
+                        self._volcar()
+                        espera = self.flush_seg
+            time.sleep(espera)
+
+    def cerrar(self):
+        with self.lock:
+            self._volcar()
+            if self.f is not None:
+                self.f.close()
+                self.f = None
+
+
+def cargar_diario(desde=None, hasta=None, directorio=DIARIO_DIR):
+    """DataFrame con los registros de los días [desde, hasta] ("AAAAMMDD"; None = sin límite)."""
+    import pandas as pd
+    partes = []
+    for ruta in sorted(glob.glob(os.path.join(directorio, "diario_*.v*.bin"))):
+        dia, _, version = os.path.basename(ruta)[len("diario_"):-len(".bin")].partition(".v")
+        if (desde and dia < desde) or (hasta and dia > hasta):
+            continue
+        dtype = DTYPES_DIARIO[int(version)]
+        n = os.path.getsize(ruta) // dtype.itemsize
+        partes.append(pd.DataFrame(np.fromfile(ruta, dtype=dtype, count=n)))
+    if not partes:
+        return pd.DataFrame(np.zeros(0, dtype=DTYPE_DIARIO))
+    df = pd.concat(partes, ignore_index=True)
+    for col, tipo in df.dtypes.items():
+        if tipo == object:
+            df[col] = df[col].str.decode("utf-8")
+    df["ts"] = pd.to_datetime(df["ts"], unit="s")
+    return df
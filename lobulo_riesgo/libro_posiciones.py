@@ -0,0 +1,81 @@
+"""
+Libro de posiciones de un símbolo con agregados rodantes.
+
+Las órdenes del clúster viven en arrays preasignados (lado, entrada, volumen) y el libro lleva
+al día el volumen neto con signo y el coste neto (suma de volumen * entrada con signo). Así:
+
+    PnL flotante = neto * precio - coste
+
+es O(1) por actualización de precio, sin recorrer las órdenes. Para valorar una salida real
+por tick se lleva aparte la parte larga (los largos cierran al bid, los cortos al ask). El detalle por orden se
+construye solo cuando alguien lo pide (logs, gateway, instantánea de estado).
+"""
+import numpy as np
+
+LADOS = {"BUY": 1, "SELL": -1}
+NOMBRES_LADO = {1: "BUY", -1: "SELL"}
+
+
+class LibroPosiciones:
+    def __init__(self, capacidad=16):
+        self.lados = np.zeros(capacidad, dtype=np.int8)
+        self.entradas = np.zeros(capacidad, dtype=np.float64)
+        self.volumenes = np.zeros(capacidad, dtype=np.float64)
+        self.n = 0
+        self.neto = 0.0
+        self.coste = 0.0
+        self.neto_largo = 0.0
+        self.coste_largo = 0.0
+
+    def __len__(self):
+        return self.n
+
+    def abrir(self, tipo, entrada, volumen=1.0):
+        if self.n == len(self.lados):
+            for nombre in ("lados", "entradas", "volumenes"):
+                viejo = getattr(self, nombre)
+                nuevo = np.zeros(2 * len(viejo), dtype=viejo.dtype)
+                nuevo[:self.n] = viejo
+                setattr(self, nombre, nuevo)
+        lado = LADOS[tipo]
+        self.lados[self.n] = lado
+        self.entradas[self.n] = entrada
+        self.volumenes[self.n] = volumen
+        self.n += 1
+        self.neto += lado * volumen
+        self.coste += lado * volumen * entrada
+        if lado > 0:
+            self.neto_largo += volumen
+            self.coste_largo += volumen * entrada
+
+    def vaciar(self):
+        self.n = 0
+        # Los agregados se reinician exactos: el error de redondeo no se arrastra entre clústeres
+        self.neto = 0.0
+        self.coste = 0.0
+        self.neto_largo = 0.0
+        self.coste_largo = 0.0
+
+    def pnl(self, precio):
+        return self.neto * precio - self.coste if self.n else 0.0
+
+    def pnl_salida(self, bid, ask):
+        """PnL si se cerrara ahora a mercado: los largos venden al bid y los cortos compran al ask."""
+        if not self.n:
+            return 0.0
+        largo = self.neto_largo * bid - self.coste_largo
+        corto = (self.neto - self.neto_largo) * ask - (self.coste - self.coste_largo)
+        return largo + corto
+
+    def tipo(self):
+        """Lado de la primera orden del clúster (None si está vacío)."""
+        return NOMBRES_LADO[int(self.lados[0])] if self.n else None
+
+    def precio_medio(self):
+        """Entrada media ponderada por volumen de la posición neta (None si está plana)."""
+        return self.coste / self.neto if self.neto else None
+
+    def detalle(self):
+        """Órdenes abiertas como lista de dicts (para logs, gateway e instantáneas)."""
+        return [{"tipo": NOMBRES_LADO[int(l)], "entrada": float(e), "volumen": float(v)}
+                for l, e, v in zip(self.lados[:self.n], self.entradas[:self.n], self.volumenes[:self.n])]
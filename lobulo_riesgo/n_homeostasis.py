@@ -1,24 +1,76 @@
-import redis, json, sys, os
+import redis, sys, os, time
 from rich.console import Console
 sys.path.append(os.getcwd())
 from config import *
+from lobulo_percepcion.motor_replay import confirmar_replay
+from codec_medula import codificar, decodificar
+from transporte_medula import publicar, suscribir, InstantaneaEstado
+from lobulo_riesgo.libro_posiciones import LibroPosiciones
+from latido_medula import iniciar_latido
 console = Console()
 
-def finalizar_cluster(r, pnl, regimen, razon=""):
-    r.publish(CH_RESULTS, json.dumps({"win": pnl > 0, "regimen": regimen, "final_pnl": pnl, "razon": razon}))
-    r.setex(f"{CH_BLOCK}_active", 10, "true") 
-    console.print(f"\n[bold yellow]🏁 CIERRE {razon}:[/bold yellow] PnL Realizado: [bold]{pnl:.2f}[/bold]")
+def finalizar_cluster(r, simbolo, pnl, regimen, razon=""):
+    ch = canal_simbolo(CH_RESULTS, simbolo)
+    publicar(r, ch, codificar(ch, {"win": pnl > 0, "regimen": regimen, "final_pnl": pnl, "razon": razon}))
+    # Clave con TTL (para quien arranca después) + aviso push: el Ejecutor lleva el bloqueo en memoria
+    r.setex(f"{CH_BLOCK}_active:{simbolo}", BLOQUEO_POST_CIERRE_SEG, "true")
+    ch_bloqueo = canal_simbolo(CH_BLOCK, simbolo)
+    publicar(r, ch_bloqueo, codificar(ch_bloqueo, {"expira": time.time() + BLOQUEO_POST_CIERRE_SEG, "razon": razon}))
+    console.print(f"\n[bold yellow]🏁 CIERRE {razon} {simbolo}:[/bold yellow] PnL Realizado: [bold]{pnl:.2f}[/bold]")
+
+class LibroSimbolo:
+    """Órdenes abiertas y contabilidad de PnL de un símbolo."""
+    def __init__(self):
+        self.ordenes = LibroPosiciones()  # PnL flotante O(1) por precio
+        self.pnl_diario = 0.0
+        self.pnl_historico = 0.0
+        self.ultima_fecha = None
+        self.max_pnl_flotante = 0.0
+
+    def firma(self):
+        """Lo que solo cambia con aperturas, cierres y cambios de día (max_pnl_flotante va aparte)."""
+        return (len(self.ordenes), self.pnl_diario, self.pnl_historico, self.ultima_fecha)
+
+    def pnl(self, precio):
+        return self.ordenes.pnl(precio)
+
+    def pnl_salida(self, bid, ask):
+        return self.ordenes.pnl_salida(bid, ask)
+
+    def instantanea(self):
+        return dict(vars(self), ordenes=self.ordenes.detalle())
+
+    @classmethod
+    def desde_instantanea(cls, estado):
+        libro = cls()
+        ordenes = estado.pop("ordenes", [])
+        libro.__dict__.update(estado)
+        for o in ordenes: libro.ordenes.abrir(o['tipo'], o['entrada'], o.get('volumen', 1.0))
+        return libro
+
+    def vaciar(self):
+        self.ordenes.vaciar()
+        self.max_pnl_flotante = 0.0
+
+    def salida_monetaria(self, pnl_f, tp, trail_pct):
+        """Actualiza el máximo flotante y devuelve la razón de cierre por TP/trailing ("" si no toca)."""
+        if pnl_f > self.max_pnl_flotante: self.max_pnl_flotante = pnl_f
+        if pnl_f >= tp:
+            return "OBJETIVO_OPTUNA"
+        if self.max_pnl_flotante > 100 and pnl_f < (self.max_pnl_flotante * trail_pct):
+            return "TRAILING_OPTUNA"
+        return ""
 
 def main():
     r = redis.Redis(host=REDIS_HOST, port=REDIS_PORT)
-    pubsub = r.pubsub()
-    pubsub.subscribe(CH_DECISION, CH_MARKET_DATA, CH_BRAIN_STATE)
+    latido = iniciar_latido(r)
+    # CH_TICKS solo tiene tráfico con el Feeder en modo "ticks": las salidas reaccionan por tick
+    pubsub = suscribir(r, canales_simbolos(CH_DECISION) + canales_simbolos(CH_MARKET_DATA)
+                       + canales_simbolos(CH_BRAIN_STATE) + canales_simbolos(CH_TICKS), "n_homeostasis")
 
-    ORDENES_ABIERTAS = []
-    PNL_DIARIO_ACUMULADO = 0.0
-    PNL_TOTAL_HISTORICO = 0.0
-    ULTIMA_FECHA = None
-    MAX_PNL_FLOTANTE = 0.0
+    # Arranque en caliente: órdenes abiertas, PnL diario/histórico y máximos flotantes de la vida anterior
+    instantanea = InstantaneaEstado(r, "n_homeostasis")
+    LIBROS = {s: LibroSimbolo.desde_instantanea(e) for s, e in (instantanea.cargar() or {}).items()}
 
     # PARÁMETROS MAESTROS DE OPTUNA
     TP_OPTIMO = 236.11
@@ -28,70 +80,90 @@ def main():
 
     console.print(f"[bold red]🛡️ Homeostasis v5.2: OPTUNA-EDITION[/bold red]")
     console.print(f"[dim]TP: {TP_OPTIMO} | Trail: {TRAIL_PCT*100:.1f}% | Cierre: {UMBRAL_CIERRE} | MaxOrd: {MAX_ORDENES}[/dim]")
+    if LIBROS:
+        abiertas = sum(len(l.ordenes) for l in LIBROS.values())
+        console.print(f"[dim]💧 Estado restaurado: {len(LIBROS)} símbolos | {abiertas} órdenes abiertas[/dim]")
+    latido.listo()
+    max_guardado_t = {}  # {símbolo: monotonic de la última instantánea por nuevo máximo flotante}
 
-    for message in pubsub.listen():
+    for message in latido.escuchar(pubsub):
         if message['type'] == 'message':
-            canal = message['channel'].decode('utf-8')
-            payload = json.loads(message['data'])
+            # Reentregado tras un reinicio pero ya contado en la instantánea
+            if instantanea.ya_aplicado(message): continue
+            canal, simbolo = separar_canal(message['channel'])
+            payload = decodificar(message['data'])
+            libro = LIBROS.get(simbolo)
+            if libro is None: libro = LIBROS[simbolo] = LibroSimbolo()
+            firma, max_previo = libro.firma(), libro.max_pnl_flotante
+
+            if canal == CH_TICKS:
+                if libro.ordenes:
+                    bid = payload.get('bid', 0)
+                    pnl_f = libro.pnl_salida(bid, payload.get('ask') or bid)
+                    razon_m = libro.salida_monetaria(pnl_f, TP_OPTIMO, TRAIL_PCT)
+                    if razon_m:
+                        libro.pnl_diario += pnl_f
+                        finalizar_cluster(r, simbolo, pnl_f, 0, razon_m + "_TICK")
+                        libro.vaciar()
 
-            if canal == CH_MARKET_DATA:
+            elif canal == CH_MARKET_DATA:
                 ts = payload.get('Timestamp', '')
                 precio = payload.get('Close_Price', 0)
                 if ts:
                     fecha = ts.split(' ')[0]
-                    if ULTIMA_FECHA and fecha > ULTIMA_FECHA:
-                        if ORDENES_ABIERTAS:
-                            pnl_eod = sum([(precio - o['entrada']) if o['tipo'] == 'BUY' else (o['entrada'] - precio) for o in ORDENES_ABIERTAS])
-                            PNL_TOTAL_HISTORICO += (PNL_DIARIO_ACUMULADO + pnl_eod)
-                            finalizar_cluster(r, pnl_eod, 0, "FIN_DIA_EOD")
-                            ORDENES_ABIERTAS = []
+                    if libro.ultima_fecha and fecha > libro.ultima_fecha:
+                        if libro.ordenes:
+                            pnl_eod = libro.pnl(precio)
+                            libro.pnl_historico += (libro.pnl_diario + pnl_eod)
+                            finalizar_cluster(r, simbolo, pnl_eod, 0, "FIN_DIA_EOD")
+                            libro.ordenes.vaciar()
                         else:
-                            PNL_TOTAL_HISTORICO += PNL_DIARIO_ACUMULADO
-                        PNL_DIARIO_ACUMULADO = 0.0
-                        MAX_PNL_FLOTANTE = 0.0
-                    ULTIMA_FECHA = fecha
+                            libro.pnl_historico += libro.pnl_diario
+                        libro.pnl_diario = 0.0
+                        libro.max_pnl_flotante = 0.0
+                    libro.ultima_fecha = fecha
 
-                pnl_f = sum([(precio - o['entrada']) if o['tipo'] == 'BUY' else (o['entrada'] - precio) for o in ORDENES_ABIERTAS]) if ORDENES_ABIERTAS else 0.0
-                if pnl_f > MAX_PNL_FLOTANTE: MAX_PNL_FLOTANTE = pnl_f
+                pnl_f = libro.pnl(precio)
                 
                 # --- LÓGICA DE SALIDA MATEMÁTICA ---
-                cerrar_monetario = False
-                razon_m = ""
-
-                if pnl_f >= TP_OPTIMO:
-                    cerrar_monetario = True
-                    razon_m = "OBJETIVO_OPTUNA"
-                elif MAX_PNL_FLOTANTE > 100 and pnl_f < (MAX_PNL_FLOTANTE * TRAIL_PCT):
-                    cerrar_monetario = True
-                    razon_m = "TRAILING_OPTUNA"
-
-                if cerrar_monetario:
-                    PNL_DIARIO_ACUMULADO += pnl_f
-                    finalizar_cluster(r, pnl_f, 0, razon_m)
-                    ORDENES_ABIERTAS = []
-                    MAX_PNL_FLOTANTE = 0.0
+                razon_m = libro.salida_monetaria(pnl_f, TP_OPTIMO, TRAIL_PCT)
+
+                if razon_m:
+                    libro.pnl_diario += pnl_f
+                    finalizar_cluster(r, simbolo, pnl_f, 0, razon_m)
+                    libro.vaciar()
                     pnl_f = 0.0
 
-                r.publish(CH_HOMEOSTASIS, json.dumps({
-                    "Timestamp": ts, "open_orders": len(ORDENES_ABIERTAS),
-                    "floating_pnl": round(pnl_f, 2), "daily_pnl": round(PNL_DIARIO_ACUMULADO, 2),
-                    "total_pnl": round(PNL_TOTAL_HISTORICO + PNL_DIARIO_ACUMULADO + pnl_f, 2)
+                ch = canal_simbolo(CH_HOMEOSTASIS, simbolo)
+                publicar(r, ch, codificar(ch, {
+                    "Timestamp": ts, "open_orders": len(libro.ordenes),
+                    "floating_pnl": round(pnl_f, 2), "daily_pnl": round(libro.pnl_diario, 2),
+                    "total_pnl": round(libro.pnl_historico + libro.pnl_diario + pnl_f, 2)
                 }))
+                confirmar_replay(r, payload, "n_homeostasis")
 
-            elif canal == CH_BRAIN_STATE and ORDENES_ABIERTAS:
+            elif canal == CH_BRAIN_STATE and libro.ordenes:
                 consenso = payload.get('consenso_actual', 0.0)
-                tipo = ORDENES_ABIERTAS[0]['tipo']
+                tipo = libro.ordenes.tipo()
                 # Cierre por umbral de duda detectado por Optuna
                 if (tipo == "BUY" and consenso < UMBRAL_CIERRE) or (tipo == "SELL" and consenso > -UMBRAL_CIERRE):
-                    precio_c = payload.get('Close_Price', 0)
-                    pnl_c = sum([(precio_c - o['entrada']) if o['tipo'] == 'BUY' else (o['entrada'] - precio_c) for o in ORDENES_ABIERTAS])
-                    PNL_DIARIO_ACUMULADO += pnl_c
-                    finalizar_cluster(r, pnl_c, payload.get('regime_id'), "CONVICCION_BAJA_OPTUNA")
-                    ORDENES_ABIERTAS = []
-                    MAX_PNL_FLOTANTE = 0.0
+                    pnl_c = libro.pnl(payload.get('Close_Price', 0))
+                    libro.pnl_diario += pnl_c
+                    finalizar_cluster(r, simbolo, pnl_c, payload.get('regime_id'), "CONVICCION_BAJA_OPTUNA")
+                    libro.vaciar()
 
             elif canal == CH_DECISION:
-                if PNL_DIARIO_ACUMULADO > SL_MAXIMO_DIARIO and len(ORDENES_ABIERTAS) < MAX_ORDENES:
-                    ORDENES_ABIERTAS.append({"tipo": payload['action'], "entrada": payload['price_at_entry']})
+                # El stop diario es de cuenta: suma el PnL realizado de todos los símbolos
+                pnl_dia_cuenta = sum(l.pnl_diario for l in LIBROS.values())
+                if pnl_dia_cuenta > SL_MAXIMO_DIARIO and len(libro.ordenes) < MAX_ORDENES:
+                    libro.ordenes.abrir(payload['action'], payload['price_at_entry'])
+
+            # Solo se persiste el símbolo tocado y solo si cambió: apertura, cierre, cambio de día
+            # o, como mucho cada INSTANTANEA_MAX_PNL_SEG, un nuevo máximo flotante (trailing)
+            ahora = time.monotonic()
+            if libro.firma() != firma or (libro.max_pnl_flotante != max_previo
+                                          and ahora - max_guardado_t.get(simbolo, 0.0) >= INSTANTANEA_MAX_PNL_SEG):
+                instantanea.guardar(r, {simbolo: libro.instantanea()}, message)
+                max_guardado_t[simbolo] = ahora
 
 if __name__ == "__main__": main()
\ No newline at end of file
@@ -1,47 +1,62 @@
-import redis, json, os, datetime, sys
+import redis, os, sys, signal, threading
 sys.path.append(os.getcwd())
 from config import *
-
-LOG_DIR = "bitacora_trading"
-if not os.path.exists(LOG_DIR): os.makedirs(LOG_DIR)
+from codec_medula import decodificar
+from transporte_medula import suscribir
+from lobulo_riesgo.diario_hipocampo import DiarioHipocampo, ruta_diario
+from latido_medula import iniciar_latido
 
 def main():
     r = redis.Redis(host=REDIS_HOST, port=REDIS_PORT)
-    pubsub = r.pubsub()
+    latido = iniciar_latido(r)
     # AÑADIDO CH_RESULTS para no perder ningún cierre
-    pubsub.subscribe(CH_BRAIN_STATE, CH_DECISION, CH_HOMEOSTASIS, CH_RESULTS)
-    
-    filename = os.path.join(LOG_DIR, f"historial_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
-    with open(filename, "w", encoding="utf-8") as f:
-        f.write("Timestamp_Mercado,Regimen,Evento,Detalle,PnL_Flotante,PnL_Total_Historico\n")
+    pubsub = suscribir(r, [c for base in (CH_BRAIN_STATE, CH_DECISION, CH_HOMEOSTASIS, CH_RESULTS)
+                          for c in canales_simbolos(base)], "n_log_hipocampo")
+
+    diario = DiarioHipocampo()
+    threading.Thread(target=diario.vigilar, daemon=True).start()
+    # Parada pedida por el orquestador/Supervisor (cualquier plataforma): volcar antes de salir.
+    # SIGTERM (solo POSIX) sale por el `finally`
+    latido.al_parar(diario.cerrar)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    print(f"🧠 Hipocampo grabando diario en: {DIARIO_DIR} (lote {DIARIO_LOTE}, volcado cada {DIARIO_FLUSH_SEG} s)")
+    estados = {}  # Estado por símbolo
+    latido.listo()
 
-    print(f"🧠 Hipocampo grabando historial en: {filename}")
-    estado_actual = {"regime": "0", "pnl_f": 0, "pnl_t": 0}
+    try:
+        for message in latido.escuchar(pubsub):
+            if message['type'] == 'message':
+                canal, simbolo = separar_canal(message['channel'])
+                data = decodificar(message['data'])
+                estado_actual = estados.setdefault(simbolo, {"regime": 0, "pnl_f": 0, "pnl_t": 0})
+                registro = None
 
-    for message in pubsub.listen():
-        if message['type'] == 'message':
-            canal = message['channel'].decode('utf-8')
-            data = json.loads(message['data'])
-            ts_m = data.get("Timestamp", "N/A")
-            evento, detalle = "", ""
+                if canal == CH_BRAIN_STATE:
+                    estado_actual["regime"] = data.get("regime_id", -1)
+                elif canal == CH_RESULTS:
+                    if data.get("status") == "executed":
+                        registro = {"evento": "ORDEN_LLENADA", "accion": data.get("action", "")}
+                    else:
+                        registro = {"evento": "CIERRE_COBRADO", "pnl_cierre": data.get("final_pnl") or 0.0,
+                                    "razon": str(data.get("razon", ""))}
+                elif canal == CH_DECISION:
+                    registro = {"evento": "DECISION_OPEN", "accion": data.get("action", ""),
+                                "consenso": data.get("consenso") or 0.0, "razon": data.get("reason", "")}
+                elif canal == CH_HOMEOSTASIS:
+                    estado_actual["pnl_f"] = data.get("floating_pnl", 0)
+                    estado_actual["pnl_t"] = data.get("total_pnl", 0)
+                    if data.get("open_orders", 0) > 0:
+                        registro = {"evento": "ESTADO_MERCADO", "ordenes": data.get("open_orders")}
 
-            if canal == CH_BRAIN_STATE:
-                estado_actual["regime"] = data.get("regime_id", "?")
-            elif canal == CH_RESULTS:
-                evento = "CIERRE_COBRADO"
-                detalle = f"PnL: {data.get('final_pnl'):.2f} | Razon: {data.get('razon')}"
-            elif canal == CH_DECISION:
-                evento = "DECISION_OPEN"
-                detalle = f"{data.get('action')} (Cons: {data.get('consenso')})"
-            elif canal == CH_HOMEOSTASIS:
-                estado_actual["pnl_f"] = data.get("floating_pnl", 0)
-                estado_actual["pnl_t"] = data.get("total_pnl", 0)
-                if data.get("open_orders", 0) > 0:
-                    evento = "ESTADO_MERCADO"
-                    detalle = f"Ordenes: {data.get('open_orders')}"
-            
-            if evento:
-                linea = f"{ts_m},{estado_actual['regime']},{evento},{detalle},{estado_actual['pnl_f']},{estado_actual['pnl_t']}\n"
-                with open(filename, "a", encoding="utf-8") as f: f.write(linea)
+                if registro:
+                    diario.anotar(ts_mercado=str(data.get("Timestamp", "")), simbolo=simbolo,
+                                  regimen=estado_actual["regime"], pnl_flotante=estado_actual["pnl_f"],
+                                  pnl_total=estado_actual["pnl_t"], **registro)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        diario.cerrar()
+        print(f"💾 Diario volcado: {ruta_diario(diario.dia) if diario.dia else DIARIO_DIR}")
 
-if __name__ == "__main__": main()
\ No newline at end of file
+if __name__ == "__main__": main()
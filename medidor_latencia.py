@@ -0,0 +1,24 @@
+"""
+Medidor genérico de latencias (p50/p99) compartido por todos los lóbulos: inferencia, Ejecutor,
+Gateway y Recolector de latencia.
+"""
+from collections import deque
+
+import numpy as np
+
+
+class MedidorLatencia:
+    """Muestras recientes de latencia (ms) con percentiles bajo demanda."""
+
+    def __init__(self, muestras=1000):
+        self.muestras = deque(maxlen=muestras)
+        self.total = 0
+
+    def registrar(self, ms):
+        self.muestras.append(ms)
+        self.total += 1
+
+    def percentiles(self):
+        if not self.muestras: return 0.0, 0.0
+        p50, p99 = np.percentile(np.fromiter(self.muestras, dtype=np.float64), [50, 99])
+        return float(p50), float(p99)
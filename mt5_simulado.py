@@ -0,0 +1,470 @@
+"""
+Doble de MetaTrader5 para correr el Feeder y el Gateway sin terminal de Windows.
+
+Expone el subconjunto de la API que usa el organismo (mismos nombres, constantes y
+estructuras de retorno) y sirve velas/ticks desde un CSV histórico de M1:
+- El reloj simulado avanza `velocidad` veces más rápido que el reloj real a partir de
+  la vela `inicio`, así que un feeder que sondea ve velas formarse y cerrarse.
+- Los ticks se sintetizan recorriendo cada vela O -> L -> H -> C (alcista) u O -> H -> L -> C;
+  `copy_ticks_from` los entrega a una cadencia fija de `ticks_por_vela` por minuto.
+- Sirve todos los símbolos de SIMBOLOS (config.py), cada uno con su mercado; con un solo CSV
+  todos replican el mismo histórico sobre un reloj común.
+- Las órdenes se llenan tras `latencia_ms` al precio vigente más un slippage gaussiano
+  de `slippage_puntos` (con semilla fija para que los benchmarks sean reproducibles).
+
+Uso: `import mt5_simulado as mt5` (o MT5_BACKEND = "simulado" en config.py).
+"""
+import os
+import sys
+import time
+import random
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+sys.path.append(os.getcwd())
+from config import (SIMBOLOS, MT5_SIM_DATOS, MT5_SIM_VELOCIDAD, MT5_SIM_INICIO, MT5_SIM_LATENCIA_MS,
+                    MT5_SIM_SLIPPAGE_PUNTOS, MT5_SIM_SEMILLA, MT5_SIM_SPREAD_PUNTOS, MT5_SIM_TICKS_POR_VELA)
+
+# --- Constantes (mismos valores que el paquete MetaTrader5) ---
+TIMEFRAME_M1 = 1
+TIMEFRAME_M5 = 5
+TIMEFRAME_M15 = 15
+TIMEFRAME_M30 = 30
+TIMEFRAME_H1 = 16385
+SEGUNDOS_TIMEFRAME = {TIMEFRAME_M1: 60, TIMEFRAME_M5: 300, TIMEFRAME_M15: 900,
+                      TIMEFRAME_M30: 1800, TIMEFRAME_H1: 3600}
+
+ORDER_TYPE_BUY = 0
+ORDER_TYPE_SELL = 1
+ORDER_FILLING_FOK = 0
+ORDER_FILLING_IOC = 1
+ORDER_FILLING_RETURN = 2
+ORDER_TIME_GTC = 0
+TRADE_ACTION_DEAL = 1
+TRADE_ACTION_CLOSE_BY = 10
+
+COPY_TICKS_ALL = -1
+COPY_TICKS_INFO = 1
+COPY_TICKS_TRADE = 2
+
+TRADE_RETCODE_REQUOTE = 10004
+TRADE_RETCODE_REJECT = 10006
+TRADE_RETCODE_DONE = 10009
+TRADE_RETCODE_INVALID = 10013
+TRADE_RETCODE_INVALID_VOLUME = 10014
+TRADE_RETCODE_POSITION_CLOSED = 10036
+
+ACCOUNT_TRADE_MODE_DEMO = 0
+ACCOUNT_TRADE_MODE_CONTEST = 1
+ACCOUNT_TRADE_MODE_REAL = 2
+
+ACCOUNT_MARGIN_MODE_RETAIL_NETTING = 0
+ACCOUNT_MARGIN_MODE_EXCHANGE = 1
+ACCOUNT_MARGIN_MODE_RETAIL_HEDGING = 2
+
+RES_S_OK = 1
+RES_E_FAIL = -1
+
+# --- Estructuras de retorno ---
+Tick = namedtuple("Tick", "time bid ask last volume time_msc flags volume_real")
+SymbolInfo = namedtuple("SymbolInfo", "name point digits spread filling_mode volume_min volume_max "
+                                      "volume_step trade_contract_size trade_tick_size trade_tick_value")
+AccountInfo = namedtuple("AccountInfo", "login trade_mode margin_mode leverage balance equity profit margin currency server")
+TradePosition = namedtuple("TradePosition", "ticket time type magic identifier volume price_open sl tp "
+                                            "price_current swap profit symbol comment")
+OrderSendResult = namedtuple("OrderSendResult", "retcode deal order volume price bid ask comment "
+                                                "request_id retcode_external request")
+
+DTYPE_RATES = np.dtype([("time", "<i8"), ("open", "<f8"), ("high", "<f8"), ("low", "<f8"),
+                        ("close", "<f8"), ("tick_volume", "<u8"), ("spread", "<i4"), ("real_volume", "<u8")])
+DTYPE_TICKS = np.dtype([("time", "<i8"), ("bid", "<f8"), ("ask", "<f8"), ("last", "<f8"), ("volume", "<u8"),
+                        ("time_msc", "<i8"), ("flags", "<u4"), ("volume_real", "<f8")])
+
+# Alias de columnas aceptados en el CSV (formato MT5 o el Dataset del proyecto)
+_ALIAS = {
+    "time": ["time", "Timestamp"],
+    "open": ["open", "Open", "Open_Price"],
+    "high": ["high", "High", "High_Price"],
+    "low": ["low", "Low", "Low_Price"],
+    "close": ["close", "Close", "Close_Price"],
+    "tick_volume": ["tick_volume", "Volume", "volume"],
+    "spread": ["spread", "Spread"],
+}
+
+
+class MercadoSimulado:
+    """Histórico y reloj de un símbolo: velas M1 del CSV y ticks sintetizados sobre ellas."""
+
+    def __init__(self, info, ruta, inicio, velocidad, spread_puntos, paso_tick):
+        self.info = info
+        self.ruta = ruta
+        self.inicio = int(inicio)
+        self.velocidad = velocidad
+        self.spread_puntos = spread_puntos
+        self.paso_tick = paso_tick
+        self.rates = None
+        self.t0_real = None
+        self._inicios_por_periodo = {}
+
+    # --- Datos y reloj ---
+
+    def cargar(self, t0_real):
+        import pandas as pd
+        df = pd.read_csv(self.ruta)
+        columnas = {}
+        for campo, alias in _ALIAS.items():
+            columnas[campo] = next((a for a in alias if a in df.columns), None)
+        if columnas["time"] is None or columnas["close"] is None:
+            raise ValueError(f"{self.ruta} necesita columnas de tiempo y cierre")
+
+        tiempos = df[columnas["time"]]
+        if not pd.api.types.is_numeric_dtype(tiempos):
+            tiempos = (pd.to_datetime(tiempos) - pd.Timestamp("1970-01-01")) // pd.Timedelta(seconds=1)
+
+        close = df[columnas["close"]].to_numpy(dtype=float)
+        rates = np.zeros(len(df), dtype=DTYPE_RATES)
+        rates["time"] = tiempos.to_numpy()
+        rates["close"] = close
+        # Sin OHLC completo, la vela se reconstruye desde el cierre anterior hasta el actual
+        apertura = np.concatenate(([close[0]], close[:-1]))
+        rates["open"] = df[columnas["open"]].to_numpy(dtype=float) if columnas["open"] else apertura
+        rates["high"] = df[columnas["high"]].to_numpy(dtype=float) if columnas["high"] else np.maximum(rates["open"], close)
+        rates["low"] = df[columnas["low"]].to_numpy(dtype=float) if columnas["low"] else np.minimum(rates["open"], close)
+        rates["tick_volume"] = df[columnas["tick_volume"]].to_numpy() if columnas["tick_volume"] else 1
+        rates["spread"] = df[columnas["spread"]].to_numpy() if columnas["spread"] else self.spread_puntos
+
+        self.rates = rates
+        self.inicio = min(max(self.inicio, 0), len(rates) - 1)
+        self.t0_real = t0_real
+        self._inicios_por_periodo = {}
+
+    def ahora(self):
+        """Epoch simulado: arranca en la vela `inicio` y avanza `velocidad` veces más rápido."""
+        t0_mercado = int(self.rates["time"][self.inicio])
+        return t0_mercado + (time.monotonic() - self.t0_real) * self.velocidad
+
+    def _posicion_actual(self, ahora=None):
+        """Índice de la vela M1 en curso (o en el instante `ahora`) y fracción transcurrida (0..1)."""
+        ahora = self.ahora() if ahora is None else ahora
+        i = int(np.searchsorted(self.rates["time"], ahora, side="right")) - 1
+        i = min(max(i, 0), len(self.rates) - 1)
+        duracion = 60.0
+        if i + 1 < len(self.rates):
+            duracion = max(float(self.rates["time"][i + 1] - self.rates["time"][i]), 1.0)
+        fraccion = min(max((ahora - float(self.rates["time"][i])) / duracion, 0.0), 1.0)
+        return i, fraccion
+
+    def _camino(self, vela):
+        o, h, l, c = float(vela["open"]), float(vela["high"]), float(vela["low"]), float(vela["close"])
+        return [o, l, h, c] if c >= o else [o, h, l, c]
+
+    def _precio_en(self, vela, fraccion):
+        camino = self._camino(vela)
+        pos = fraccion * 3
+        tramo = min(int(pos), 2)
+        a, b = camino[tramo], camino[tramo + 1]
+        return a + (b - a) * (pos - tramo)
+
+    def _vela_parcial(self, i, fraccion):
+        """Vela M1 en formación tal y como se vería en el terminal en este instante."""
+        vela = self.rates[i].copy()
+        camino = self._camino(self.rates[i])
+        precio = self._precio_en(self.rates[i], fraccion)
+        tramo = min(int(fraccion * 3), 2)
+        visitados = camino[:tramo + 1] + [precio]
+        vela["high"] = max(visitados)
+        vela["low"] = min(visitados)
+        vela["close"] = precio
+        vela["tick_volume"] = max(1, int(round(int(self.rates[i]["tick_volume"]) * fraccion)))
+        return vela
+
+    def _inicios(self, periodo):
+        if periodo not in self._inicios_por_periodo:
+            cubetas = self.rates["time"] // periodo
+            self._inicios_por_periodo[periodo] = np.concatenate(([0], np.flatnonzero(np.diff(cubetas)) + 1))
+        return self._inicios_por_periodo[periodo]
+
+    def copiar_velas(self, timeframe, start_pos, count):
+        periodo = SEGUNDOS_TIMEFRAME.get(timeframe)
+        if periodo is None or count <= 0:
+            return None
+        i, fraccion = self._posicion_actual()
+        inicios = self._inicios(periodo)
+        actual = int(np.searchsorted(inicios, i, side="right")) - 1
+        fin_k = actual - start_pos
+        ini_k = max(fin_k - count + 1, 0)
+        if fin_k < 0:
+            return None
+
+        # Solo se copian las velas M1 que cubren las velas pedidas (no todo el histórico)
+        desde = int(inicios[ini_k])
+        base = self.rates[desde:i + 1].copy()
+        base[-1] = self._vela_parcial(i, fraccion)
+        limites = [int(k) - desde for k in inicios[ini_k:fin_k + 1]]
+        limites.append((int(inicios[fin_k + 1]) if fin_k + 1 <= actual else i + 1) - desde)
+        salida = np.zeros(len(limites) - 1, dtype=DTYPE_RATES)
+        for n in range(len(limites) - 1):
+            tramo = base[limites[n]:limites[n + 1]]
+            salida[n]["time"] = (int(tramo["time"][0]) // periodo) * periodo
+            salida[n]["open"] = tramo["open"][0]
+            salida[n]["high"] = tramo["high"].max()
+            salida[n]["low"] = tramo["low"].min()
+            salida[n]["close"] = tramo["close"][-1]
+            salida[n]["tick_volume"] = tramo["tick_volume"].sum()
+            salida[n]["spread"] = tramo["spread"][-1]
+        return salida
+
+    def tick(self):
+        i, fraccion = self._posicion_actual()
+        bid = round(self._precio_en(self.rates[i], fraccion), self.info.digits)
+        ask = round(bid + int(self.rates[i]["spread"]) * self.info.point, self.info.digits)
+        ahora = self.ahora()
+        return Tick(time=int(ahora), bid=bid, ask=ask, last=bid, volume=1,
+                    time_msc=int(ahora * 1000), flags=6, volume_real=1.0)
+
+    def copiar_ticks(self, desde, count):
+        """Ticks sintéticos con time >= `desde` (epoch) hasta el instante simulado actual."""
+        ahora = self.ahora()
+        primero = int(np.ceil(max(float(desde), float(self.rates["time"][0])) / self.paso_tick))
+        ultimo = int(ahora // self.paso_tick)
+        n = min(max(ultimo - primero + 1, 0), int(count))
+        salida = np.zeros(n, dtype=DTYPE_TICKS)
+        for k in range(n):
+            t = (primero + k) * self.paso_tick
+            i, fraccion = self._posicion_actual(t)
+            bid = round(self._precio_en(self.rates[i], fraccion), self.info.digits)
+            salida[k] = (int(t), bid, round(bid + int(self.rates[i]["spread"]) * self.info.point, self.info.digits),
+                         bid, 1, int(round(t * 1000)), 6, 1.0)
+        return salida
+
+class SimuladorMT5:
+    """Estado del terminal simulado: un mercado por símbolo, reloj común, libro de posiciones y cuenta.
+
+    `ruta` puede llevar `{simbolo}` (p. ej. "data/{simbolo}_M1.csv") para cargar un CSV por
+    símbolo; sin él, todos los símbolos de `simbolos` se sirven desde el mismo histórico.
+    """
+
+    def __init__(self, ruta=MT5_SIM_DATOS, velocidad=MT5_SIM_VELOCIDAD, inicio=MT5_SIM_INICIO,
+                 latencia_ms=MT5_SIM_LATENCIA_MS, slippage_puntos=MT5_SIM_SLIPPAGE_PUNTOS,
+                 semilla=MT5_SIM_SEMILLA, spread_puntos=MT5_SIM_SPREAD_PUNTOS, ticks_por_vela=MT5_SIM_TICKS_POR_VELA,
+                 simbolos=None, point=0.01, digits=2, contract_size=1.0, balance=100000.0):
+        self.velocidad = float(velocidad)
+        self.latencia_ms = float(latencia_ms)
+        self.slippage_puntos = float(slippage_puntos)
+        self.spread_puntos = int(spread_puntos)
+        self.rng = random.Random(semilla)
+        self.mercados = {}
+        for simbolo in (simbolos or SIMBOLOS):
+            info = SymbolInfo(name=simbolo, point=point, digits=digits, spread=self.spread_puntos,
+                              filling_mode=2, volume_min=0.01, volume_max=100.0, volume_step=0.01,
+                              trade_contract_size=contract_size, trade_tick_size=point,
+                              trade_tick_value=point * contract_size)
+            self.mercados[simbolo] = MercadoSimulado(info, ruta.replace("{simbolo}", simbolo), inicio, self.velocidad,
+                                                     self.spread_puntos, 60.0 / max(int(ticks_por_vela), 1))
+        self.balance = balance
+        self.posiciones = {}
+        self.siguiente_ticket = 1
+        self.lock = threading.Lock()
+        self.cargado = False
+
+    def cargar(self):
+        t0_real = time.monotonic()
+        for mercado in self.mercados.values():
+            mercado.cargar(t0_real)
+        self.cargado = True
+
+    def mercado(self, symbol):
+        return self.mercados.get(symbol)
+
+    # --- Trading ---
+
+    def _profit(self, tipo, volumen, precio_abierto, tick, info):
+        if tipo == ORDER_TYPE_BUY:
+            return (tick.bid - precio_abierto) * volumen * info.trade_contract_size
+        return (precio_abierto - tick.ask) * volumen * info.trade_contract_size
+
+    def _ticks(self):
+        """Tick vigente de cada símbolo (se calcula una vez por llamada, no por posición)."""
+        return {simbolo: m.tick() for simbolo, m in self.mercados.items()}
+
+    def posiciones_abiertas(self, symbol=None, ticket=None, magic=None):
+        ticks = self._ticks()
+        with self.lock:
+            salida = []
+            for p in self.posiciones.values():
+                if symbol is not None and p["symbol"] != symbol: continue
+                if ticket is not None and p["ticket"] != ticket: continue
+                if magic is not None and p["magic"] != magic: continue
+                tick, info = ticks[p["symbol"]], self.mercados[p["symbol"]].info
+                precio_actual = tick.bid if p["type"] == ORDER_TYPE_BUY else tick.ask
+                salida.append(TradePosition(
+                    ticket=p["ticket"], time=p["time"], type=p["type"], magic=p["magic"], identifier=p["ticket"],
+                    volume=p["volume"], price_open=p["price_open"], sl=0.0, tp=0.0, price_current=precio_actual,
+                    swap=0.0, profit=round(self._profit(p["type"], p["volume"], p["price_open"], tick, info), 2),
+                    symbol=p["symbol"], comment=p["comment"]))
+        return tuple(salida)
+
+    def enviar_orden(self, request):
+        def resultado(retcode, comment, precio=0.0, tick=None, ticket=0, volumen=0.0):
+            return OrderSendResult(retcode=retcode, deal=ticket, order=ticket, volume=volumen, price=precio,
+                                   bid=tick.bid if tick else 0.0, ask=tick.ask if tick else 0.0,
+                                   comment=comment, request_id=0, retcode_external=0, request=request)
+
+        if request.get("action") == TRADE_ACTION_CLOSE_BY:
+            return self._cerrar_por(request, resultado)
+        mercado = self.mercados.get(request.get("symbol"))
+        if request.get("action") != TRADE_ACTION_DEAL or mercado is None:
+            return resultado(TRADE_RETCODE_INVALID, "Invalid request")
+        info = mercado.info
+        volumen = float(request.get("volume", 0.0))
+        if volumen < info.volume_min or volumen > info.volume_max:
+            return resultado(TRADE_RETCODE_INVALID_VOLUME, "Invalid volume")
+
+        # Latencia de ida y vuelta al servidor de trading
+        if self.latencia_ms > 0:
+            time.sleep(self.latencia_ms / 1000.0)
+
+        tick = mercado.tick()
+        tipo = request.get("type")
+        base = tick.ask if tipo == ORDER_TYPE_BUY else tick.bid
+        slippage = self.rng.gauss(0.0, self.slippage_puntos) * info.point if self.slippage_puntos else 0.0
+        precio = round(base + slippage, info.digits)
+
+        desviacion = request.get("deviation")
+        pedido = request.get("price")
+        if desviacion is not None and pedido and abs(precio - pedido) > desviacion * info.point:
+            return resultado(TRADE_RETCODE_REQUOTE, "Requote", tick=tick)
+
+        with self.lock:
+            ticket_pos = request.get("position")
+            if ticket_pos:
+                p = self.posiciones.get(ticket_pos)
+                if p is None or p["symbol"] != info.name:
+                    return resultado(TRADE_RETCODE_POSITION_CLOSED, "Position doesn't exist", tick=tick)
+                self.balance += self._profit(p["type"], p["volume"], p["price_open"],
+                                             tick._replace(bid=precio, ask=precio), info)
+                del self.posiciones[ticket_pos]
+                return resultado(TRADE_RETCODE_DONE, "Request executed", precio, tick, ticket_pos, volumen)
+
+            ticket = self.siguiente_ticket
+            self.siguiente_ticket += 1
+            self.posiciones[ticket] = {
+                "ticket": ticket, "time": tick.time, "type": tipo, "magic": int(request.get("magic", 0)),
+                "volume": volumen, "price_open": precio, "symbol": info.name,
+                "comment": request.get("comment", ""),
+            }
+            return resultado(TRADE_RETCODE_DONE, "Request executed", precio, tick, ticket, volumen)
+
+    def _cerrar_por(self, request, resultado):
+        """Close-by (cuenta de cobertura): `position` se cierra contra la opuesta `position_by` al precio de apertura de esta."""
+        if self.latencia_ms > 0:
+            time.sleep(self.latencia_ms / 1000.0)
+        with self.lock:
+            p = self.posiciones.get(request.get("position"))
+            q = self.posiciones.get(request.get("position_by"))
+            if p is None or q is None:
+                return resultado(TRADE_RETCODE_POSITION_CLOSED, "Position doesn't exist")
+            if p["symbol"] != q["symbol"] or p["type"] == q["type"]:
+                return resultado(TRADE_RETCODE_INVALID, "Invalid request")
+            info = self.mercados[p["symbol"]].info
+            volumen = min(p["volume"], q["volume"])
+            precio = q["price_open"]
+            cierre = Tick(time=0, bid=precio, ask=precio, last=precio, volume=0, time_msc=0, flags=0, volume_real=0.0)
+            self.balance += self._profit(p["type"], volumen, p["price_open"], cierre, info)
+            for pos in (p, q):
+                pos["volume"] = round(pos["volume"] - volumen, 8)
+                if pos["volume"] <= 0:
+                    del self.posiciones[pos["ticket"]]
+            return resultado(TRADE_RETCODE_DONE, "Request executed", precio, ticket=p["ticket"], volumen=volumen)
+
+    def cuenta(self):
+        ticks = self._ticks()
+        with self.lock:
+            flotante = sum(self._profit(p["type"], p["volume"], p["price_open"], ticks[p["symbol"]],
+                                        self.mercados[p["symbol"]].info)
+                           for p in self.posiciones.values())
+        return AccountInfo(login=1000001, trade_mode=ACCOUNT_TRADE_MODE_DEMO,
+                           margin_mode=ACCOUNT_MARGIN_MODE_RETAIL_HEDGING, leverage=100,
+                           balance=round(self.balance, 2), equity=round(self.balance + flotante, 2),
+                           profit=round(flotante, 2), margin=0.0, currency="USD", server="Simulador-Alpha")
+
+
+# --- API de módulo compatible con MetaTrader5 ---
+
+_sim = None
+_ultimo_error = (RES_S_OK, "Success")
+
+
+def configurar(**kwargs):
+    """Reemplaza la instancia simulada (p. ej. otro CSV, otra latencia) antes de initialize()."""
+    global _sim
+    _sim = SimuladorMT5(**kwargs)
+    return _sim
+
+
+def initialize(*args, **kwargs):
+    global _sim, _ultimo_error
+    try:
+        if _sim is None:
+            _sim = SimuladorMT5()
+        if not _sim.cargado:
+            _sim.cargar()
+    except Exception as e:
+        _ultimo_error = (RES_E_FAIL, f"Simulador: {e}")
+        return False
+    _ultimo_error = (RES_S_OK, "Success")
+    return True
+
+
+def shutdown():
+    return True
+
+
+def last_error():
+    return _ultimo_error
+
+
+def _mercado(symbol):
+    return _sim.mercado(symbol) if _sim is not None else None
+
+
+def copy_rates_from_pos(symbol, timeframe, start_pos, count):
+    mercado = _mercado(symbol)
+    if mercado is None: return None
+    return mercado.copiar_velas(timeframe, start_pos, count)
+
+
+def copy_ticks_from(symbol, date_from, count, flags=COPY_TICKS_ALL):
+    mercado = _mercado(symbol)
+    if mercado is None: return None
+    desde = date_from.timestamp() if hasattr(date_from, "timestamp") else date_from
+    return mercado.copiar_ticks(desde, count)
+
+
+def symbol_info(symbol):
+    mercado = _mercado(symbol)
+    if mercado is None: return None
+    return mercado.info
+
+
+def symbol_info_tick(symbol):
+    mercado = _mercado(symbol)
+    if mercado is None: return None
+    return mercado.tick()
+
+
+def positions_get(symbol=None, group=None, ticket=None, **kwargs):
+    if _sim is None: return None
+    return _sim.posiciones_abiertas(symbol=symbol, ticket=ticket, magic=kwargs.get("magic"))
+
+
+def order_send(request):
+    if _sim is None: return None
+    return _sim.enviar_orden(request)
+
+
+def account_info():
+    if _sim is None: return None
+    return _sim.cuenta()
@@ -0,0 +1,114 @@
+"""
+Núcleo Fusionado: varias neuronas ligeras en un mismo proceso con despacho en memoria.
+
+Cada neurona fusionable es una clase con:
+- NOMBRE: identidad (grupo de consumo en modo aislado y nombre para los acks de replay).
+- ENTRADAS / SALIDAS: canales base que consume y que produce.
+- procesar(canal, simbolo, data, emitir): lógica pura; emite con emitir(canal, simbolo, payload).
+
+El núcleo se suscribe solo a las entradas que no produce ninguna neurona co-localizada,
+decodifica cada mensaje una vez y lo reparte en memoria. Lo que emite una neurona llega
+a sus vecinas sin pasar por Redis y, salvo que el canal esté en `internos` (nadie fuera
+del núcleo lo escucha), se publica también en la Médula. Todo lo que produce un mensaje
+entrante sale en un único pipeline.
+
+Uso: python nucleo_fusionado.py n_talamo n_vestibular n_guardian_vestibular --internos vestibular_perception
+"""
+import os
+import sys
+import argparse
+import importlib
+from collections import deque
+
+import redis
+
+sys.path.append(os.getcwd())
+from config import REDIS_HOST, REDIS_PORT, canal_simbolo, canales_simbolos, separar_canal
+from lobulo_percepcion.motor_replay import confirmar_replay
+from codec_medula import codificar, decodificar
+from transporte_medula import publicar, suscribir
+from traza_medula import sellar, en_curso, continuar
+from latido_medula import iniciar_latido
+
+# Neuronas que pueden alojarse en un núcleo: nombre -> "módulo:Clase"
+NEURONAS_FUSIONABLES = {
+    "n_talamo": "lobulo_percepcion.n_talamo:NeuronaTalamo",
+    "n_vestibular": "lobulo_percepcion.n_vestibular:NeuronaVestibular",
+    "n_guardian_vestibular": "lobulo_riesgo.n_guardian_vestibular:NeuronaGuardianVestibular",
+}
+
+
+def crear_neurona(nombre):
+    modulo, clase = NEURONAS_FUSIONABLES[nombre].split(":")
+    return getattr(importlib.import_module(modulo), clase)()
+
+
+class NucleoFusionado:
+    def __init__(self, r, neuronas, internos=(), grupo=None):
+        self.r = r
+        self.neuronas = list(neuronas)
+        self.internos = set(internos)
+        self.grupo = grupo or "+".join(n.NOMBRE for n in self.neuronas)
+        self.rutas = {}
+        for n in self.neuronas:
+            for c in n.ENTRADAS:
+                self.rutas.setdefault(c, []).append(n)
+        producidos = {c for n in self.neuronas for c in n.SALIDAS}
+        self.entradas_externas = [c for c in self.rutas if c not in producidos]
+        self.cola = deque()
+        self.pipe = None
+
+    def emitir(self, canal, simbolo, payload):
+        # Sellado aquí (no en codificar): las vecinas reciben la misma traza aunque no pase por Redis
+        payload = sellar(canal, payload, continuar())
+        if canal not in self.internos:
+            ch = canal_simbolo(canal, simbolo)
+            publicar(self.pipe, ch, codificar(ch, payload))
+        if canal in self.rutas:
+            self.cola.append((canal, simbolo, payload))
+
+    def despachar(self, canal, simbolo, data):
+        """Procesa un mensaje entrante y toda la cascada interna que provoque."""
+        self.pipe = self.r.pipeline(transaction=False)
+        self.cola.append((canal, simbolo, data))
+        while self.cola:
+            c, s, d = self.cola.popleft()
+            for n in self.rutas.get(c, ()):
+                en_curso(d.get("traza"), n.NOMBRE)
+                n.procesar(c, s, d, self.emitir)
+                confirmar_replay(self.pipe, d, n.NOMBRE)
+        en_curso(None)
+        self.pipe.execute()
+
+    def escuchar(self, historia=0):
+        canales = [ch for c in self.entradas_externas for ch in canales_simbolos(c)]
+        latido = iniciar_latido(self.r, self.grupo, alias=[n.NOMBRE for n in self.neuronas])
+        pubsub = suscribir(self.r, canales, self.grupo, historia=historia)
+        latido.listo()
+        for message in latido.escuchar(pubsub):
+            if message['type'] == 'message':
+                canal, simbolo = separar_canal(message['channel'])
+                self.despachar(canal, simbolo, decodificar(message['data']))
+
+
+def correr_neurona(neurona):
+    """Modo aislado: la neurona sola en su proceso (mismo grupo de consumo que antes)."""
+    r = redis.Redis(host=REDIS_HOST, port=REDIS_PORT)
+    NucleoFusionado(r, [neurona], grupo=neurona.NOMBRE).escuchar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aloja varias neuronas ligeras en un proceso")
+    parser.add_argument("neuronas", nargs="+", choices=sorted(NEURONAS_FUSIONABLES))
+    parser.add_argument("--internos", nargs="*", default=[], help="Canales base que no salen a Redis")
+    parser.add_argument("--nombre", default=None, help="Grupo de consumo del núcleo")
+    args = parser.parse_args()
+
+    r = redis.Redis(host=REDIS_HOST, port=REDIS_PORT)
+    nucleo = NucleoFusionado(r, [crear_neurona(n) for n in args.neuronas], args.internos, args.nombre)
+    print(f"--- 🧬 Núcleo {nucleo.grupo}: {', '.join(args.neuronas)} | Internos: {sorted(nucleo.internos) or '-'} ---", flush=True)
+    nucleo.escuchar()
+
+
+if __name__ == "__main__":
+    main()
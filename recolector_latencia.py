@@ -0,0 +1,109 @@
+"""
+Recolector de Latencia: histogramas por tramo de las trazas de la Médula (traza_medula.py).
+
+Escucha los mensajes donde terminan las trazas (estado del cerebro, decisiones y resultados
+del Gateway) y, por cada par de saltos consecutivos "a→b", registra su latencia. Además:
+- "cierre_vela→<origen>": retraso del Feeder respecto al cierre de la vela (reloj de pared).
+- "total": del cierre de la vela (o del origen) al llenado en MT5. Solo cuenta para resultados
+  cuyo último salto es el llenado del Gateway (no para cierres virtuales de Homeostasis).
+
+Un mismo tramo llega repetido (cada mensaje lleva la traza completa hasta él): se cuenta una
+sola vez por id de traza. Cada TRAZA_REPORTE_SEG escribe p50/p99 en KEY_LATENCIA_TRAZAS y avisa
+de los tramos que superaron TRAZA_SALTO_LENTO_MS.
+"""
+import os
+import sys
+import time
+import threading
+from collections import OrderedDict
+
+import redis
+
+sys.path.append(os.getcwd())
+from config import (REDIS_HOST, REDIS_PORT, CH_BRAIN_STATE, CH_DECISION, CH_RESULTS, KEY_LATENCIA_TRAZAS,
+                    TRAZA_SALTO_LENTO_MS, TRAZA_REPORTE_SEG, canales_simbolos, separar_canal)
+from codec_medula import decodificar
+from transporte_medula import suscribir
+from traza_medula import leer, SALTO_LLENADO
+from medidor_latencia import MedidorLatencia
+from latido_medula import iniciar_latido
+
+TRAZAS_RECORDADAS = 4096
+
+
+class RecolectorLatencia:
+    def __init__(self, r):
+        self.r = r
+        self.tramos = {}                # {"a→b": MedidorLatencia}
+        self.vistos = OrderedDict()     # {id_traza: {tramos ya contados}}
+        self.lentos = 0
+        self.lock = threading.Lock()
+
+    def medidor(self, tramo):
+        m = self.tramos.get(tramo)
+        if m is None:
+            m = self.tramos[tramo] = MedidorLatencia()
+        return m
+
+    def registrar(self, tramo, ms, contados):
+        if tramo in contados:
+            return
+        contados.add(tramo)
+        self.medidor(tramo).registrar(ms)
+        if ms > TRAZA_SALTO_LENTO_MS and tramo != "total" and not tramo.startswith("cierre_vela"):
+            self.lentos += 1
+            print(f"🐢 Tramo lento {tramo}: {ms:.1f} ms")
+
+    def procesar(self, canal, traza):
+        id_traza, retraso, saltos = leer(traza)
+        contados = self.vistos.get(id_traza)
+        if contados is None:
+            contados = self.vistos[id_traza] = set()
+            if len(self.vistos) > TRAZAS_RECORDADAS:
+                self.vistos.popitem(last=False)
+
+        if retraso is not None and saltos:
+            self.registrar(f"cierre_vela→{saltos[0][0]}", retraso, contados)
+        for (a, ns_a), (b, ns_b) in zip(saltos, saltos[1:]):
+            self.registrar(f"{a}→{b}", (ns_b - ns_a) / 1e6, contados)
+        if canal == CH_RESULTS and len(saltos) > 1 and saltos[-1][0] == SALTO_LLENADO:
+            self.registrar("total", (saltos[-1][1] - saltos[0][1]) / 1e6 + (retraso or 0.0), contados)
+
+    def reportar(self):
+        with self.lock:
+            percentiles = [(tramo, m.percentiles(), m.total) for tramo, m in sorted(self.tramos.items())]
+        if not percentiles:
+            return
+        resumen = {}
+        for tramo, (p50, p99), total in percentiles:
+            resumen[f"{tramo}:p50"] = round(p50, 3)
+            resumen[f"{tramo}:p99"] = round(p99, 3)
+            resumen[f"{tramo}:n"] = total
+            print(f"⏱️ {tramo:<40} p50: {p50:8.2f} ms | p99: {p99:8.2f} ms | n={total}")
+        resumen["lentos"] = self.lentos
+        resumen["actualizado"] = time.time()
+        self.r.hset(KEY_LATENCIA_TRAZAS, mapping=resumen)
+
+    def escuchar(self):
+        canales = [c for base in (CH_BRAIN_STATE, CH_DECISION, CH_RESULTS) for c in canales_simbolos(base)]
+        latido = iniciar_latido(self.r)
+        pubsub = suscribir(self.r, canales, "recolector_latencia")
+        print(f"🧭 Recolector de latencia activo | Tramo lento: > {TRAZA_SALTO_LENTO_MS} ms")
+        threading.Thread(target=self.reportar_periodico, daemon=True).start()
+        latido.listo()
+        for message in latido.escuchar(pubsub):
+            if message['type'] == 'message':
+                base, _ = separar_canal(message['channel'])
+                traza = decodificar(message['data']).get("traza")
+                if traza:
+                    with self.lock:
+                        self.procesar(base, traza)
+
+    def reportar_periodico(self):
+        while True:
+            time.sleep(TRAZA_REPORTE_SEG)
+            self.reportar()
+
+
+if __name__ == "__main__":
+    RecolectorLatencia(redis.Redis(host=REDIS_HOST, port=REDIS_PORT)).escuchar()
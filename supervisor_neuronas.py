@@ -0,0 +1,216 @@
+"""
+Supervisor de neuronas: lanza cada proceso, vigila su latido y lo reinicia con backoff.
+
+- Cada proceso hijo late en `latido:<nombre>` (latido_medula.py). Se reinicia si muere con
+  código distinto de 0, si deja de latir después de haber estado listo (cuelgue) o si no
+  llega a "listo" en SUPERVISOR_ARRANQUE_MAX_SEG.
+- Backoff exponencial desde SUPERVISOR_BACKOFF_SEG hasta SUPERVISOR_BACKOFF_MAX_SEG; un
+  proceso que aguantó SUPERVISOR_ESTABLE_SEG vuelve a empezar desde el primer escalón.
+- Al lanzar, cada proceso recibe su afinidad de CPU y prioridad (AFINIDAD_CPU /
+  PRIORIDAD_PROCESOS). Con psutil funciona también en Windows; sin él, solo en Linux.
+- DEPENDENCIAS_ARRANQUE retiene un proceso (el Gateway) hasta que las neuronas de las que
+  depende laten como listas.
+
+El estado (pid, estado, reinicios, segundos hasta listo) queda en el hash KEY_SUPERVISOR.
+"""
+import os
+import sys
+import time
+import subprocess
+
+sys.path.append(os.getcwd())
+from config import (KEY_SUPERVISOR, SUPERVISOR_ARRANQUE_MAX_SEG, SUPERVISOR_BACKOFF_SEG, SUPERVISOR_BACKOFF_MAX_SEG,
+                    SUPERVISOR_ESTABLE_SEG, DEPENDENCIAS_ARRANQUE, AFINIDAD_CPU, PRIORIDAD_PROCESOS)
+from config import PARADA_ESPERA_SEG
+from latido_medula import clave_latido, clave_parada, leer_latidos, pedir_parada
+
+REVISION_SEG = 1.0
+
+
+def detener_procesos(r, procesos, espera=PARADA_ESPERA_SEG):
+    """
+    `procesos` = [(nombre, Popen)]. Pide a todos la parada ordenada por Redis (cada uno vuelca lo
+    pendiente y sale con 0) y a los que no salen en `espera` les aplica terminate() y kill().
+    Sin Médula se pasa directo a terminate().
+    """
+    vivos = [(n, p) for n, p in procesos if p.poll() is None]
+    try:
+        for nombre, _ in vivos:
+            pedir_parada(r, nombre)
+        limite = time.monotonic() + espera
+    except Exception:
+        limite = time.monotonic()
+    for _, proc in vivos:
+        try:
+            proc.wait(max(limite - time.monotonic(), 0.0))
+            continue
+        except subprocess.TimeoutExpired:
+            pass
+        proc.terminate()
+        try:
+            proc.wait(espera)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def aplicar_recursos(pid, nombre):
+    """Afinidad de CPU y prioridad del proceso. Devuelve la lista de avisos (vacía si todo fue bien)."""
+    cpus = AFINIDAD_CPU.get(nombre)
+    nice = PRIORIDAD_PROCESOS.get(nombre)
+    avisos = []
+    if cpus:
+        # Núcleos que no existen en esta máquina se ignoran
+        cpus = [c for c in cpus if c < (os.cpu_count() or 1)] or None
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+    try:
+        if psutil is not None:
+            p = psutil.Process(pid)
+            if cpus: p.cpu_affinity(cpus)
+            if nice is not None:
+                if sys.platform == "win32":
+                    p.nice(psutil.BELOW_NORMAL_PRIORITY_CLASS if nice > 0 else
+                           psutil.ABOVE_NORMAL_PRIORITY_CLASS if nice < 0 else psutil.NORMAL_PRIORITY_CLASS)
+                else:
+                    p.nice(nice)
+        elif not hasattr(os, "sched_setaffinity"):
+            if cpus or nice is not None:
+                avisos.append("sin psutil no hay afinidad ni prioridad en esta plataforma")
+        else:
+            if cpus: os.sched_setaffinity(pid, cpus)
+            if nice is not None: os.setpriority(os.PRIO_PROCESS, pid, nice)
+    except Exception as e:
+        # Subir prioridad (nice < 0) suele requerir privilegios: el proceso sigue igual
+        avisos.append(f"afinidad/prioridad no aplicada: {e}")
+    return avisos
+
+
+class ProcesoVigilado:
+    def __init__(self, nombre, comando):
+        self.nombre = nombre
+        self.comando = comando
+        self.dependencias = DEPENDENCIAS_ARRANQUE.get(nombre, [])
+        self.proc = None
+        self.t_arranque = 0.0
+        self.proximo = 0.0        # monotonic a partir del cual puede (re)lanzarse
+        self.caidas_seguidas = 0
+        self.reinicios = 0
+        self.listo = False
+        self.listo_seg = None
+        self.terminado = False    # Salió con código 0 (p. ej. fin del replay): no se relanza
+        self.en_espera = False
+
+
+class Supervisor:
+    def __init__(self, r, comandos, env, capturar, anotar):
+        """
+        `comandos` = [(nombre, argv)]. `capturar(proc, nombre)` engancha la salida del hijo y
+        `anotar(texto)` escribe los avisos del propio Supervisor.
+        """
+        self.r = r
+        self.procesos = [ProcesoVigilado(n, c) for n, c in comandos]
+        self.env = env
+        self.capturar = capturar
+        self.anotar = anotar
+
+    def lanzar(self, pv):
+        # Un latido viejo de la vida anterior no debe contar como "listo", ni pararlo una parada vieja
+        self.r.delete(clave_latido(pv.nombre), clave_parada(pv.nombre))
+        env = dict(self.env, CEREBRO_PROCESO=pv.nombre)
+        try:
+            pv.proc = subprocess.Popen(pv.comando, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, env=env, text=False)
+        except Exception as e:
+            self.anotar(f"❌ Error al lanzar {pv.nombre}: {e}")
+            self.programar(pv, "no se pudo lanzar")
+            return
+        pv.t_arranque = time.monotonic()
+        pv.listo = False
+        pv.en_espera = False
+        self.capturar(pv.proc, pv.nombre)
+        for aviso in aplicar_recursos(pv.proc.pid, pv.nombre):
+            self.anotar(f"⚠️ {pv.nombre}: {aviso}")
+        intento = f" (reinicio #{pv.reinicios})" if pv.reinicios else ""
+        self.anotar(f"🚀 {pv.nombre} lanzado, pid {pv.proc.pid}{intento}")
+
+    def detener(self, pv):
+        if pv.proc is None:
+            return
+        detener_procesos(self.r, [(pv.nombre, pv.proc)])
+        pv.proc = None
+
+    def programar(self, pv, motivo):
+        """Detiene el proceso y agenda su reinicio con backoff."""
+        self.detener(pv)
+        if pv.t_arranque and time.monotonic() - pv.t_arranque >= SUPERVISOR_ESTABLE_SEG:
+            pv.caidas_seguidas = 0
+        pv.caidas_seguidas += 1
+        pv.reinicios += 1
+        espera = min(SUPERVISOR_BACKOFF_SEG * 2 ** (pv.caidas_seguidas - 1), SUPERVISOR_BACKOFF_MAX_SEG)
+        pv.proximo = time.monotonic() + espera
+        pv.listo = False
+        self.anotar(f"🔁 {pv.nombre} {motivo}: reinicio en {espera:.0f} s")
+
+    def revisar(self):
+        ahora = time.monotonic()
+        latidos = leer_latidos(self.r, [pv.nombre for pv in self.procesos])
+        for pv in self.procesos:
+            if pv.terminado:
+                continue
+            if pv.proc is None:
+                if ahora < pv.proximo:
+                    continue
+                faltan = [n for n, h in leer_latidos(self.r, pv.dependencias).items() if h.get("estado") != "listo"]
+                if faltan:
+                    if not pv.en_espera:
+                        self.anotar(f"🚦 {pv.nombre} retenido hasta que estén listos: {', '.join(faltan)}")
+                        pv.en_espera = True
+                    continue
+                self.lanzar(pv)
+                continue
+
+            codigo = pv.proc.poll()
+            latido = latidos[pv.nombre]
+            if codigo == 0:
+                self.anotar(f"✔️ {pv.nombre} terminó normalmente")
+                pv.proc = None
+                pv.terminado = True
+            elif codigo is not None:
+                self.programar(pv, f"terminó con código {codigo}")
+            elif latido.get("estado") == "listo":
+                if not pv.listo:
+                    # El propio proceso ya avisa en su salida; aquí solo se registra
+                    pv.listo = True
+                    pv.listo_seg = float(latido.get("listo_seg", -1))
+            elif pv.listo:
+                self.programar(pv, "dejó de latir (colgado)")
+            elif ahora - pv.t_arranque > SUPERVISOR_ARRANQUE_MAX_SEG:
+                self.programar(pv, f"no quedó listo en {SUPERVISOR_ARRANQUE_MAX_SEG:.0f} s")
+        self.publicar_estado()
+
+    def publicar_estado(self):
+        estado = {}
+        for pv in self.procesos:
+            vivo = pv.proc is not None
+            estado[pv.nombre] = ("terminado" if pv.terminado else "listo" if pv.listo
+                                 else "arrancando" if vivo else "en_espera")
+            estado[f"{pv.nombre}:pid"] = pv.proc.pid if vivo else 0
+            estado[f"{pv.nombre}:reinicios"] = pv.reinicios
+            estado[f"{pv.nombre}:listo_seg"] = pv.listo_seg if pv.listo_seg is not None else -1
+        try:
+            self.r.hset(KEY_SUPERVISOR, mapping=estado)
+        except Exception:
+            pass
+
+    def correr(self):
+        try:
+            while True:
+                try:
+                    self.revisar()
+                except Exception as e:
+                    # Sin Redis no hay latidos: no se reinicia a nadie por eso
+                    self.anotar(f"⚠️ Supervisor sin Médula: {e}")
+                time.sleep(REVISION_SEG)
+        finally:
+            detener_procesos(self.r, [(pv.nombre, pv.proc) for pv in self.procesos if pv.proc is not None])
@@ -0,0 +1,5 @@
+import os
+
+# config.py lee el backend al importarse por primera vez, y cualquier módulo de prueba puede
+# ser el primero: sin terminal de Windows, todas usan el simulador
+os.environ.setdefault("CEREBRO_MT5_BACKEND", "simulado")
@@ -0,0 +1,54 @@
+"""
+Velas construidas desde ticks: OHLC por bid, volumen en ticks, la vela en formación se
+actualiza y los ticks tardíos se ignoran.
+"""
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+sys.path.append(os.getcwd())
+from lobulo_percepcion.agregador_velas import AgregadorVelas, DTYPE_VELAS
+
+DTYPE_TICKS = np.dtype([("time", "<i8"), ("bid", "<f8"), ("ask", "<f8")])
+T0 = 1_700_000_040   # Múltiplo de 60
+
+
+def ticks(*filas):
+    return np.array(list(filas), dtype=DTYPE_TICKS)
+
+
+def test_ticks_a_velas():
+    a = AgregadorVelas(60, punto=0.01)
+    assert a.agregar_ticks(ticks((T0, 10.0, 10.02), (T0 + 5, 10.5, 10.52), (T0 + 30, 9.8, 9.83),
+                                 (T0 + 61, 9.9, 9.91))) == 2
+    v = a.ultimas(2)
+    assert list(v["time"]) == [T0, T0 + 60]
+    assert (v[0]["open"], v[0]["high"], v[0]["low"], v[0]["close"]) == (10.0, 10.5, 9.8, 9.8)
+    assert v[0]["tick_volume"] == 3 and v[0]["spread"] == 3
+    # Más ticks de la vela en formación: se actualiza sin abrir otra
+    assert a.agregar_ticks(ticks((T0 + 70, 10.4, 10.41), (T0 + 80, 9.7, 9.71))) == 0
+    v = a.ultimas(1)[0]
+    assert (v["open"], v["high"], v["low"], v["close"], v["tick_volume"]) == (9.9, 10.4, 9.7, 9.7, 3)
+
+
+def test_ticks_tardios_se_ignoran():
+    a = AgregadorVelas(60)
+    a.agregar_ticks(ticks((T0 + 60, 10.0, 10.0)))
+    assert a.agregar_ticks(ticks((T0 + 10, 50.0, 50.0))) == 0
+    assert a.n == 1 and a.ultimas(1)[0]["high"] == 10.0
+
+
+def test_siembra_y_buffer_circular():
+    rates = np.zeros(5, dtype=DTYPE_VELAS)
+    rates["time"] = T0 + 60 * np.arange(5)
+    rates["close"] = np.arange(5.0)
+    a = AgregadorVelas(60, capacidad=4)
+    a.sembrar(rates)
+    assert a.tiempo_actual() == T0 + 240
+    assert list(a.ultimas(10)["close"]) == [1.0, 2.0, 3.0, 4.0]   # Solo caben 4
+    a.agregar_ticks(ticks((T0 + 300, 7.0, 7.0)))
+    assert list(a.ultimas(4)["close"]) == [2.0, 3.0, 4.0, 7.0]
+    assert AgregadorVelas(60).ultimas(3) is None
@@ -0,0 +1,103 @@
+"""
+Barrera de votos por vela: decide al completarse o al vencer el deadline, y un voto que llega
+con su vela ya decidida se cuenta como tardío sin contaminar la siguiente.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.getcwd())
+from lobulo_ejecucion import barrera_votos
+from lobulo_ejecucion.barrera_votos import BarreraVotos
+
+EXPERTOS = ("n_visual", "n_momentum", "n_vestibular")
+TS = "2024-03-01 10:15:00"
+TS2 = "2024-03-01 10:16:00"
+
+
+class Reloj:
+    def __init__(self):
+        self.t = 1000.0
+
+    def __call__(self):
+        return self.t
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    r = Reloj()
+    monkeypatch.setattr(barrera_votos.time, "monotonic", r)
+    return r
+
+
+def barrera(deadline_ms=50, purga_seg=60.0):
+    return BarreraVotos(lambda regimen: EXPERTOS[:2] if regimen == 0 else EXPERTOS, deadline_ms, purga_seg)
+
+
+def test_decide_al_completarse(reloj):
+    b = barrera()
+    assert b.voto("BTCUSD", TS, "n_visual", 1) is None
+    assert b.pulso("BTCUSD", TS, 2, 100.0, replay_seq=7) is None
+    assert b.voto("BTCUSD", TS, "n_momentum", -1) is None
+    barra = b.voto("BTCUSD", TS, "n_vestibular", 1, traza="t")
+    assert barra.votos == {"n_visual": 1, "n_momentum": -1, "n_vestibular": 1}
+    assert barra.pulso == (2, 100.0) and barra.replay_seq == 7 and barra.traza == "t"
+    assert not b.abiertas
+
+
+def test_pulso_con_votos_previos_decide_al_momento(reloj):
+    b = barrera()
+    b.voto("BTCUSD", TS, "n_visual", 1)
+    b.voto("BTCUSD", TS, "n_momentum", 1)
+    # En el régimen 0 solo hacen falta dos expertos
+    assert b.pulso("BTCUSD", TS, 0, 100.0).votos == {"n_visual": 1, "n_momentum": 1}
+
+
+def test_deadline_decide_con_los_presentes(reloj):
+    b = barrera(deadline_ms=50)
+    b.pulso("BTCUSD", TS, 2, 100.0)
+    b.voto("BTCUSD", TS, "n_visual", 1)
+    reloj.t += 0.04
+    assert b.vencidas() == []
+    assert b.espera() == pytest.approx(0.01)
+    reloj.t += 0.02
+    (barra,) = b.vencidas()
+    assert barra.votos == {"n_visual": 1}
+    assert b.ausentes == {"n_momentum": 1, "n_vestibular": 1}
+    assert b.espera(maximo=1.0) == 1.0
+
+
+def test_voto_tardio_no_pasa_a_la_siguiente_vela(reloj):
+    b = barrera(deadline_ms=50)
+    b.pulso("BTCUSD", TS, 2, 100.0)
+    reloj.t += 0.06
+    b.vencidas()
+    reloj.t += 0.2
+    tipo, ms = b.voto("BTCUSD", TS, "n_visual", -1)
+    assert tipo == "tardio" and ms == pytest.approx(200.0)
+    assert b.tardios == {"n_visual": 1}
+    # Ni reabre la vela decidida ni aparece en la siguiente
+    assert b.pulso("BTCUSD", TS, 2, 100.0) is None
+    b.pulso("BTCUSD", TS2, 2, 101.0)
+    assert list(b.abiertas) == [("BTCUSD", TS2)]
+    assert b.abiertas[("BTCUSD", TS2)].votos == {}
+
+
+def test_simbolos_independientes(reloj):
+    b = barrera()
+    b.pulso("BTCUSD", TS, 0, 100.0)
+    b.voto("ETHUSD", TS, "n_visual", 1)
+    b.voto("ETHUSD", TS, "n_momentum", 1)
+    assert b.pulso("ETHUSD", TS, 0, 5.0).simbolo == "ETHUSD"
+    assert list(b.abiertas) == [("BTCUSD", TS)]
+
+
+def test_votos_sin_pulso_se_purgan(reloj):
+    b = barrera(purga_seg=60.0)
+    b.voto("BTCUSD", TS, "n_visual", 1)
+    reloj.t += 59.0
+    b.vencidas()
+    assert b.abiertas
+    reloj.t += 1.0
+    assert b.vencidas() == [] and not b.abiertas
@@ -0,0 +1,62 @@
+"""
+El formato binario de la Médula debe devolver exactamente lo que se codificó: mismos campos,
+mismos tipos, ausentes como ausentes y lo que no encaja en el esquema por el apéndice JSON.
+"""
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.getcwd())
+from config import CH_VOTES, CH_DECISION, CH_TICKS, CH_MARKET_DATA, canal_simbolo
+from codec_medula import MAGIC, codificar, decodificar
+
+
+def ida_y_vuelta(canal, data):
+    raw = codificar(canal, data, formato="binario")
+    assert raw[0] == MAGIC
+    return decodificar(raw)
+
+
+def test_voto_completo():
+    voto = {"experto_id": "n_visual", "voto": -1, "confianza": 0.8731, "Timestamp": "2024-03-01 10:15:00",
+            "meta": "", "modelo_version": "v7", "traza": "abc|v12.5"}
+    assert ida_y_vuelta(CH_VOTES, voto) == voto
+
+
+def test_tipos_y_ausentes_se_conservan():
+    decision = {"action": "BUY", "price_at_entry": 1.08423, "regime": 3}
+    salida = ida_y_vuelta(canal_simbolo(CH_DECISION, "EURUSD"), decision)
+    assert salida == decision
+    assert type(salida["regime"]) is int and "consenso" not in salida
+
+
+def test_fuera_de_esquema_por_apendice_json():
+    # Un entero donde el esquema dice float, un None y un campo desconocido
+    tick = {"time_msc": 1_700_000_000_123, "bid": 2, "ask": 1.5, "last": None, "extra": [1, 2]}
+    salida = ida_y_vuelta(CH_TICKS, tick)
+    assert salida == tick
+    assert type(salida["bid"]) is int
+
+
+def test_origen_abre_traza_sin_tocar_el_dict():
+    vela = {"Timestamp": "2024-03-01 10:15:00", "Close_Price": 1.1, "time": 1_709_287_700.0}
+    salida = ida_y_vuelta(CH_MARKET_DATA, vela)
+    assert "traza" not in vela
+    assert salida.pop("traza")
+    assert salida == vela
+
+
+def test_json_y_binario_se_leen_igual():
+    voto = {"experto_id": "n_momentum", "voto": 1, "confianza": 0.5}
+    crudo = codificar(CH_VOTES, voto, formato="json")
+    assert json.loads(crudo) == voto
+    assert decodificar(crudo) == decodificar(codificar(CH_VOTES, voto, formato="binario")) == voto
+
+
+def test_esquema_desconocido():
+    raw = bytearray(codificar(CH_VOTES, {"voto": 1}, formato="binario"))
+    raw[2] = 250  # Versión que nadie registró
+    with pytest.raises(ValueError):
+        decodificar(bytes(raw))
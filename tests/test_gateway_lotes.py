@@ -0,0 +1,95 @@
+"""
+Gateway contra el simulador de MT5: agrupación de ráfagas en LoteOrdenes (una orden física por
+lote, un resultado por decisión), vaciado antes de parar y liquidación con close-by.
+"""
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+fakeredis = pytest.importorskip("fakeredis")
+
+sys.path.append(os.getcwd())
+import mt5_simulado
+from config import CH_RESULTS, GATEWAY_MAX_AGRUPADAS, canal_simbolo
+from codec_medula import decodificar
+from lobulo_ejecucion import mt5_gateway
+from lobulo_ejecucion.mt5_gateway import MT5GatewayAlpha
+
+SIMBOLO = "BTCUSD"
+
+
+@pytest.fixture
+def gateway(tmp_path, monkeypatch):
+    n = 600
+    tiempos = 1_700_000_040 + 60 * np.arange(n)
+    ruta = tmp_path / "velas.csv"
+    pd.DataFrame({"time": tiempos, "close": 100 + np.linspace(0, 5, n)}).to_csv(ruta, index=False)
+    mt5_simulado.configurar(ruta=str(ruta), simbolos=[SIMBOLO], latencia_ms=0, slippage_puntos=0)
+    r = fakeredis.FakeRedis()
+    monkeypatch.setattr(mt5_gateway.redis, "Redis", lambda *a, **k: r)
+    gw = MT5GatewayAlpha(SIMBOLO)
+    resultados = r.pubsub()
+    resultados.subscribe(canal_simbolo(CH_RESULTS, SIMBOLO))
+    resultados.get_message(timeout=1.0)
+    gw.resultados = resultados
+    return gw
+
+
+def leer_resultados(gw):
+    salida = []
+    while (msg := gw.resultados.get_message(timeout=0.1)) is not None:
+        if msg["type"] == "message":
+            salida.append(decodificar(msg["data"]))
+    return salida
+
+
+def posiciones():
+    return mt5_simulado.positions_get(symbol=SIMBOLO)
+
+
+def test_rafaga_sale_como_una_orden(gateway):
+    for consenso in (0.6, 0.8, 1.0):
+        gateway.encolar_orden(SIMBOLO, "BUY", consenso, traza=None)
+    assert len(gateway.lotes[SIMBOLO].consensos) == 3 and not posiciones()
+    gateway.vaciar_lote(SIMBOLO)
+    (p,) = posiciones()
+    assert p.volume == pytest.approx(3 * gateway.lot)
+    resultados = leer_resultados(gateway)
+    assert len(resultados) == 3
+    assert {(r["ticket"], r["agrupadas"], r["volume"]) for r in resultados} == {(p.ticket, 3, gateway.lot)}
+
+
+def test_cambio_de_direccion_y_tope_de_agrupadas(gateway):
+    gateway.encolar_orden(SIMBOLO, "BUY", 0.7)
+    gateway.encolar_orden(SIMBOLO, "BUY", 0.7)
+    gateway.encolar_orden(SIMBOLO, "SELL", -0.7)
+    (p,) = posiciones()
+    assert p.type == mt5_simulado.ORDER_TYPE_BUY and p.volume == pytest.approx(2 * gateway.lot)
+    assert gateway.lotes[SIMBOLO].accion == "SELL"
+    for _ in range(GATEWAY_MAX_AGRUPADAS - 1):
+        gateway.encolar_orden(SIMBOLO, "SELL", -0.7)
+    assert SIMBOLO not in gateway.lotes
+    assert sorted(p.volume for p in posiciones()) == pytest.approx([2 * gateway.lot, GATEWAY_MAX_AGRUPADAS * gateway.lot])
+
+
+def test_al_parar_envia_lo_pendiente_y_rechaza_aperturas(gateway):
+    gateway.encolar_orden(SIMBOLO, "SELL", -0.9)
+    gateway.al_parar()
+    assert len(posiciones()) == 1 and not gateway.lotes
+    gateway.encolar_orden(SIMBOLO, "SELL", -0.9)
+    assert len(posiciones()) == 1 and not gateway.lotes
+
+
+def test_liquidacion_con_close_by(gateway):
+    assert gateway.cobertura
+    for accion in ("BUY", "SELL", "BUY"):
+        gateway.ejecutar_orden_mercado(SIMBOLO, accion, 0.9)
+    leer_resultados(gateway)
+    gateway.cerrar_todo_real(SIMBOLO, "TEST")
+    assert not posiciones()
+    (informe,) = leer_resultados(gateway)
+    assert informe["status"] == "closed" and informe["cerrados"] == 3 and informe["fallidos"] == []
+    assert sum("cerrado_con" in d for d in informe["detalle"]) == 2
@@ -0,0 +1,55 @@
+"""
+Los agregados rodantes del libro deben dar el mismo PnL que recorrer las órdenes una a una.
+"""
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+sys.path.append(os.getcwd())
+from lobulo_riesgo.libro_posiciones import LibroPosiciones
+
+
+def pnl_a_mano(ordenes, bid, ask=None):
+    ask = bid if ask is None else ask
+    return sum((bid - e) * v if t == "BUY" else (e - ask) * v for t, e, v in ordenes)
+
+
+def test_pnl_igual_que_orden_a_orden():
+    rng = np.random.default_rng(5)
+    libro = LibroPosiciones(capacidad=2)   # Obliga a crecer varias veces
+    ordenes = []
+    for _ in range(40):
+        orden = ("BUY" if rng.random() < 0.6 else "SELL", float(rng.uniform(90, 110)), float(rng.choice([0.01, 0.5, 1.0])))
+        libro.abrir(*orden)
+        ordenes.append(orden)
+    assert len(libro) == 40
+    assert libro.detalle() == [{"tipo": t, "entrada": e, "volumen": v} for t, e, v in ordenes]
+    for bid in (95.0, 100.0, 104.5):
+        assert libro.pnl(bid) == pytest.approx(pnl_a_mano(ordenes, bid), abs=1e-9)
+        assert libro.pnl_salida(bid, bid + 0.3) == pytest.approx(pnl_a_mano(ordenes, bid, bid + 0.3), abs=1e-9)
+    assert libro.tipo() == ordenes[0][0]
+
+
+def test_precio_medio_y_vacio():
+    libro = LibroPosiciones()
+    assert libro.pnl(100.0) == 0.0 and libro.pnl_salida(100.0, 101.0) == 0.0
+    assert libro.tipo() is None and libro.precio_medio() is None
+    libro.abrir("BUY", 100.0, 1.0)
+    libro.abrir("BUY", 103.0, 2.0)
+    assert libro.precio_medio() == pytest.approx(102.0)
+    libro.abrir("SELL", 110.0, 3.0)
+    assert libro.precio_medio() is None   # Posición neta plana
+
+
+def test_vaciar_reinicia_los_agregados():
+    libro = LibroPosiciones()
+    libro.abrir("SELL", 0.1, 0.3)
+    libro.abrir("BUY", 0.2, 0.1)
+    libro.vaciar()
+    assert len(libro) == 0 and libro.detalle() == []
+    assert (libro.neto, libro.coste, libro.neto_largo, libro.coste_largo) == (0.0, 0.0, 0.0, 0.0)
+    libro.abrir("BUY", 50.0)
+    assert libro.pnl(51.0) == pytest.approx(1.0)
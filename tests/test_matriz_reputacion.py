@@ -0,0 +1,69 @@
+"""
+Matriz de reputación: la suma ponderada densa, los deltas versionados y la relectura del hash
+cuando se pierde un delta.
+"""
+import json
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+fakeredis = pytest.importorskip("fakeredis")
+
+sys.path.append(os.getcwd())
+from config import KEY_REPUTACION
+from lobulo_ejecucion.matriz_reputacion import MatrizReputacion, PESO_DEFECTO, publicar_pesos
+
+EXPERTOS = ["n_visual", "n_momentum"]
+
+
+def test_ponderar():
+    m = MatrizReputacion(EXPERTOS, regimenes=3)
+    m.fijar(1, "n_visual", 2.0)
+    m.fijar(1, "n_momentum", 0.5)
+    assert m.ponderar(1, {"n_visual": 1, "n_momentum": -1}) == pytest.approx(1.5)
+    assert m.ponderar(0, {"n_visual": 1, "n_momentum": 1}) == pytest.approx(2 * PESO_DEFECTO)
+    assert m.ponderar(1, {}) == 0.0
+    # Régimen fuera de rango: voto simple
+    assert m.ponderar(9, {"n_visual": 1, "n_momentum": 1}) == 2.0
+
+
+def test_experto_desconocido_no_amplia_la_matriz():
+    m = MatrizReputacion(EXPERTOS, regimenes=3)
+    forma = m.pesos.shape
+    assert m.ponderar(0, {"n_nuevo": -1, "n_visual": 1}) == pytest.approx(0.0)
+    assert m.pesos.shape == forma and "n_nuevo" not in m.indice
+    m.fijar(2, "n_nuevo", 3.0)   # Fijar un peso sí lo incorpora
+    assert m.pesos.shape == (3, 3) and m.peso(2, "n_nuevo") == 3.0 and m.peso(0, "n_nuevo") == PESO_DEFECTO
+
+
+def test_cargar_dict_y_archivo(tmp_path):
+    ruta = tmp_path / "matriz.json"
+    ruta.write_text(json.dumps({"0": {"n_visual": 0.25}, "2": {"n_momentum": 4.0}}))
+    m = MatrizReputacion(EXPERTOS, regimenes=3)
+    m.cargar_archivo(str(ruta))
+    assert m.peso(0, "n_visual") == 0.25 and m.peso(2, "n_momentum") == 4.0
+    m.cargar_archivo(str(tmp_path / "no_existe.json"))   # Sin archivo no cambia nada
+    assert m.peso(0, "n_visual") == 0.25
+
+
+def test_deltas_versionados_y_relectura():
+    r = fakeredis.FakeRedis()
+    m = MatrizReputacion(EXPERTOS, regimenes=3)
+    assert m.cargar_redis(r) is False
+
+    assert publicar_pesos(r, {(0, "n_visual"): 2.0}) == 1
+    m.aplicar_delta(r, {"version": 1, "pesos": {"0|n_visual": 2.0}})
+    assert m.version == 1 and m.peso(0, "n_visual") == 2.0
+    # Repetido o viejo: se ignora
+    m.aplicar_delta(r, {"version": 1, "pesos": {"0|n_visual": 9.0}})
+    assert m.peso(0, "n_visual") == 2.0
+
+    # Se pierde el delta 2: al ver el 3 se relee el hash completo
+    publicar_pesos(r, {(1, "n_momentum"): 0.5})
+    publicar_pesos(r, {(2, "n_visual"): 1.5})
+    m.aplicar_delta(r, {"version": 3, "pesos": {"2|n_visual": 1.5}})
+    assert m.version == 3
+    assert (m.peso(1, "n_momentum"), m.peso(2, "n_visual")) == (0.5, 1.5)
+    assert int(r.hget(KEY_REPUTACION, "version")) == 3
@@ -0,0 +1,89 @@
+"""
+El motor incremental debe dar las mismas columnas que `MT5FeederAlpha.calcular_indicadores`
+(la referencia vectorizada con Polars) al reproducir un mismo array de velas.
+"""
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pl = pytest.importorskip("polars")
+
+sys.path.append(os.getcwd())
+from lobulo_percepcion.MT5_Feeder import MT5FeederAlpha
+from lobulo_percepcion.motor_indicadores import MotorIndicadores
+
+DTYPE_RATES = np.dtype([("time", "<i8"), ("open", "<f8"), ("high", "<f8"), ("low", "<f8"), ("close", "<f8"),
+                        ("tick_volume", "<u8"), ("spread", "<i4"), ("real_volume", "<u8")])
+COLUMNAS = ["EMA_10", "EMA_20", "EMA_40", "EMA_80", "EMA_160", "EMA_320", "EMA_Princ", "EMA_Princ_Slope",
+            "RSI_Val", "RSI_Velocidad", "MACD_Val", "DI_Plus", "DI_Minus", "ADX_Val", "ADX_Diff",
+            "ATR_Act", "ATR_Rel", "Volumen_Relativo"]
+SEMILLA = 400
+BLOQUE = 5
+
+
+def velas_sinteticas(n, semilla=7):
+    rng = np.random.default_rng(semilla)
+    close = 1.10 + np.cumsum(rng.normal(0, 0.0004, n))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    rates = np.zeros(n, dtype=DTYPE_RATES)
+    rates["time"] = 1_700_000_040 + 60 * np.arange(n)
+    rates["open"] = open_
+    rates["close"] = close
+    rates["high"] = np.maximum(open_, close) + rng.uniform(0, 0.0003, n)
+    rates["low"] = np.minimum(open_, close) - rng.uniform(0, 0.0003, n)
+    rates["tick_volume"] = rng.integers(1, 500, n)
+    rates["spread"] = 12
+    return rates
+
+
+def referencia(rates):
+    feeder = MT5FeederAlpha.__new__(MT5FeederAlpha)  # calcular_indicadores no toca Redis ni MT5
+    return feeder.calcular_indicadores(pl.DataFrame(rates))
+
+
+def comparar(fila, esperado, i):
+    for col in COLUMNAS:
+        ref = esperado[col][i]
+        if ref is None:
+            assert fila[col] is None, f"{col} en la vela {i}"
+        else:
+            assert fila[col] == pytest.approx(ref, rel=1e-9, abs=1e-9), f"{col} en la vela {i}"
+
+
+def test_replay_incremental_igual_a_calcular_indicadores():
+    rates = velas_sinteticas(SEMILLA + 200)
+    esperado = referencia(rates)
+    motor = MotorIndicadores()
+
+    comparar(motor.sembrar(rates[:SEMILLA]), esperado, SEMILLA - 1)
+    for fin in range(SEMILLA + 1, len(rates) + 1):
+        # Como el Feeder: un bloque corto de velas recientes cuya última está en formación
+        fila = motor.actualizar(rates[max(fin - BLOQUE, 0):fin])
+        assert fila is not None
+        comparar(fila, esperado, fin - 1)
+
+
+def test_vela_en_formacion_no_altera_el_estado():
+    rates = velas_sinteticas(SEMILLA + 3)
+    esperado = referencia(rates)
+    motor = MotorIndicadores()
+    motor.sembrar(rates[:SEMILLA])
+
+    # La misma vela en formación con otro cierre, evaluada de nuevo (como en cada tick)
+    en_curso = rates[SEMILLA - BLOQUE + 1:SEMILLA + 1].copy()
+    en_curso["close"][-1] += 0.01
+    motor.actualizar(en_curso)
+    comparar(motor.actualizar(rates[SEMILLA - BLOQUE + 2:SEMILLA + 2]), esperado, SEMILLA + 1)
+
+
+def test_siembra_de_una_sola_vela_es_insuficiente():
+    rates = velas_sinteticas(10)
+    motor = MotorIndicadores()
+    assert motor.sembrar(rates[:1]) is None
+    assert motor.actualizar(rates[:BLOQUE]) is None
+
+    # Con una vela cerrada ya se puede seguir sin volver a sembrar
+    assert motor.sembrar(rates[:2]) is not None
+    assert motor.actualizar(rates[:BLOQUE]) is not None
@@ -0,0 +1,71 @@
+"""
+El Z-Score en vivo (ZScoreRodante, una vela cada vez) y el de lotes (zscore_ventanas, todo el
+histórico de golpe) deben dar ventanas idénticas bit a bit: el experto se entrena con uno y
+decide con el otro.
+"""
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+sys.path.append(os.getcwd())
+from lobulo_percepcion.normalizacion import ZScoreRodante, zscore_ventanas, marca_vela
+
+VENTANA = 30
+REANCLAJE = 45
+COLUMNAS = 4
+
+
+def serie(n, semilla=3):
+    rng = np.random.default_rng(semilla)
+    # Niveles muy distintos por columna (precio, volumen...) para que la cancelación se note
+    return np.cumsum(rng.normal(0, 1, (n, COLUMNAS)), axis=0) * [1e-4, 1.0, 50.0, 1e3] + [1.1, 0, 3e4, 1e6]
+
+
+def en_vivo(datos, marcas, desde=0):
+    z = ZScoreRodante(VENTANA, COLUMNAS, reanclaje=REANCLAJE)
+    salida = {}
+    for i in range(desde, len(datos)):
+        z.agregar(datos[i], None if marcas is None else marcas[i])
+        if z.lista():
+            salida[i] = z.normalizada().copy()
+    return salida
+
+
+@pytest.mark.parametrize("con_marcas", [False, True])
+def test_vivo_igual_a_lotes(con_marcas):
+    datos = serie(400)
+    marcas = 28_000_000 + 7 + np.arange(len(datos)) if con_marcas else None
+    lotes = zscore_ventanas(datos, VENTANA, marcas=marcas, reanclaje=REANCLAJE)
+    vivo = en_vivo(datos, marcas)
+    assert sorted(vivo) == list(range(VENTANA - 1, len(datos)))
+    for i, ventana in vivo.items():
+        assert np.array_equal(ventana, lotes[i - VENTANA + 1]), f"vela {i}"
+
+
+def test_arranque_a_mitad_coincide_desde_el_primer_reanclaje_comun():
+    # Un experto que arranca tarde se alinea con el histórico en la primera marca múltiplo
+    # de REANCLAJE en la que ya tiene la ventana llena
+    datos = serie(400)
+    marcas = 28_000_000 + np.arange(len(datos))
+    desde = 61
+    lotes = zscore_ventanas(datos, VENTANA, marcas=marcas, reanclaje=REANCLAJE)
+    vivo = en_vivo(datos, marcas, desde)
+    comun = next(i for i in range(desde + VENTANA - 1, len(datos)) if marcas[i] % REANCLAJE == 0)
+    for i in range(comun, len(datos)):
+        assert np.array_equal(vivo[i], lotes[i - VENTANA + 1]), f"vela {i}"
+
+
+def test_finales_selecciona_ventanas():
+    datos = serie(200)
+    todas = zscore_ventanas(datos, VENTANA, reanclaje=REANCLAJE)
+    finales = np.array([VENTANA - 1, 100, 199])
+    assert np.array_equal(zscore_ventanas(datos, VENTANA, reanclaje=REANCLAJE, finales=finales),
+                          todas[finales - VENTANA + 1])
+
+
+def test_marca_vela():
+    assert marca_vela("1970-01-01 00:02:00") == 2
+    assert marca_vela("basura") is None and marca_vela(None) is None
@@ -0,0 +1,306 @@
+"""
+Transporte de la Médula Espinal: Pub/Sub clásico o Redis Streams con grupos de consumo.
+
+Con MEDULA_TRANSPORTE = "streams":
+- `publicar` hace XADD a un stream acotado (MAXLEN ~STREAM_MAXLEN) en lugar de PUBLISH.
+- Cada neurona es un grupo de consumo propio (todas ven todos los mensajes, como en Pub/Sub),
+  lee en lotes con XREADGROUP y confirma con XACK después de procesarlos.
+- Una neurona que se reinicia o se atasca no pierde velas: al volver retoma su lista de
+  pendientes y luego todo lo que se publicó mientras no estaba.
+- Un grupo nuevo puede arrancar releyendo los últimos `historia` mensajes (calentamiento).
+- El retraso de cada grupo (lag y pendientes) se publica en el hash KEY_MEDULA_LAG. Redis 7
+  lo da en XINFO GROUPS; en versiones anteriores se cuentan las entradas posteriores al
+  last-delivered-id del grupo (hasta STREAM_LAG_TOPE, y entonces "lag_minimo": true).
+
+Las suscripciones devuelven mensajes con la misma forma que `pubsub.listen()`, así que
+el bucle de cada neurona no cambia.
+
+Arranque en caliente:
+- `suscribir_hidratado` devuelve, junto a la suscripción, los últimos mensajes de cada canal
+  publicados antes de ella (lista acotada KEY_HISTORIA con Pub/Sub, el propio stream con
+  Streams). La neurona reconstruye su ventana con ellos y sigue en vivo sin huecos ni repetidos.
+- `InstantaneaEstado` guarda y recupera el estado de una neurona (un hash en KEY_ESTADO_NEURONAS,
+  un campo JSON por parte) y, con Streams, descarta los mensajes reentregados que ya estaban aplicados en la instantánea.
+"""
+import os
+import sys
+import json
+import time
+import itertools
+
+sys.path.append(os.getcwd())
+from config import (MEDULA_TRANSPORTE, STREAM_MAXLEN, STREAM_LOTE, STREAM_BLOQUEO_MS,
+                    STREAM_REPORTE_LAG_SEG, STREAM_LAG_TOPE, KEY_MEDULA_LAG, CANALES_CON_HISTORIA, KEY_HISTORIA,
+                    HISTORIA_MAXLEN, KEY_ESTADO_NEURONAS)
+
+CAMPO_DATOS = b"d"
+
+
+def _texto(v):
+    return v.decode("utf-8") if isinstance(v, bytes) else v
+
+
+def _id_tupla(id_msg):
+    return tuple(int(x) for x in _texto(id_msg).split("-"))
+
+
+def publicar(r, canal, payload):
+    """Publica en el canal según el transporte activo. `r` puede ser un cliente o un pipeline."""
+    if MEDULA_TRANSPORTE == "streams":
+        return r.xadd(canal, {CAMPO_DATOS: payload}, maxlen=STREAM_MAXLEN, approximate=True)
+    if canal.partition(":")[0] in CANALES_CON_HISTORIA:
+        # Antes del PUBLISH: quien se suscribe a la vez lo ve en la historia o en vivo, nunca en ninguna
+        clave = f"{KEY_HISTORIA}:{canal}"
+        r.rpush(clave, payload)
+        r.ltrim(clave, -HISTORIA_MAXLEN, -1)
+    return r.publish(canal, payload)
+
+
+def suscribir(r, canales, grupo, historia=0):
+    """Suscripción de la neurona `grupo` a `canales`; usar `.listen()` igual que con pubsub."""
+    if MEDULA_TRANSPORTE == "streams":
+        return SuscripcionStream(r, canales, grupo, historia=historia)
+    pubsub = r.pubsub()
+    pubsub.subscribe(*canales)
+    return pubsub
+
+
+def suscribir_hidratado(r, canales, grupo, n):
+    """
+    Como `suscribir`, pero devuelve (suscripcion, historia) con historia = {canal: [payload, ...]}:
+    los últimos `n` mensajes de cada canal anteriores a la suscripción, en orden cronológico.
+    `.listen()` entrega después exactamente lo que no estaba en la historia.
+    """
+    if MEDULA_TRANSPORTE == "streams":
+        sub = SuscripcionStream(r, canales, grupo)
+    else:
+        sub = SuscripcionPubSubHidratada(r, canales)
+    return sub, sub.historia(n)
+
+
+class SuscripcionPubSubHidratada:
+    """Pub/Sub con historia previa: se confirma la suscripción y luego se lee la lista acotada."""
+
+    def __init__(self, r, canales, espera_seg=5.0):
+        self.r = r
+        self.canales = [_texto(c) for c in canales]
+        self.pubsub = r.pubsub()
+        self.pubsub.subscribe(*self.canales)
+        # Hasta que Redis confirma la suscripción lo publicado no nos llega: la historia se lee después
+        self.previos = []
+        confirmados = 0
+        limite = time.monotonic() + espera_seg
+        while confirmados < len(self.canales) and time.monotonic() < limite:
+            m = self.pubsub.get_message(timeout=0.1)
+            if m is None:
+                continue
+            if m['type'] == 'subscribe':
+                confirmados += 1
+            else:
+                self.previos.append(m)
+        self.repetidos = {}
+
+    def historia(self, n):
+        if n <= 0:
+            return {c: [] for c in self.canales}
+        pipe = self.r.pipeline(transaction=False)
+        for canal in self.canales:
+            pipe.lrange(f"{KEY_HISTORIA}:{canal}", -n, -1)
+        historia = dict(zip(self.canales, pipe.execute()))
+        # Lo publicado entre la suscripción y la lectura llega también en vivo: se salta
+        self.repetidos = {c: set(items) for c, items in historia.items() if items}
+        return historia
+
+    def listen(self):
+        for m in itertools.chain(self.previos, self.pubsub.listen()):
+            if m['type'] == 'message':
+                canal = _texto(m['channel'])
+                vistos = self.repetidos.get(canal)
+                if vistos:
+                    if m['data'] in vistos:
+                        continue
+                    # El primer mensaje nuevo marca el fin del solape: lo siguiente es posterior
+                    del self.repetidos[canal]
+            yield m
+
+    def close(self):
+        self.pubsub.close()
+
+
+class SuscripcionStream:
+    """Lector de grupo de consumo sobre uno o varios streams con ack por lotes."""
+
+    def __init__(self, r, canales, grupo, historia=0, lote=STREAM_LOTE, bloqueo_ms=STREAM_BLOQUEO_MS):
+        self.r = r
+        self.canales = list(canales)
+        self.grupo = grupo
+        self.consumidor = grupo  # Nombre estable: el proceso reiniciado hereda sus pendientes
+        self.lote = lote
+        self.bloqueo_ms = bloqueo_ms
+        self.ultimo_reporte = 0.0
+        for canal in self.canales:
+            self._crear_grupo(canal, historia)
+
+    def _crear_grupo(self, canal, historia):
+        inicio = "$"
+        if historia > 0:
+            recientes = self.r.xrevrange(canal, count=historia + 1)
+            inicio = recientes[-1][0] if len(recientes) > historia else "0"
+        try:
+            self.r.xgroup_create(canal, self.grupo, id=inicio, mkstream=True)
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    def historia(self, n):
+        """
+        Últimos `n` mensajes por canal que este grupo ya consumió y confirmó: terminan justo antes
+        de sus pendientes (o en su último entregado), así que `listen()` sigue sin solape.
+        """
+        historia = {}
+        for canal in self.canales:
+            tope = None
+            for g in self.r.xinfo_groups(canal):
+                if _texto(g.get("name")) == self.grupo:
+                    tope = _texto(g.get("last-delivered-id"))
+            pendientes = self.r.xpending(canal, self.grupo)
+            if pendientes and pendientes.get("pending"):
+                tope = "(" + _texto(pendientes["min"])
+            entradas = [] if n <= 0 or tope in (None, "0-0") else self.r.xrevrange(canal, max=tope, count=n)
+            historia[canal] = [campos[CAMPO_DATOS] for _, campos in reversed(entradas) if campos.get(CAMPO_DATOS)]
+        return historia
+
+    def _leer(self, desde):
+        respuesta = self.r.xreadgroup(self.grupo, self.consumidor, {c: desde for c in self.canales},
+                                      count=self.lote, block=None if desde == "0" else self.bloqueo_ms)
+        mensajes = []
+        for canal, entradas in respuesta or []:
+            for id_msg, campos in entradas:
+                # Las entradas borradas por MAXLEN siguen en la PEL con campos vacíos
+                if campos:
+                    mensajes.append((id_msg, canal, campos.get(CAMPO_DATOS)))
+                else:
+                    self.r.xack(canal, self.grupo, id_msg)
+        # Orden global aproximado entre canales: los ids de stream son "ms-seq"
+        mensajes.sort(key=lambda m: tuple(int(x) for x in m[0].split(b"-")))
+        return mensajes
+
+    def listen(self):
+        # 1. Pendientes de una vida anterior (entregados pero nunca confirmados)
+        desde = "0"
+        while True:
+            mensajes = self._leer(desde)
+            if desde == "0" and not mensajes:
+                desde = ">"
+                continue
+
+            por_canal = {}
+            for id_msg, canal, datos in mensajes:
+                yield {"type": "message", "channel": canal, "data": datos, "id": id_msg}
+                por_canal.setdefault(canal, []).append(id_msg)
+
+            if por_canal:
+                pipe = self.r.pipeline(transaction=False)
+                for canal, ids in por_canal.items():
+                    pipe.xack(canal, self.grupo, *ids)
+                pipe.execute()
+
+            if time.monotonic() - self.ultimo_reporte >= STREAM_REPORTE_LAG_SEG:
+                self.reportar_lag()
+
+    def lag(self):
+        """Mensajes sin leer (lag) y leídos sin confirmar (pending) por canal para este grupo."""
+        estado = {}
+        for canal in self.canales:
+            for g in self.r.xinfo_groups(canal):
+                if _texto(g.get("name")) == self.grupo:
+                    estado[canal] = {"lag": g.get("lag"), "pending": g.get("pending")}
+                    if estado[canal]["lag"] is None:
+                        estado[canal].update(self._contar_lag(canal, _texto(g.get("last-delivered-id"))))
+        return estado
+
+    def _contar_lag(self, canal, ultimo):
+        """Lag sin el campo de Redis 7: entradas del stream posteriores a `ultimo` (acotado)."""
+        # Rango inclusivo (el exclusivo "(" es de Redis 6.2): se descuenta `ultimo` si sigue ahí
+        entradas = self.r.xrange(canal, min=ultimo or "-", max="+", count=STREAM_LAG_TOPE + 1)
+        if entradas and ultimo and _texto(entradas[0][0]) == ultimo:
+            entradas = entradas[1:]
+        lag = min(len(entradas), STREAM_LAG_TOPE)
+        return {"lag": lag, "lag_minimo": len(entradas) > STREAM_LAG_TOPE}
+
+    def reportar_lag(self):
+        self.ultimo_reporte = time.monotonic()
+        try:
+            estado = self.lag()
+        except Exception:
+            return
+        if not estado:
+            return
+        ahora = time.time()
+        self.r.hset(KEY_MEDULA_LAG, mapping={
+            f"{self.grupo}|{canal}": json.dumps(dict(valores, ts=ahora)) for canal, valores in estado.items()
+        })
+
+    def close(self):
+        pass
+
+
+class InstantaneaEstado:
+    """
+    Estado de una neurona (contabilidad, máximos, ...) en el hash KEY_ESTADO_NEURONAS:<nombre>,
+    un campo JSON por parte (p. ej. por símbolo). Se reescribe solo la parte que cambió, cuando
+    cambia, y se carga al arrancar.
+
+    Con Streams los mensajes se confirman por lotes después de procesarlos: si el proceso cae
+    entre la instantánea y el XACK, se reentregan. La instantánea recuerda el último id aplicado
+    por canal (campo "id:<canal>") y `ya_aplicado` los descarta para no contarlos dos veces. Un
+    mensaje que no cambió el estado no se anota: reaplicarlo tras un reinicio es inocuo.
+    """
+
+    PREFIJO_ID = "id:"
+
+    def __init__(self, r, nombre):
+        self.r = r
+        self.clave = f"{KEY_ESTADO_NEURONAS}:{nombre}"
+        self.ultimos = {}
+
+    def cargar(self):
+        """Estado guardado ({parte: estado}), o None si la neurona arranca por primera vez."""
+        if _texto(self.r.type(self.clave)) == "string":
+            self._migrar()
+        campos = {_texto(k): json.loads(v) for k, v in self.r.hgetall(self.clave).items()}
+        if not campos:
+            return None
+        self.ultimos = {k[len(self.PREFIJO_ID):]: v for k, v in campos.items() if k.startswith(self.PREFIJO_ID)}
+        return {k: v for k, v in campos.items() if not k.startswith(self.PREFIJO_ID)}
+
+    def _migrar(self):
+        """Instantánea de versiones anteriores (un único JSON en un string): se pasa a hash."""
+        doc = json.loads(self.r.get(self.clave))
+        campos = {parte: json.dumps(e) for parte, e in (doc.get("estado") or {}).items()}
+        campos.update({self.PREFIJO_ID + c: json.dumps(i) for c, i in doc.get("ultimos", {}).items()})
+        pipe = self.r.pipeline()
+        pipe.delete(self.clave)
+        if campos:
+            pipe.hset(self.clave, mapping=campos)
+        pipe.execute()
+
+    def ya_aplicado(self, message):
+        id_msg = message.get("id")
+        if id_msg is None:
+            return False
+        ultimo = self.ultimos.get(_texto(message['channel']))
+        return ultimo is not None and _id_tupla(id_msg) <= _id_tupla(ultimo)
+
+    def guardar(self, r, partes, message=None):
+        """
+        Escribe las `partes` ({parte: estado}) que cambiaron y anota `message` como aplicado.
+        `r` puede ser un pipeline: la instantánea sale junto con lo que publica el mensaje.
+        """
+        campos = {parte: json.dumps(e) for parte, e in partes.items()}
+        if message is not None and message.get("id") is not None:
+            canal = _texto(message['channel'])
+            self.ultimos[canal] = _texto(message["id"])
+            campos[self.PREFIJO_ID + canal] = json.dumps(self.ultimos[canal])
+        if campos:
+            r.hset(self.clave, mapping=campos)
@@ -0,0 +1,94 @@
+"""
+Trazas de latencia de la Médula Espinal: de la vela M1 al llenado en MT5.
+
+Cada payload de los canales de TRAZA_CANALES lleva un campo "traza" (texto compacto):
+
+    "<id>|v<ms desde el cierre de la vela>|<salto>:<ns>|<salto>:<ns>|..."
+
+- El primer productor (el Feeder al publicar la vela) abre la traza y anota cuánto tardó
+  desde el cierre de la vela (reloj de pared).
+- Cada salto siguiente anota `time.perf_counter_ns()`: en Windows es QueryPerformanceCounter
+  (común a todos los procesos desde Python 3.10) y en Linux CLOCK_MONOTONIC. No se usa
+  `monotonic_ns()`: en Windows, antes de 3.13, es GetTickCount64 con pasos de ~15.6 ms y los
+  saltos de menos de un milisegundo saldrían como 0 o 16 ms.
+- Solo el origen se sella solo (`codificar` abre la traza de la vela). El resto de productores
+  la continúa a mano con `continuar(data.get("traza"), salto)` a partir del mensaje del que nace
+  su salida: nada se hereda de "lo último que decodificó el hilo", que puede no tener relación
+  (p. ej. un cierre virtual de Homeostasis tras leer una vela).
+- En el núcleo fusionado, `despachar` fija con `en_curso` la traza del mensaje que procesa cada
+  neurona y `emitir` la continúa con su nombre.
+
+`recolector_latencia.py` junta las trazas y construye los histogramas por tramo.
+"""
+import os
+import sys
+import time
+import itertools
+import threading
+
+sys.path.append(os.getcwd())
+from config import TRAZA_CANALES, TRAZA_ORIGENES
+
+SALTO_LLENADO = "llenado"  # Último salto de una orden real: el Gateway lo anota tras order_send
+PROCESO = os.path.splitext(os.path.basename(sys.argv[0] or "proceso"))[0] or "proceso"
+_local = threading.local()
+_ids = itertools.count(1)
+_PREFIJO = f"{os.getpid():x}."
+
+
+def en_curso(traza, salto=None):
+    """Fija a mano la traza (y el nombre del salto) del trabajo en curso de este hilo."""
+    _local.actual = traza
+    _local.salto = salto
+
+
+def continuar(traza=None, salto=None):
+    """`traza` (o la del mensaje en curso) con un salto más; None si no hay traza que seguir."""
+    base = traza if traza is not None else getattr(_local, "actual", None)
+    if not base:
+        return None
+    salto = salto or getattr(_local, "salto", None) or PROCESO
+    return f"{base}|{salto}:{time.perf_counter_ns()}"
+
+
+def nueva(salto=None, evento=None):
+    """Abre una traza. `evento` = epoch (s) del hecho que la origina (p. ej. cierre de la vela)."""
+    partes = [f"{_PREFIJO}{next(_ids):x}"]
+    if evento is not None:
+        retraso_ms = (time.time() - evento) * 1000.0
+        # Un replay histórico no tiene retraso real respecto al cierre: no se anota
+        if 0.0 <= retraso_ms < 60000.0:
+            partes.append(f"v{retraso_ms:.2f}")
+    partes.append(f"{salto or PROCESO}:{time.perf_counter_ns()}")
+    return "|".join(partes)
+
+
+def sellar(canal, data, traza=None):
+    """
+    Devuelve `data` con `traza` (ya continuada por el productor) si el canal se traza, o con una
+    traza nueva si el canal es un origen. No toca el dict original ni una traza ya puesta.
+    """
+    base = canal.partition(":")[0]
+    if base not in TRAZA_CANALES or "traza" in data:
+        return data
+    if traza is None and base in TRAZA_ORIGENES:
+        periodo = TRAZA_ORIGENES[base]
+        inicio = data.get("time")
+        traza = nueva(evento=inicio + periodo if isinstance(inicio, (int, float)) else None)
+    if traza is None:
+        return data
+    return dict(data, traza=traza)
+
+
+def leer(traza):
+    """(id, retraso desde el evento en ms o None, [(salto, ns), ...])."""
+    partes = traza.split("|")
+    retraso = None
+    saltos = []
+    for p in partes[1:]:
+        if p.startswith("v"):
+            retraso = float(p[1:])
+        else:
+            nombre, _, ns = p.rpartition(":")
+            saltos.append((nombre, int(ns)))
+    return partes[0], retraso, saltos